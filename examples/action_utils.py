@@ -0,0 +1,187 @@
+import time
+
+
+class clipSchedule:
+    """
+    Decides which captured frames are fed to actionNet.
+
+    Only every `stride`th captured frame goes into the network's clip, so
+    a clip of `clip_length` frames spans clip_length * stride captured
+    frames, and classification runs at 1/stride of the capture rate.
+    Results are only reported once a full clip has been fed since start
+    (or since reset(), e.g. after the camera was reopened); before that
+    the network is classifying a partly empty clip.
+    """
+    def __init__(self, clip_length=16, stride=1):
+        self.clip_length = max(1, int(clip_length))
+        self.stride = max(1, int(stride))
+        self.captured = 0
+        self.fed = 0
+
+    def feed(self):
+        """
+        Count a captured frame and return True if it should be classified.
+        """
+        self.captured += 1
+        if (self.captured - 1) % self.stride:
+            return False
+        self.fed += 1
+        return True
+
+    def ready(self):
+        """
+        True once a full clip has been fed.
+        """
+        return self.fed >= self.clip_length
+
+    def reset(self):
+        self.captured = 0
+        self.fed = 0
+
+    def stats(self):
+        return {"clip_length": self.clip_length, "clip_stride": self.stride}
+
+
+class actionTimeline:
+    """
+    Incrementally builds a timeline of action segments: runs of the same
+    label, each with its start and end time and mean confidence.
+
+    update() extends the open segment or closes it and opens a new one,
+    so each result costs O(1).  Labels below the confidence threshold
+    (class ID < 0) close the open segment without starting a new one, and
+    closed segments shorter than `min_duration` seconds are dropped.
+    take() returns the segments closed since the last call, plus the one
+    still open, marked "ongoing".  close() ends the open segment at its
+    last result, e.g. when the camera goes down, so no segment spans an
+    outage.
+    """
+    def __init__(self, min_duration=0.0, max_segments=20):
+        self.min_duration = min_duration
+        self.max_segments = max_segments
+        self.closed = []
+        self.dropped = 0
+        self.current = None
+
+    def update(self, class_id, label, confidence, timestamp):
+        current = self.current
+        if current is not None and current["class_id"] == class_id:
+            current["end"] = timestamp
+            current["confidence_sum"] += confidence
+            current["results"] += 1
+            return
+        flicker = current is not None and not self._close(current, timestamp)
+        self.current = None
+        if class_id < 0:
+            return
+        if flicker and self.closed and self.closed[-1]["class_id"] == class_id:
+            # A dropped flicker between two runs of the same label: resume the earlier segment
+            self.current = self.closed.pop()
+            self.update(class_id, label, confidence, timestamp)
+            return
+        self.current = {"class_id": class_id, "label": label, "start": timestamp, "end": timestamp,
+                        "confidence_sum": confidence, "results": 1}
+
+    def close(self):
+        """
+        Close the open segment at the time of its last result.
+        """
+        if self.current is not None:
+            self._close(self.current, self.current["end"])
+            self.current = None
+
+    def _close(self, segment, timestamp):
+        """
+        Close a segment at `timestamp`.  Returns False if it was too short to keep.
+        """
+        segment["end"] = timestamp
+        if segment["end"] - segment["start"] < self.min_duration:
+            return False
+        if len(self.closed) >= self.max_segments:
+            # Keep the most recent segments if an interval sees a lot of changes
+            self.closed.pop(0)
+            self.dropped += 1
+        self.closed.append(segment)
+        return True
+
+    @staticmethod
+    def _summary(segment, ongoing=False):
+        summary = {
+            "label": segment["label"],
+            "start": round(segment["start"], 2),
+            "end": round(segment["end"], 2),
+            "mean_confidence": round(segment["confidence_sum"] / segment["results"], 4)
+        }
+        if ongoing:
+            summary["ongoing"] = True
+        return summary
+
+    def take(self):
+        """
+        Segments closed since the last take(), oldest first, then the open one.
+        """
+        segments = [self._summary(s) for s in self.closed]
+        if self.current is not None:
+            segments.append(self._summary(self.current, ongoing=True))
+        self.closed = []
+        self.dropped = 0
+        return segments
+
+
+def add_clip_args(parser):
+    parser.add_argument("--clip-length", type=int, default=16,
+                        help="frames in the network's clip; results are reported once this many have been fed")
+    parser.add_argument("--clip-stride", type=int, default=1,
+                        help="feed every Nth captured frame to the network")
+    parser.add_argument("--min-segment", type=float, default=1.0,
+                        help="shortest action segment reported in the timeline, in seconds")
+
+
+if __name__ == "__main__":
+    # Scripted per-frame results at 30 FPS: walking, a one-result flicker, running, a gap, walking again
+    labels = {1: "walking", 2: "running", 3: "jumping"}
+    script = [(1, 0.8)] * 90 + [(3, 0.6)] * 1 + [(1, 0.7)] * 59 + [(2, 0.9)] * 120 + [(-1, 0.0)] * 30 + [(1, 0.75)] * 60
+
+    schedule = clipSchedule(clip_length=16, stride=3)
+    timeline = actionTimeline(min_duration=0.5)
+    classified = 0
+    for frame, (class_id, confidence) in enumerate(script):
+        if frame == 200:
+            first = timeline.take()
+        if not schedule.feed():
+            continue
+        classified += 1
+        if schedule.ready():
+            timeline.update(class_id, labels.get(class_id, "unknown"), confidence, frame / 30.0)
+    second = timeline.take()
+
+    print(f"{len(script)} frames captured, {classified} classified (stride {schedule.stride})")
+    print("interval 1:", first)
+    print("interval 2:", second)
+    assert [s["label"] for s in first] == ["walking", "running"] and first[-1]["ongoing"]
+    assert [s["label"] for s in second] == ["running", "walking"] and second[-1]["ongoing"]
+    assert first[0]["start"] == round((16 - 1) * 3 / 30.0, 2), "results reported before the clip was full"
+    assert abs(first[0]["mean_confidence"] - 0.75) < 0.05
+
+    # Camera outage from 4 s to 6 s: the segment closes at the last result, and results resume
+    # only once a full clip of new frames has been fed
+    schedule = clipSchedule(clip_length=16, stride=1)
+    timeline = actionTimeline(min_duration=0.5)
+    for frame in range(300):
+        if frame == 120:
+            schedule.reset()
+            timeline.close()
+        if 120 <= frame < 180 or not schedule.feed() or not schedule.ready():
+            continue
+        timeline.update(1, "walking", 0.8, frame / 30.0)
+    segments = timeline.take()
+    assert [(s["start"], s["end"]) for s in segments] == [(0.5, 3.97), (6.5, 9.97)], segments
+
+    # Cost per update
+    timeline = actionTimeline()
+    start = time.perf_counter()
+    for i in range(100000):
+        timeline.update(i // 50 % 3, "label", 0.5, i / 30.0)
+        if i % 210 == 0:
+            timeline.take()
+    print(f"{(time.perf_counter() - start) * 10:.2f} us per update")
@@ -3,68 +3,67 @@
 import sys
 import argparse
 import socket
-import json
 import time
 import os
+import threading
 
 from jetson_inference import actionNet
 from jetson_utils import videoSource, videoOutput, cudaFont, Log
 
-# --- Configurable OTA-compatible model path ---
-MODEL_DIR = "/var/snap/iotconnect/common/models"
-MODEL_LINK = os.path.join(MODEL_DIR, "current-model.txt")
-DEFAULT_MODEL = "resnet-18"
+from classify_utils import classificationSmoother, add_smoothing_args
+from iotc_utils import telemetry_socket_path, heartbeatWriter
+from capture_utils import open_capture, status_reporter
+from model_utils import load_model_argv
+from action_utils import clipSchedule, actionTimeline, add_clip_args
+from schema_utils import payload_builder
+
+DEMO_NAME = "actionNet"
+DEMO_VERSION = "1.0"
+MODEL_NAME = None
+# Payload builder for the telemetry messages, compiled once the model is known
+TELEMETRY = None
 
 # --- Socket Path ---
-SOCKET_PATH = (
+SOCKET_PATH = telemetry_socket_path(
     "/var/snap/iotconnect/common/iotc.sock"
     if os.path.exists("/var/snap/iotconnect/common/iotc.sock")
     else os.path.expanduser("~/snap/iotconnect/common/iotc.sock")
 )
 TELEMETRY_INTERVAL = 7.0  # Send every 7 seconds
 
-# --- Load model name from OTA-updated file ---
+# --- Load model from the actionnet model catalog ---
 def load_model_from_config():
-    MODEL_DIR = "/var/snap/iotconnect/common/models"
-    model_name = "resnet-18-kinetics-moments.onnx"
-    try:
-        with open(os.path.join(MODEL_DIR, "current-model.txt")) as f:
-            model_name = f.read().strip()
-    except Exception as e:
-        print(f"[MODEL] Error reading current-model.txt: {e}")
-
-    model_path = os.path.join(MODEL_DIR, model_name)
-    labels_path = os.path.join(MODEL_DIR, "labels.txt")
-
-    print(f"[DEBUG] model path: {model_path}")
-    print(f"[DEBUG] labels path: {labels_path}")
-    print(f"[DEBUG] File exists? {os.path.isfile(model_path)}")
-
-    # Inject model and labels into sys.argv for Jetson-inference backend
-    sys.argv += ["--model=" + model_path, "--labels=" + labels_path]
-
+    """
+    Resolve the model from models/actionnet/ (current-model.txt and
+    manifest.json), set MODEL_NAME, and build the network from it.
+    """
+    global MODEL_NAME
+    MODEL_NAME, flags = load_model_argv("actionnet")
+    sys.argv += flags
     return actionNet("custom", sys.argv)
 
 
-
 # --- Send telemetry via UNIX socket ---
-def send_telemetry(class_id, class_desc, confidence):
-    telemetry = {
-        "timestamp": int(time.time()),
-        "class_id": class_id,
-        "class_description": class_desc,
-        "confidence": round(confidence, 5)
-    }
+def send_payload(payload):
+    """
+    Send one message: a line from TELEMETRY.build() or an ad-hoc event
+    dict (camera_down / camera_up), encoded with the same builder.
+    """
     try:
+        line = payload if isinstance(payload, str) else TELEMETRY.encode(payload)
         s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         s.settimeout(1.0)
         s.connect(SOCKET_PATH)
-        s.send((json.dumps(telemetry) + "\n").encode("utf-8"))
+        s.send(line.encode("utf-8"))
         s.close()
-        print(f"[TELEMETRY] Sent: {telemetry}")
+        print(f"[TELEMETRY] Sent: {line.rstrip()}")
     except Exception as e:
         print(f"[SOCKET] Send failed: {e}")
 
+
+def send_telemetry(class_id, class_desc, confidence, **extra):
+    send_payload(TELEMETRY.build(int(time.time()), class_id, class_desc, round(confidence, 5), **extra))
+
 # --- Argument parsing (matches original script style) ---
 parser = argparse.ArgumentParser(description="Classify the action/activity of an image sequence.",
                                  formatter_class=argparse.RawTextHelpFormatter,
@@ -73,6 +72,8 @@ parser = argparse.ArgumentParser(description="Classify the action/activity of an
 parser.add_argument("input", type=str, default="", nargs='?', help="URI of the input stream")
 parser.add_argument("output", type=str, default="", nargs='?', help="URI of the output stream")
 parser.add_argument("--network", type=str, default=None, help="Override model name manually (optional)")
+add_smoothing_args(parser)
+add_clip_args(parser)
 
 try:
     args = parser.parse_known_args()[0]
@@ -82,22 +83,69 @@ except:
     sys.exit(0)
 
 # --- Load model (from OTA-configured file unless overridden) ---
-net = actionNet(args.network, sys.argv) if args.network else load_model_from_config()
+if args.network:
+    MODEL_NAME = args.network
+    net = actionNet(args.network, sys.argv)
+else:
+    net = load_model_from_config()
+TELEMETRY = payload_builder("actionnet", demo_name=DEMO_NAME, demo_version=DEMO_VERSION, model_name=MODEL_NAME)
+
+# The clip stride below decides which frames reach the network, so turn off actionNet's own frame skipping
+if hasattr(net, "SetSkipFrames"):
+    net.SetSkipFrames(0)
 
 # --- Create video input/output ---
-input = videoSource(args.input, argv=sys.argv)
+# Camera down/up is reported right away; the main loop then restarts the clip and closes the open segment
+camera_status = threading.Event()
+report_status = status_reporter(send_payload, DEMO_NAME)
+
+def on_camera_status(event, info):
+    report_status(event, info)
+    camera_status.set()
+
+input = open_capture(args.input, sys.argv, on_camera_status)
 output = videoOutput(args.output, argv=sys.argv)
 font = cudaFont()
 
+smoother = classificationSmoother(net.GetNumClasses(), mode=args.smoothing, window=args.smoothing_window,
+                                  alpha=args.smoothing_alpha, threshold=args.confidence_threshold,
+                                  top_k=args.top_k, margin=args.smoothing_margin,
+                                  dwell=args.smoothing_dwell)
+schedule = clipSchedule(args.clip_length, args.clip_stride)
+timeline = actionTimeline(min_duration=args.min_segment)
+last_send_time = 0
+
+heartbeat = heartbeatWriter()
 # --- Main processing loop ---
 while True:
     img = input.Capture()
+    if camera_status.is_set():
+        # The clip holds frames from before the outage: wait for a full clip of new ones
+        camera_status.clear()
+        schedule.reset()
+        timeline.close()
     if img is None:
+        if input.alive():
+            heartbeat.beat(0)  # camera down or reopening, not hung
         continue
-
-    # Classify the image
-    class_id, confidence = net.Classify(img)
-    class_desc = net.GetClassDesc(class_id)
+    heartbeat.beat()
+
+    # Classify every clip_stride-th frame, then smooth the result once the clip is full
+    if schedule.feed():
+        frame_class_id, frame_confidence = net.Classify(img)
+        if schedule.ready():
+            previous_id = smoother.stable_id
+            changed = smoother.update(frame_class_id, frame_confidence)
+            stable_id = smoother.stable_id
+            stable_desc = net.GetClassDesc(stable_id) if stable_id >= 0 else "unknown"
+            if changed and args.smoothing != "none":
+                # Stable label changed: report it without waiting for the interval
+                send_telemetry(stable_id, stable_desc, smoother.stable_conf, event="label_changed",
+                               previous_class_description=net.GetClassDesc(previous_id) if previous_id >= 0 else None)
+            timeline.update(stable_id, stable_desc, smoother.stable_conf, time.time())
+
+    class_id, confidence = smoother.stable_id, smoother.stable_conf
+    class_desc = net.GetClassDesc(class_id) if class_id >= 0 else "unknown"
 
     print(f"[INFER] {confidence * 100:.2f}% class #{class_id} ({class_desc})")
 
@@ -113,7 +161,10 @@ while True:
     # Telemetry
     current_time = time.time()
     if (current_time - last_send_time) >= TELEMETRY_INTERVAL:
-        send_telemetry(class_id, class_desc, confidence)
+        send_telemetry(class_id, class_desc, confidence,
+                       top_classes={net.GetClassDesc(c): round(f, 3) for c, f in smoother.top_classes()},
+                       action_segments=timeline.take(), **schedule.stats())
+        smoother.reset_interval()
         last_send_time = current_time
 
     if not input.IsStreaming() or not output.IsStreaming():
@@ -0,0 +1,221 @@
+import time
+import threading
+from collections import deque
+
+
+class batchResult:
+    """
+    Result of one submitted frame, filled in when its batch has run.
+    """
+    def __init__(self, frame, tag, callback):
+        self.frame = frame
+        self.tag = tag
+        self.callback = callback
+        self.submitted = time.monotonic()
+        self.completed = None
+        self.value = None
+        self.error = None
+        self.event = threading.Event()
+
+    def done(self):
+        return self.event.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Block until the result is ready and return it (re-raising a failed batch's error).
+        """
+        if not self.event.wait(timeout):
+            raise TimeoutError("batch result not ready")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def latency(self):
+        return (self.completed - self.submitted) if self.completed else None
+
+
+class frameBatcher:
+    """
+    Batching stage in front of a network.
+
+    Frames are submitted from any thread.  A worker thread starts a batch
+    with the oldest waiting frame and runs it once `max_batch` frames are
+    waiting or `max_wait_ms` has passed since that frame was submitted,
+    whichever comes first.  run_batch(frames) must return one result per
+    frame, in order; each frame's batchResult is then completed and its
+    callback(result, tag) called, in submission order.  A callback that
+    raises is logged and counted in stats(); it does not stop the worker.
+
+    A larger batch or a longer wait raises throughput on networks whose
+    cost per call is mostly fixed, at the price of latency; stats()
+    reports both.  Submitters are held back once `max_pending` frames are
+    waiting, so a fast producer cannot run ahead of the network.
+    """
+    def __init__(self, run_batch, max_batch=4, max_wait_ms=10.0, max_pending=None):
+        self.run_batch = run_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_pending = max_pending or 4 * self.max_batch
+        self.cond = threading.Condition()
+        self.queue = deque()
+        self.running = True
+        self.batches = 0
+        self.frames = 0
+        self.busy = 0.0
+        self.latency_sum = 0.0
+        self.callback_errors = 0
+        self.latencies = deque(maxlen=1000)
+        self.started = time.monotonic()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, frame, tag=None, callback=None):
+        """
+        Queue a frame and return its batchResult.
+        """
+        result = batchResult(frame, tag, callback)
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.queue) < self.max_pending or not self.running)
+            self.queue.append(result)
+            self.cond.notify_all()
+        return result
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def _next_batch(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self.queue or not self.running)
+            if not self.queue:
+                return None
+            deadline = self.queue[0].submitted + self.max_wait
+            while len(self.queue) < self.max_batch and self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch = [self.queue.popleft() for _ in range(min(self.max_batch, len(self.queue)))]
+            self.cond.notify_all()
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            start = time.monotonic()
+            try:
+                values, error = self.run_batch([item.frame for item in batch]), None
+                if len(values) != len(batch):
+                    raise ValueError(f"run_batch returned {len(values)} results for {len(batch)} frames")
+            except Exception as e:
+                values, error = [None] * len(batch), e
+            now = time.monotonic()
+            self.busy += now - start
+            self.batches += 1
+            self.frames += len(batch)
+            for item, value in zip(batch, values):
+                item.value, item.error, item.completed = value, error, now
+                self.latency_sum += now - item.submitted
+                self.latencies.append(now - item.submitted)
+                item.event.set()
+                if item.callback and error is None:
+                    try:
+                        item.callback(value, item.tag)
+                    except Exception as e:
+                        self.callback_errors += 1
+                        print(f"[BATCH] Result callback failed: {e}")
+
+    def stats(self):
+        """
+        Batching, throughput and latency figures since start.
+        """
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        latencies = sorted(self.latencies)
+        return {
+            "batches": self.batches,
+            "batch_size_mean": round(self.frames / max(self.batches, 1), 2),
+            "throughput_fps": round(self.frames / elapsed, 1),
+            "latency_mean_ms": round(self.latency_sum / max(self.frames, 1) * 1000.0, 1),
+            "latency_p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000.0, 1) if latencies else 0.0,
+            "network_busy": round(self.busy / elapsed, 2),
+            "callback_errors": self.callback_errors
+        }
+
+
+def sequential_batch(infer):
+    """
+    run_batch for networks that take one frame per call, like the
+    jetson-inference Python networks (whose TensorRT engines are built for
+    batch size 1).  Batching then only overlaps inference with capture.
+    """
+    return lambda frames: [infer(frame) for frame in frames]
+
+
+class stubBatchedNet:
+    """
+    CPU stand-in for a batched network: each call costs `fixed_ms` (launch
+    and synchronization overhead) plus `per_frame_ms` for every frame.
+    """
+    def __init__(self, fixed_ms=8.0, per_frame_ms=1.5):
+        self.fixed_ms = fixed_ms
+        self.per_frame_ms = per_frame_ms
+
+    def run(self, frames):
+        time.sleep((self.fixed_ms + self.per_frame_ms * len(frames)) / 1000.0)
+        return [("result", frame) for frame in frames]
+
+
+if __name__ == "__main__":
+    # Sweep batch size and wait time: 4 cameras at 30 FPS, and recorded footage as fast as possible
+    def live(batcher, streams=4, fps=30.0, seconds=2.0):
+        def camera(stream):
+            frame, next_time = 0, time.monotonic()
+            while time.monotonic() < end:
+                batcher.submit((stream, frame))
+                frame += 1
+                next_time += 1.0 / fps
+                time.sleep(max(0.0, next_time - time.monotonic()))
+        end = time.monotonic() + seconds
+        threads = [threading.Thread(target=camera, args=(s,)) for s in range(streams)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def footage(batcher, seconds=2.0):
+        end = time.monotonic() + seconds
+        frame = 0
+        while time.monotonic() < end:
+            batcher.submit(frame)
+            frame += 1
+
+    # Results come back in submission order
+    batcher = frameBatcher(stubBatchedNet(1.0, 0.1).run, max_batch=8, max_wait_ms=5)
+    order = []
+    results = [batcher.submit(i, callback=lambda value, tag: order.append(value[1])) for i in range(100)]
+    assert [r.wait(5) for r in results] == [("result", i) for i in range(100)] and order == list(range(100))
+    batcher.close()
+
+    # A failing callback is counted, and the worker keeps going past max_pending
+    def flaky(value, tag):
+        if value[1] % 10 == 0:
+            raise RuntimeError(f"callback failed on frame {value[1]}")
+    batcher = frameBatcher(stubBatchedNet(1.0, 0.1).run, max_batch=4, max_wait_ms=1, max_pending=8)
+    results = [batcher.submit(i, callback=flaky) for i in range(50)]
+    assert results[-1].wait(5) == ("result", 49) and batcher.stats()["callback_errors"] == 5
+    batcher.close()
+
+    net = stubBatchedNet(fixed_ms=8.0, per_frame_ms=1.5)
+    for name, load in (("4 cameras x 30 FPS", live), ("recorded footage", footage)):
+        print(f"{name} (stub net: {net.fixed_ms:.0f} ms per call + {net.per_frame_ms} ms per frame)")
+        for max_batch in (1, 2, 4, 8, 16):
+            for max_wait_ms in ((0, 5, 20, 50) if load is live else (0, 20)):
+                batcher = frameBatcher(net.run, max_batch, max_wait_ms)
+                load(batcher)
+                stats = batcher.stats()
+                batcher.close()
+                print(f"  B={max_batch:2d} T={max_wait_ms:2d}ms: {stats['throughput_fps']:6.1f} FPS, "
+                      f"batch {stats['batch_size_mean']:5.2f}, latency mean {stats['latency_mean_ms']:6.1f} ms "
+                      f"p95 {stats['latency_p95_ms']:6.1f} ms, net busy {stats['network_busy']:.0%}")
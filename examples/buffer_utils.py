@@ -0,0 +1,102 @@
+class frameBuffers:
+    """
+    Allocates a demo's per-resolution buffers once and reallocates them
+    only when the input resolution or format changes.
+
+    `allocate(img)` creates the buffers for `img` and returns a
+    dict of anything derived from them (typically NumPy views from
+    cudaToNumpy), kept in `views` until the next resolution change, so
+    the frame loop never re-wraps a buffer.  Reallocations are counted for
+    telemetry: the total, and how many happened on the last frame.
+    """
+    def __init__(self, allocate):
+        self.allocate = allocate
+        self.shape = None
+        self.views = {}
+        self.allocations = 0
+        self.last_frame_allocations = 0
+        self.frames = 0
+
+    def update(self, img):
+        """
+        Call once per frame with the input image.  Returns True if the buffers were (re)allocated.
+        """
+        self.frames += 1
+        shape = (img.width, img.height, img.format)
+        if shape == self.shape:
+            self.last_frame_allocations = 0
+            return False
+        if self.shape is not None:
+            print(f"[BUFFERS] Input changed from {self.shape[0]}x{self.shape[1]} {self.shape[2]} "
+                  f"to {shape[0]}x{shape[1]} {shape[2]}, reallocating")
+        self.shape = shape
+        self.views = self.allocate(img) or {}
+        self.allocations += 1
+        self.last_frame_allocations = 1
+        return True
+
+    def __getitem__(self, name):
+        return self.views[name]
+
+    def stats(self):
+        return {
+            "buffer_allocations": self.allocations,
+            "buffer_allocations_last_frame": self.last_frame_allocations
+        }
+
+
+class stubImage:
+    def __init__(self, width, height, format="rgb8"):
+        self.width, self.height, self.format = width, height, format
+        self.shape = (height, width, 3)
+
+
+class stubAllocator:
+    """
+    Counts stand-in cudaAllocMapped() and cudaToNumpy() calls.
+    """
+    def __init__(self):
+        self.allocs = 0
+        self.wraps = 0
+
+    def cudaAllocMapped(self, width, height, format):
+        self.allocs += 1
+        return stubImage(width, height, format)
+
+    def cudaToNumpy(self, img):
+        self.wraps += 1
+        return object()
+
+
+if __name__ == "__main__":
+    # 1000 frames with a camera resolution change halfway, before and after
+    frames = [stubImage(1280, 720)] * 500 + [stubImage(1920, 1080)] * 500
+
+    # Before: buffers checked and NumPy views re-wrapped every frame, like the old depthnet/segnet2 loops
+    cuda = stubAllocator()
+    depth = mask = None
+    for img in frames:
+        if depth is None or (depth.width, depth.height) != (img.width, img.height):
+            depth = cuda.cudaAllocMapped(img.width, img.height, "gray32f")
+            mask = cuda.cudaAllocMapped(img.width, img.height, "gray8")
+        depth_np = cuda.cudaToNumpy(depth)
+        mask_np = cuda.cudaToNumpy(mask)
+    print(f"per-frame wrapping:  {cuda.allocs} allocations, {cuda.wraps} NumPy wraps over {len(frames)} frames")
+
+    # After: frameBuffers allocates and wraps once per resolution
+    cuda = stubAllocator()
+
+    def allocate(img):
+        depth = cuda.cudaAllocMapped(img.width, img.height, "gray32f")
+        mask = cuda.cudaAllocMapped(img.width, img.height, "gray8")
+        return {"depth": depth, "depth_np": cuda.cudaToNumpy(depth), "mask_np": cuda.cudaToNumpy(mask)}
+
+    buffers = frameBuffers(allocate)
+    per_frame = []
+    for img in frames:
+        buffers.update(img)
+        depth_np, mask_np = buffers["depth_np"], buffers["mask_np"]
+        per_frame.append(buffers.last_frame_allocations)
+    assert buffers.allocations == 2 and sum(per_frame) == 2 and per_frame[0] == 1 and per_frame[500] == 1
+    print(f"frameBuffers:        {cuda.allocs} allocations, {cuda.wraps} NumPy wraps over {len(frames)} frames, "
+          f"stats {buffers.stats()}")
@@ -0,0 +1,313 @@
+import os
+import time
+import threading
+
+
+def is_file_input(uri):
+    """
+    True for recorded inputs, whose end means the demo is done rather than the camera being down.
+    """
+    return uri.startswith("file://") or os.path.isfile(uri)
+
+
+class captureManager:
+    """
+    Captures from a video source on its own thread so the inference loop
+    never sleeps or spins on a missing camera.
+
+    The thread keeps at most one frame ready ahead of the consumer, so no
+    more than two of the source's buffers are in use at a time.  Capture()
+    waits on a condition for that frame.  If the source raises, or
+    delivers nothing for `stall_timeout` seconds, the camera is reported
+    down through on_status("camera_down", info) and reopened with an
+    exponential backoff; the first frame afterwards reports "camera_up".
+    Live sources that stop streaming are reopened the same way; for file
+    inputs (reopen_on_eos=False), end of stream ends IsStreaming().
+
+    While the camera is down, Capture() returns None but alive() stays
+    True, so the demo keeps its heartbeat going through the outage.
+    alive() only turns False when opening or reading the source has
+    blocked for more than `hang_timeout` seconds.
+    """
+    def __init__(self, opener, name="camera", timeout=1000, stall_timeout=3.0, backoff_initial=0.5,
+                 backoff_max=8.0, reopen_on_eos=True, on_status=None, hang_timeout=20.0):
+        self.opener = opener
+        self.name = name
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.reopen_on_eos = reopen_on_eos
+        self.on_status = on_status or (lambda event, info: None)
+        self.hang_timeout = hang_timeout
+
+        self.cond = threading.Condition()
+        self.source = None
+        self.frame = None
+        self.frame_time = 0
+        self.last_frame_time = time.monotonic()
+        self.last_age = 0.0
+        self.up = False
+        self.down_since = None
+        self.eos = False
+        self.running = True
+        self.reopens = 0
+        self.blocked_since = None
+        threading.Thread(target=self._capture_loop, daemon=True).start()
+
+    def Capture(self, timeout=1000):
+        """
+        Return the next frame, waiting up to `timeout` ms, or None.
+        """
+        with self.cond:
+            if self.frame is None and timeout:
+                self.cond.wait_for(lambda: self.frame is not None or self.eos, timeout / 1000.0)
+            frame, self.frame = self.frame, None
+            if frame is not None:
+                self.last_age = time.monotonic() - self.frame_time
+                self.cond.notify_all()
+            return frame
+
+    def IsStreaming(self):
+        return not self.eos
+
+    def alive(self):
+        """
+        False if the capture thread has been stuck in the source for more than hang_timeout seconds.
+        """
+        blocked_since = self.blocked_since
+        return blocked_since is None or time.monotonic() - blocked_since < self.hang_timeout
+
+    def frame_age(self):
+        """
+        Seconds the last returned frame waited between capture and Capture().
+        """
+        return self.last_age
+
+    def stats(self):
+        return {
+            "camera_up": self.up,
+            "camera_reopens": self.reopens,
+            "frame_age_ms": round(self.last_age * 1000.0, 1)
+        }
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def _capture_loop(self):
+        backoff = self.backoff_initial
+        while self.running:
+            if self.source is None:
+                try:
+                    self.source = self._blocking(self.opener)
+                    self.last_frame_time = time.monotonic()
+                    backoff = self.backoff_initial
+                except Exception as e:
+                    self._down(f"open failed: {e}")
+                    self._sleep(backoff)
+                    backoff = min(backoff * 2, self.backoff_max)
+                    continue
+
+            # Wait for the consumer to take the frame already captured
+            with self.cond:
+                self.cond.wait_for(lambda: self.frame is None or not self.running)
+            if not self.running:
+                break
+
+            started = time.monotonic()
+            try:
+                img = self._blocking(self.source.Capture, timeout=self.timeout)
+            except Exception as e:
+                self._down(f"capture failed: {e}")
+                self._reopen(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+                continue
+
+            if img is not None:
+                with self.cond:
+                    self.frame = img
+                    self.frame_time = self.last_frame_time = time.monotonic()
+                    self.cond.notify_all()
+                self._up()
+                continue
+
+            if not self.source.IsStreaming():
+                if not self.reopen_on_eos:
+                    with self.cond:
+                        self.eos = True
+                        self.cond.notify_all()
+                    break
+                self._down("stream ended")
+                self._reopen(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+            elif time.monotonic() - self.last_frame_time > self.stall_timeout:
+                self._down(f"no frames for {self.stall_timeout:.0f}s")
+                self._reopen(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+            elif time.monotonic() - started < 0.005:
+                # The source gave up without waiting; don't retry in a tight loop
+                self._sleep(min(self.timeout / 1000.0, 0.05))
+
+    def _blocking(self, call, **kwargs):
+        """
+        Call into the source, marking the thread as blocked for alive().
+        """
+        self.blocked_since = time.monotonic()
+        try:
+            return call(**kwargs)
+        finally:
+            self.blocked_since = None
+
+    def _reopen(self, delay):
+        self.source = None
+        self.reopens += 1
+        self._sleep(delay)
+
+    def _sleep(self, delay):
+        with self.cond:
+            self.cond.wait_for(lambda: not self.running, delay)
+
+    def _down(self, reason):
+        print(f"[CAPTURE] {self.name}: {reason}")
+        if self.up or self.down_since is None:
+            self.up = False
+            self.down_since = time.monotonic()
+            self._status("camera_down", {"source": self.name, "reason": reason})
+
+    def _up(self):
+        if not self.up:
+            if self.down_since is not None:
+                self._status("camera_up", {"source": self.name,
+                                           "downtime": round(time.monotonic() - self.down_since, 1)})
+            self.up = True
+            self.down_since = None
+
+    def _status(self, event, info):
+        # A failing callback must not end the capture thread
+        try:
+            self.on_status(event, info)
+        except Exception as e:
+            print(f"[CAPTURE] {self.name}: {event} callback failed: {e}")
+
+
+def status_reporter(send, demo_name):
+    """
+    on_status callback sending camera_down / camera_up as telemetry events.
+    """
+    return lambda event, info: send(dict(info, event=event, demo_name=demo_name, timestamp=int(time.time())))
+
+
+def open_capture(uri, argv=None, on_status=None):
+    """
+    Open a framebus:// or videoSource URI behind a captureManager.
+    """
+    from framebus_utils import open_source
+    return captureManager(lambda: open_source(uri, argv), name=uri, reopen_on_eos=not is_file_input(uri),
+                          on_status=on_status)
+
+
+class fakeCamera:
+    """
+    Stand-in for videoSource following a script of (behaviour, seconds):
+    "ok" delivers frames at 30 FPS, "none" returns None immediately,
+    "stall" blocks for the whole timeout, "raise" raises, "unplugged"
+    makes opening fail, "hang" blocks until the behaviour ends.
+    """
+    script = []
+    start = 0
+
+    @classmethod
+    def behaviour(cls):
+        elapsed = time.monotonic() - cls.start
+        for name, seconds in cls.script:
+            if elapsed < seconds:
+                return name
+            elapsed -= seconds
+        return "ok"
+
+    @classmethod
+    def open(cls):
+        if cls.behaviour() == "unplugged":
+            raise RuntimeError("failed to open /dev/video0")
+        return cls()
+
+    def Capture(self, timeout=1000):
+        behaviour = self.behaviour()
+        if behaviour == "ok":
+            time.sleep(1 / 30)
+            return object()
+        if behaviour == "stall":
+            time.sleep(timeout / 1000.0)
+            return None
+        if behaviour == "hang":
+            while self.behaviour() == "hang":
+                time.sleep(0.05)
+            return None
+        if behaviour in ("raise", "unplugged"):
+            raise RuntimeError("videoSource failed to capture image")
+        return None
+
+    def IsStreaming(self):
+        return True
+
+
+if __name__ == "__main__":
+    # Inference loop at 20 FPS against a camera that stalls, returns None, raises, is unplugged
+    # for longer than the watchdog's timeout and finally hangs inside Capture()
+    fakeCamera.script = [("ok", 1.0), ("stall", 4.0), ("ok", 1.0), ("none", 4.0), ("ok", 1.0),
+                         ("raise", 0.5), ("unplugged", 6.0), ("ok", 1.5), ("hang", 4.0), ("ok", 1.0)]
+    fakeCamera.start = time.monotonic()
+    hang_start = sum(seconds for _, seconds in fakeCamera.script[:-2])
+    events = []
+    capture = captureManager(fakeCamera.open, name="fake0", timeout=500, stall_timeout=2.0, hang_timeout=2.0,
+                             on_status=lambda event, info: events.append((round(time.monotonic() - fakeCamera.start, 1), event, info)))
+    frames = iterations = 0
+    # Heartbeats as the demos send them: on every frame, and while the camera is down but not hung
+    last_beat = time.monotonic()
+    beat_gaps = []
+    end = time.monotonic() + sum(seconds for _, seconds in fakeCamera.script)
+    cpu_start = time.process_time()
+    while time.monotonic() < end:
+        iterations += 1
+        img = capture.Capture(timeout=1000)
+        if img is not None or capture.alive():
+            now = time.monotonic()
+            beat_gaps.append((round(now - fakeCamera.start, 1), now - last_beat))
+            last_beat = now
+        if img is None:
+            continue
+        frames += 1
+        time.sleep(0.05)  # simulated inference
+    capture.close()
+    for event in events:
+        print(event)
+    print(f"{frames} frames in {iterations} loop iterations, {capture.reopens} reopens, "
+          f"CPU {time.process_time() - cpu_start:.2f}s, stats {capture.stats()}")
+
+    outage_gap = max(gap for at, gap in beat_gaps if at < hang_start)
+    hang_gap = max(gap for at, gap in beat_gaps if at >= hang_start)
+    print(f"longest heartbeat gap: {outage_gap:.1f}s through the outages, {hang_gap:.1f}s across the hang")
+    assert outage_gap < 1.5, "camera outage would trip the watchdog"
+    assert hang_gap > 2.0, "hung capture thread kept the heartbeat going"
+    assert [event for _, event, _ in events].count("camera_up") >= 3
+
+    # Camera missing at startup, then plugged in: camera_down then camera_up, even though the
+    # status callback raises every time
+    fakeCamera.script = [("unplugged", 1.0), ("ok", 1.5)]
+    fakeCamera.start = time.monotonic()
+    events = []
+
+    def failing_status(event, info):
+        events.append(event)
+        raise RuntimeError("telemetry not ready")
+
+    capture = captureManager(fakeCamera.open, name="fake1", timeout=500, on_status=failing_status)
+    frames = 0
+    end = time.monotonic() + 2.5
+    while time.monotonic() < end:
+        frames += capture.Capture(timeout=200) is not None
+    capture.close()
+    print(f"startup failure: events {events}, {frames} frames")
+    assert events == ["camera_down", "camera_up"] and frames > 10 and capture.stats()["camera_up"]
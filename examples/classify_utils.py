@@ -0,0 +1,175 @@
+import time
+import numpy as np
+
+
+class classificationSmoother:
+    """
+    Streaming post-processor for per-frame Classify() results.
+
+    Frames below the confidence threshold are ignored.  The remaining
+    results are smoothed either with an exponential moving average
+    (mode="ema") or a confidence-weighted vote over the last `window`
+    frames (mode="vote"), both kept in preallocated arrays.
+
+    The stable label changes with hysteresis: another class takes over
+    once it scores above the threshold and at least `margin` above the
+    stable class for `dwell` consecutive frames, and the label returns to
+    unknown (-1) once the stable class has scored below threshold - margin
+    for `dwell` frames.  Short flicker therefore never changes the label.
+    With mode="none" the stable label is simply the latest result.
+    """
+    def __init__(self, num_classes, mode="ema", window=15, alpha=0.2, threshold=0.3, top_k=3,
+                 margin=0.1, dwell=3):
+        if mode not in ("ema", "vote", "none"):
+            raise ValueError(f"unknown smoothing mode '{mode}'")
+        self.num_classes = num_classes
+        self.mode = mode
+        self.window = max(1, int(window))
+        self.alpha = float(alpha)
+        self.threshold = float(threshold)
+        self.top_k = int(top_k)
+        self.margin = float(margin)
+        self.dwell = max(1, int(dwell))
+
+        # ring buffer of the last `window` results (-1 = gated out)
+        self.ids = np.full(self.window, -1, dtype=np.int32)
+        self.confs = np.zeros(self.window, dtype=np.float32)
+        self.pos = 0
+
+        self.scores = np.zeros(num_classes, dtype=np.float32)
+        self.interval_counts = np.zeros(num_classes, dtype=np.int64)
+        self.interval_frames = 0
+
+        self.stable_id = -1
+        self.stable_conf = 0.0
+        self.candidate = None
+        self.candidate_frames = 0
+
+    def update(self, class_id, confidence):
+        """
+        Add one frame's top-1 result.  Returns True if the stable label changed.
+        """
+        self.interval_frames += 1
+        if class_id < 0 or class_id >= self.num_classes or confidence < self.threshold:
+            class_id, confidence = -1, 0.0
+        else:
+            self.interval_counts[class_id] += 1
+
+        if self.mode == "ema":
+            self.scores *= (1.0 - self.alpha)
+            if class_id >= 0:
+                self.scores[class_id] += self.alpha * confidence
+        elif self.mode == "vote":
+            # incremental windowed vote: retire the oldest entry, add the newest
+            old_id = self.ids[self.pos]
+            if old_id >= 0:
+                self.scores[old_id] -= self.confs[self.pos] / self.window
+            if class_id >= 0:
+                self.scores[class_id] += confidence / self.window
+        else:
+            self.scores[:] = 0.0
+            if class_id >= 0:
+                self.scores[class_id] = confidence
+
+        self.ids[self.pos] = class_id
+        self.confs[self.pos] = confidence
+        self.pos = (self.pos + 1) % self.window
+
+        best = int(self.scores.argmax())
+        best_score = float(self.scores[best])
+        if self.stable_id >= 0:
+            self.stable_conf = float(self.scores[self.stable_id])
+
+        if self.mode == "none":
+            target = best if best_score >= self.threshold else -1
+            return self._switch(target, best_score if target >= 0 else 0.0)
+
+        if best != self.stable_id and best_score >= self.threshold and best_score >= self.stable_conf + self.margin:
+            target = best
+        elif self.stable_id >= 0 and self.stable_conf < self.threshold - self.margin:
+            target = -1
+        else:
+            self.candidate, self.candidate_frames = None, 0
+            return False
+
+        # The same change has to be called for on `dwell` consecutive frames
+        if target != self.candidate:
+            self.candidate, self.candidate_frames = target, 0
+        self.candidate_frames += 1
+        if self.candidate_frames < self.dwell:
+            return False
+        self.candidate, self.candidate_frames = None, 0
+        return self._switch(target, best_score if target >= 0 else 0.0)
+
+    def _switch(self, class_id, confidence):
+        changed = class_id != self.stable_id
+        self.stable_id = class_id
+        self.stable_conf = confidence
+        return changed
+
+    def top_classes(self):
+        """
+        Return the top-K (class_id, fraction of frames) over the current interval.
+        """
+        if self.interval_frames == 0:
+            return []
+        k = min(self.top_k, self.num_classes)
+        top = np.argpartition(self.interval_counts, -k)[-k:]
+        top = top[np.argsort(self.interval_counts[top])[::-1]]
+        return [(int(c), float(self.interval_counts[c]) / self.interval_frames)
+                for c in top if self.interval_counts[c] > 0]
+
+    def reset_interval(self):
+        self.interval_counts[:] = 0
+        self.interval_frames = 0
+
+
+def add_smoothing_args(parser):
+    """
+    Register the command-line options used by classificationSmoother.
+    """
+    parser.add_argument("--smoothing", type=str, default="ema", choices=["ema", "vote", "none"],
+                        help="temporal smoothing of the classification results")
+    parser.add_argument("--smoothing-window", type=int, default=15,
+                        help="number of frames in the voting window")
+    parser.add_argument("--smoothing-alpha", type=float, default=0.2,
+                        help="weight of the newest frame for EMA smoothing")
+    parser.add_argument("--confidence-threshold", type=float, default=0.3,
+                        help="minimum confidence for a frame or label to count")
+    parser.add_argument("--smoothing-margin", type=float, default=0.1,
+                        help="score lead another class needs over the stable label to replace it")
+    parser.add_argument("--smoothing-dwell", type=int, default=3,
+                        help="consecutive frames a label change must hold before it is reported")
+    parser.add_argument("--top-k", type=int, default=3,
+                        help="number of classes reported per telemetry interval")
+
+
+if __name__ == "__main__":
+    # Scripted sequence: class 3 with 10% single-frame flicker to 7, a switch to 5 at frame 1500,
+    # and from frame 3000 only results below the confidence threshold
+    rng = np.random.default_rng(0)
+    labels = np.where(rng.random(3000) < 0.1, 7, 3)
+    labels[1500:] = np.where(rng.random(1500) < 0.1, 7, 5)
+    labels = np.concatenate([labels, rng.integers(0, 1000, 200)])
+    confidences = rng.uniform(0.4, 0.9, labels.shape)
+    confidences[3000:] = rng.uniform(0.05, 0.25, 200)
+
+    for mode in ("none", "ema", "vote"):
+        smoother = classificationSmoother(1000, mode=mode)
+        changes = []
+        start = time.perf_counter()
+        for frame, (class_id, confidence) in enumerate(zip(labels.tolist(), confidences.tolist())):
+            if smoother.update(class_id, confidence):
+                changes.append((frame, smoother.stable_id))
+        elapsed = time.perf_counter() - start
+        print(f"{mode:5s}: {len(changes):4d} label changes {changes[:6]}{' ...' if len(changes) > 6 else ''}, "
+              f"{elapsed * 1e6 / len(labels):.1f} us/frame")
+        if mode == "none":
+            continue
+
+        # Exactly unknown -> 3 -> 5 -> unknown, each within a short delay of the input changing
+        assert [label for _, label in changes] == [3, 5, -1], changes
+        assert changes[0][0] < 20 and 1500 <= changes[1][0] < 1530 and 3000 <= changes[2][0] < 3030, changes
+        smoother.reset_interval()
+        smoother.update(5, 0.8)
+        assert smoother.top_classes() == [(5, 1.0)]
@@ -6,19 +6,28 @@ import os
 import time
 import numpy as np
 import socket
-import json
+import threading
 
 from jetson_inference import depthNet
 from jetson_utils import videoSource, videoOutput, cudaOverlay, cudaDeviceSynchronize, cudaToNumpy, Log
 
 from depthnet_utils import depthBuffers
+from proximity_utils import proximityAlerts
+from model_utils import load_model_argv
+from throttle_utils import frameThrottle, handle_throttle_command
+from iotc_utils import start_command_listener, telemetry_socket_path, heartbeatWriter
+from record_utils import add_record_args, create_recorder, stageTimer
+from capture_utils import open_capture, status_reporter
+from output_utils import add_output_args, create_output, handle_output_command
+from buffer_utils import frameBuffers
+from schema_utils import payload_builder
 
 # Demo metadata
 DEMO_NAME = "depthnet"
 DEMO_VERSION = "1.0"
 
 # Path to the IoTConnect Unix socket
-SOCKET_PATH = (
+SOCKET_PATH = telemetry_socket_path(
     "/var/snap/iotconnect/common/iotc.sock"
     if os.path.exists("/var/snap/iotconnect/common/iotc.sock")
     else os.path.expanduser("~/snap/iotconnect/common/iotc.sock")
@@ -28,46 +37,80 @@ TELEMETRY_INTERVAL = 7.0
 
 # Name of the model being used
 MODEL_NAME = None
+# Payload builder for the telemetry messages, compiled once the model is known
+TELEMETRY = None
 # Last time telemetry was sent
 last_send_time = 0
 
+# Proximity alert zones, configured via the command socket
+alerts = proximityAlerts()
+# Frame rate cap / inference stride, adjusted by the launcher
+throttle = frameThrottle()
+
 def send_telemetry(payload):
     """
-    Send a JSON payload over the IoTConnect Unix socket.
+    Send a message over the IoTConnect Unix socket: a line from the
+    payload builder, or a dict (events) encoded by it.
     """
     try:
+        line = payload if isinstance(payload, str) else TELEMETRY.encode(payload)
         s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         s.settimeout(1.0)
         s.connect(SOCKET_PATH)
-        s.send((json.dumps(payload) + "\n").encode("utf-8"))
+        s.send(line.encode("utf-8"))
         s.close()
-        print(f"[TELEMETRY] Sent: {payload}")
+        print(f"[TELEMETRY] Sent: {line.rstrip()}")
     except Exception as e:
         print(f"[SOCKET] Send failed: {e}")
 
 
+def send_alert(event, zone, depth, threshold):
+    """
+    Send a proximity event immediately, outside the periodic telemetry
+    schedule, without blocking the frame loop on the socket.
+    """
+    telemetry = {
+        "timestamp": int(time.time()),
+        "demo_name": DEMO_NAME,
+        "demo_version": DEMO_VERSION,
+        "model_name": MODEL_NAME,
+        "event": event,
+        "priority": "high",
+        "zone": zone,
+        "depth_m": round(depth, 3),
+        "threshold_m": round(threshold, 3)
+    }
+    threading.Thread(target=send_telemetry, args=(telemetry,), daemon=True).start()
+
+
+def handle_command(cmd, args):
+    """
+    Proximity zone commands:
+      set_proximity_zone <name> <x> <y> <w> <h> <threshold_m> [hysteresis_m]
+      clear_proximity_zone [name]
+      set_proximity_hysteresis <hysteresis_m>
+    Zone coordinates are fractions (0..1) of the depth field.
+    """
+    if cmd == "set_proximity_zone" and len(args) >= 6:
+        alerts.set_zone(args[0], *[float(a) for a in args[1:8]])
+    elif cmd == "clear_proximity_zone":
+        alerts.clear_zone(args[0] if args else None)
+        print(f"[CMD] Cleared proximity zone(s): {args or 'all'}")
+    elif cmd == "set_proximity_hysteresis" and args:
+        alerts.set_hysteresis(float(args[0]))
+        print(f"[CMD] Proximity hysteresis set to {args[0]}")
+    else:
+        handle_throttle_command(throttle, cmd, args) or handle_output_command(output, cmd, args)
+
+
 def load_model_from_config(argv):
     """
-    Read current-model.txt to determine which model to load,
+    Resolve the current model from the depthnet model catalog,
     set MODEL_NAME, and append the --model and related flags to argv.
     """
     global MODEL_NAME
-    base = "/var/snap/iotconnect/common/models/depthnet"
-    model_name = "fcn-mobilenet.onnx"
-    try:
-        with open(os.path.join(base, "current-model.txt"), 'r') as f:
-            model_name = f.read().strip()
-    except Exception as e:
-        print(f"[MODEL] Error reading {base}/current-model.txt: {e}")
-
-    MODEL_NAME = model_name
-    model_path = os.path.join(base, MODEL_NAME)
-    labels_path = os.path.join(base, "labels.txt")
-
-    argv += [
-        f"--model={model_path}",
-        f"--labels={labels_path}"
-    ]
+    MODEL_NAME, flags = load_model_argv("depthnet")
+    argv += flags
 
 
 if __name__ == '__main__':
@@ -92,6 +135,12 @@ if __name__ == '__main__':
                                  "parula", "parula-inverted", "plasma", "plasma-inverted", 
                                  "turbo", "turbo-inverted", "viridis", "viridis-inverted"],
                         help="colormap for visualization")
+    parser.add_argument("--proximity-zone", type=str, action="append", default=[],
+                        help="proximity zone as name,x,y,w,h,threshold[,hysteresis] (repeatable)")
+    parser.add_argument("--proximity-grid", type=int, default=16,
+                        help="size of the downsampled grid used for proximity alerts")
+    add_record_args(parser)
+    add_output_args(parser)
     args = parser.parse_known_args()[0]
 
     # Load model (OTA or override)
@@ -101,48 +150,96 @@ if __name__ == '__main__':
     else:
         load_model_from_config(sys.argv)
         net = depthNet("custom", sys.argv)
+    TELEMETRY = payload_builder("depthnet", demo_name=DEMO_NAME, demo_version=DEMO_VERSION, model_name=MODEL_NAME)
 
     buffers = depthBuffers(args)
-    input = videoSource(args.input, argv=sys.argv)
-    output = videoOutput(args.output, argv=sys.argv)
 
+    def allocate(img):
+        buffers.Alloc(img.shape, img.format)
+        return {"depth_np": cudaToNumpy(buffers.depth)}
+
+    # Buffers and their NumPy views are only (re)made when the input resolution changes
+    frame_buffers = frameBuffers(allocate)
+
+    # The raw depth field lives in mapped memory owned by the network,
+    # so it is wrapped once and re-read every frame without copying.
+    depth_field = cudaToNumpy(net.GetDepthField())
+    alerts.grid_h = alerts.grid_w = args.proximity_grid
+    for zone in args.proximity_zone:
+        name, *values = zone.split(",")
+        alerts.set_zone(name, *[float(v) for v in values])
+
+    input = open_capture(args.input, sys.argv, status_reporter(send_telemetry, DEMO_NAME))
+    output = create_output(args, args.output, sys.argv)
+    start_command_listener(handle_command)
+    recorder = create_recorder(args, DEMO_NAME, {"model_name": MODEL_NAME, "sources": [args.input],
+                                                 "zones": sorted(alerts.zones)})
+    timer = stageTimer()
+
+    heartbeat = heartbeatWriter()
     # Main loop
     while True:
+        timer.start()
         img_input = input.Capture()
         if img_input is None:
+            if input.alive():
+                heartbeat.beat(0)  # camera down or reopening, not hung
+            continue
+        heartbeat.beat()
+        timer.mark("capture")
+
+        # When throttled by the launcher, drop frames between inference strides
+        if not throttle.should_infer():
+            throttle.wait()
             continue
 
-        buffers.Alloc(img_input.shape, img_input.format)
+        frame_buffers.update(img_input)
         net.Process(img_input, buffers.depth, args.colormap, args.filter_mode)
 
-        if buffers.use_input:
-            cudaOverlay(img_input, buffers.composite, 0, 0)
-        if buffers.use_depth:
-            x = img_input.width if buffers.use_input else 0
-            cudaOverlay(buffers.depth, buffers.composite, x, 0)
+        # The colorized depth also feeds telemetry; only the composite is skipped on frames not shown
+        if output.next_frame():
+            if buffers.use_input:
+                cudaOverlay(img_input, buffers.composite, 0, 0)
+            if buffers.use_depth:
+                x = img_input.width if buffers.use_input else 0
+                cudaOverlay(buffers.depth, buffers.composite, x, 0)
 
         output.Render(buffers.composite)
         output.SetStatus(f"{MODEL_NAME} | depthNet {net.GetNetworkName()} | {net.GetNetworkFPS():.0f} FPS")
 
         cudaDeviceSynchronize()
         #net.PrintProfilerTimes()
+        timer.mark("inference")
+
+        # Proximity alerts are evaluated every frame, events sent right away
+        events = alerts.evaluate(depth_field)
+        for event in events:
+            print(f"[ALERT] {event[0]} zone={event[1]} depth={event[2]:.2f} threshold={event[3]:.2f}")
+            send_alert(*event)
 
         # Telemetry
         current_time = time.time()
         if (current_time - last_send_time) >= TELEMETRY_INTERVAL:
-            depth_np = cudaToNumpy(buffers.depth)
+            depth_np = frame_buffers["depth_np"]
             if depth_np.size > 0:
-                telemetry = {
-                    "timestamp": int(current_time),
-                    "demo_name": DEMO_NAME,
-                    "demo_version": DEMO_VERSION,
-                    "model_name": MODEL_NAME,
-                    "average_depth_m": round(float(np.mean(depth_np)), 3),
-                    "min_depth_m": round(float(np.min(depth_np)), 3),
-                    "max_depth_m": round(float(np.max(depth_np)), 3)
-                }
-                send_telemetry(telemetry)
+                send_telemetry(TELEMETRY.build(
+                    int(current_time),
+                    round(float(np.mean(depth_np)), 3),
+                    round(float(np.min(depth_np)), 3),
+                    round(float(np.max(depth_np)), 3),
+                    **frame_buffers.stats()
+                ))
             last_send_time = current_time
+        timer.mark("telemetry")
+
+        # The depth grid is what proximity alerts see, a compact stand-in for the full field
+        if recorder:
+            recorder.record(results=[[e, zone, float(d), float(t)] for e, zone, d, t in events],
+                            arrays={"depth_grid": alerts.downsample(depth_field).astype(np.float32)},
+                            timings=timer.timings, source=args.input,
+                            frame=cudaToNumpy(img_input) if recorder.thumb_width else None)
+
+        throttle.wait()
 
         if not input.IsStreaming() or not output.IsStreaming():
             break
@@ -5,16 +5,32 @@ import argparse
 import os
 import time
 import socket
-import json
-from jetson_inference import detectNet
-from jetson_utils import videoSource, videoOutput, cudaFont, Log
+import numpy as np
+try:
+    from jetson_inference import detectNet
+    from jetson_utils import videoSource, videoOutput, cudaFont, cudaDrawRect, cudaToNumpy, Log
+except ImportError:
+    # --replay runs the post-processing and telemetry stages without jetson-inference
+    detectNet = None
+
+from model_utils import load_model_argv
+from roi_utils import add_roi_args, create_cropper, handle_roi_command, map_boxes
+from multisource_utils import multiSource
+from motion_utils import add_motion_args, create_motion_gate, handle_motion_command
+from throttle_utils import frameThrottle, handle_throttle_command
+from iotc_utils import start_command_listener, telemetry_socket_path, heartbeatWriter
+from record_utils import add_record_args, create_recorder, recording, stageTimer
+from count_utils import add_count_args, class_labels, classCounter, parse_class_map
+from capture_utils import status_reporter
+from output_utils import add_output_args, create_output, handle_output_command
+from schema_utils import payload_builder
 
 # Demo metadata
 DEMO_NAME = "detectnet"
 DEMO_VERSION = "1.0"
 
 # Path to the IoTConnect Unix socket
-SOCKET_PATH = (
+SOCKET_PATH = telemetry_socket_path(
     "/var/snap/iotconnect/common/iotc.sock"
     if os.path.exists("/var/snap/iotconnect/common/iotc.sock")
     else os.path.expanduser("~/snap/iotconnect/common/iotc.sock")
@@ -24,52 +40,150 @@ TELEMETRY_INTERVAL = 7.0
 
 # Name of the model being used
 MODEL_NAME = None
+# Payload builders for the per-detection and per-interval count messages, compiled once the model is known
+DETECTION_MESSAGE = None
+COUNT_MESSAGE = None
 # Last time telemetry was sent
 last_send_time = 0
 
 
 def send_telemetry(payload):
     """
-    Send a JSON payload over the IoTConnect Unix socket.
+    Send a message over the IoTConnect Unix socket: a line from a
+    payload builder, or a dict (events) encoded like the count message.
     """
     try:
+        line = payload if isinstance(payload, str) else COUNT_MESSAGE.encode(payload)
         s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         s.settimeout(1.0)
         s.connect(SOCKET_PATH)
-        s.send((json.dumps(payload) + "\n").encode("utf-8"))
+        s.send(line.encode("utf-8"))
         s.close()
-        print(f"[TELEMETRY] Sent: {payload}")
+        print(f"[TELEMETRY] Sent: {line.rstrip()}")
     except Exception as e:
         print(f"[SOCKET] Send failed: {e}")
 
 
 def load_model_from_config(argv):
     """
-    Read current-model.txt to determine which UFF model to load,
-    set MODEL_NAME, and append the necessary flags to argv.
+    Resolve the current model from the detectnet model catalog (UFF SSD
+    defaults unless its manifest says otherwise), set MODEL_NAME, and
+    append the necessary flags to argv.
     """
     global MODEL_NAME
-    base = "/var/snap/iotconnect/common/models/detectnet"
-    model_name = "ssd_mobilenet_v2_coco.uff"
-    try:
-        with open(os.path.join(base, "current-model.txt"), 'r') as f:
-            model_name = f.read().strip()
-    except Exception as e:
-        print(f"[MODEL] Error reading {base}/current-model.txt: {e}")
+    MODEL_NAME, flags = load_model_argv("detectnet")
+    argv += flags
 
-    MODEL_NAME = model_name
-    model_path = os.path.join(base, MODEL_NAME)
-    labels_path = os.path.join(base, "ssd_coco_labels.txt")
 
-    # Specify UFF and correct layer names
-    argv += [
-        f"--model={model_path}",
-        f"--labels={labels_path}",
-        "--uff",
-        "--input-blob=Input",
-        "--output-cvg=NMS",
-        "--output-bbox=NMS_1"
-    ]
+def create_payload_builders():
+    global DETECTION_MESSAGE, COUNT_MESSAGE
+    static = {"demo_name": DEMO_NAME, "demo_version": DEMO_VERSION, "model_name": MODEL_NAME}
+    DETECTION_MESSAGE = payload_builder("detectnet_detection", **static)
+    COUNT_MESSAGE = payload_builder("detectnet_count", **static)
+
+
+def detect(net, img, cropper, draw=True):
+    """
+    Run detection on the full frame, or on each configured ROI with the
+    boxes mapped back into full-frame coordinates.  Returns a list of
+    (class_id, confidence, left, top, width, height) tuples.  Overlays
+    are only drawn when the frame will be shown.
+    """
+    overlay = "box,labels,conf" if draw else "none"
+    crops = cropper.Crop(img)
+    if not crops:
+        return [(det.ClassID, det.Confidence, det.Left, det.Top, det.Width, det.Height)
+                for det in net.Detect(img, overlay=overlay)]
+
+    results = []
+    for region, crop in crops:
+        detections = net.Detect(crop, overlay=overlay)
+        if detections:
+            boxes = map_boxes([(det.Left, det.Top, det.Right, det.Bottom) for det in detections], region)
+            for det, (left, top, right, bottom) in zip(detections, boxes.tolist()):
+                results.append((det.ClassID, det.Confidence, left, top, right - left, bottom - top))
+        if draw:
+            cropper.Paste(img, region, crop)
+            x, y, w, h = region
+            cudaDrawRect(img, (x, y, x + w, y + h), (0, 255, 0, 40))
+    return results
+
+
+def detection_payloads(timestamp, detections, class_desc, extra):
+    """
+    Build one telemetry message per detection.
+    """
+    payloads = []
+    for class_id, confidence, left, top, width, height in detections:
+        payloads.append(DETECTION_MESSAGE.build(
+            int(timestamp), int(class_id), class_desc(int(class_id)), round(float(confidence), 5),
+            [round(float(left), 1), round(float(top), 1), round(float(width), 1), round(float(height), 1)],
+            **extra
+        ))
+    return payloads
+
+
+def count_payload(timestamp, counter, extra):
+    """
+    Build the per-interval class count message (max and mean per attribute).
+    """
+    return COUNT_MESSAGE.build(int(timestamp), **counter.summary(), **extra)
+
+
+def replay(path, class_map):
+    """
+    Feed a recording through the telemetry stage at full speed, using the
+    recorded timestamps so the output is the same on every run.  Payloads
+    are serialized but not sent.  Motion gate stats are not recorded, so
+    replayed telemetry carries only the source and its recorded frame rate.
+    """
+    global MODEL_NAME
+    rec = recording(path)
+    MODEL_NAME = rec.header.get("model_name")
+    create_payload_builders()
+    classes = rec.header.get("classes", [])
+    class_desc = lambda class_id: classes[class_id] if class_id < len(classes) else str(class_id)
+    sources = rec.header.get("sources", [])
+    counters = {uri: classCounter(classes, class_map) for uri in sources}
+    last_detections = {uri: [] for uri in sources}
+
+    last_time = None
+    frame_counts = {}
+    messages = 0
+    payload_bytes = 0
+    start = time.perf_counter()
+    for meta, arrays in rec:
+        source = meta["source"]
+        frame_counts[source] = frame_counts.get(source, 0) + 1
+        last_detections[source] = arrays["detections"]
+        counters[source].update(arrays["detections"][:, 0])
+        if last_time is None:
+            last_time = meta["time"]
+        if meta["time"] - last_time >= TELEMETRY_INTERVAL:
+            elapsed = meta["time"] - last_time
+            for uri, count in frame_counts.items():
+                extra = {"source": uri, "source_fps": round(count / elapsed, 1)}
+                payloads = detection_payloads(meta["time"], last_detections[uri], class_desc, extra)
+                for telemetry in payloads + [count_payload(meta["time"], counters[uri], extra)]:
+                    payload_bytes += len(telemetry)
+                    messages += 1
+            frame_counts = {}
+            last_time = meta["time"]
+    elapsed = time.perf_counter() - start
+    frames = len(rec) - 1
+    print(f"[REPLAY] {frames} frames in {elapsed:.3f} s ({frames / max(elapsed, 1e-6):.0f} FPS), "
+          f"{messages} telemetry messages, {payload_bytes} bytes")
+
+
+def handle_command(cmd, args):
+    """
+    Dispatch runtime commands to the ROI cropper, throttle, outputs and motion gates.
+    """
+    if (handle_roi_command(cropper, cmd, args) or handle_throttle_command(throttle, cmd, args)
+            or handle_output_command(list({id(o): o for o in video_outputs.values()}.values()), cmd, args)):
+        return
+    for gate in gates.values():
+        handle_motion_command(gate, cmd, args)
 
 
 if __name__ == '__main__':
@@ -77,66 +191,117 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description="Object detection with IoTConnect OTA support",
         formatter_class=argparse.RawTextHelpFormatter,
-        epilog=detectNet.Usage() + videoSource.Usage() + videoOutput.Usage() + Log.Usage()
+        epilog=detectNet.Usage() + videoSource.Usage() + videoOutput.Usage() + Log.Usage() if detectNet else ""
     )
     parser.add_argument(
         "input", type=str, nargs='?', default="/dev/video0",
-        help="URI of the input stream (e.g., /dev/video0)"
+        help="URI of the input stream(s), comma-separated for multiple cameras (e.g., /dev/video0,/dev/video2)"
     )
     parser.add_argument(
         "output", type=str, nargs='?', default="display://",
-        help="URI of the output stream (e.g., display://)"
+        help="URI of the output stream(s), one per input or a single shared one (e.g., display://)"
     )
     parser.add_argument(
         "--network", type=str, default=None,
         help="Override OTA: name of built-in network to use"
     )
+    add_roi_args(parser)
+    add_motion_args(parser)
+    add_record_args(parser, replay=True)
+    add_count_args(parser)
+    add_output_args(parser)
     args = parser.parse_known_args()[0]
 
-    # Open I/O streams
-    video_input = videoSource(args.input, argv=sys.argv)
-    video_output = videoOutput(args.output, argv=sys.argv)
-    font = cudaFont()
+    if args.replay:
+        replay(args.replay, parse_class_map(args.count_classes))
+        sys.exit(0)
 
-    # Load detection network
+    # Load detection network first: camera status events need the payload builders
     if args.network:
         MODEL_NAME = args.network
         net = detectNet(args.network, sys.argv)
     else:
         load_model_from_config(sys.argv)
         net = detectNet("custom", sys.argv)
+    create_payload_builders()
+
+    # Open I/O streams; several inputs share the one network
+    input_uris = args.input.split(",")
+    output_uris = args.output.split(",")
+    video_input = multiSource.Open(input_uris, argv=sys.argv, on_status=status_reporter(send_telemetry, DEMO_NAME))
+    if len(output_uris) == len(input_uris):
+        video_outputs = {uri: create_output(args, out, sys.argv) for uri, out in zip(input_uris, output_uris)}
+    else:
+        shared_output = create_output(args, output_uris[0], sys.argv)
+        video_outputs = {uri: shared_output for uri in input_uris}
+    font = cudaFont()
+
+    # Regions of interest (set_roi / set_roi_tiles / clear_roi) and motion gate (set_motion_gate)
+    cropper = create_cropper(args)
+    gates = {uri: create_motion_gate(args) for uri in input_uris}
+    throttle = frameThrottle()
+    detections = {uri: [] for uri in input_uris}
+    # Per-source counts of the template's car/bike/person attributes
+    labels = class_labels(net, sys.argv)
+    counters = {uri: classCounter(labels, parse_class_map(args.count_classes)) for uri in input_uris}
+    recorder = create_recorder(args, DEMO_NAME, {
+        "model_name": MODEL_NAME, "sources": input_uris,
+        "classes": labels
+    })
+    timer = stageTimer()
+    start_command_listener(handle_command)
 
+    heartbeat = heartbeatWriter()
     # Main loop
     while True:
-        img = video_input.Capture()
+        timer.start()
+        source, img = video_input.Capture()
         if img is None:
+            if video_input.alive():
+                heartbeat.beat(0)  # camera down or reopening, not hung
             continue
+        heartbeat.beat()
+        timer.mark("capture")
+        if recorder and recorder.thumb_width:
+            recorder.snapshot(cudaToNumpy(img))  # before overlays are drawn on it
 
-        detections = net.Detect(img)
-        print(f"[INFER] Detected {len(detections)} objects")
-        for det in detections:
-            print(f"  - {det.ClassID} ({net.GetClassDesc(det.ClassID)}) {det.Confidence*100:.2f}% at {det.Left},{det.Top},{det.Width},{det.Height}")
+        # Only run the network on stride frames where the scene changed, otherwise reuse the last detections
+        video_output = video_outputs[source]
+        draw = video_output.next_frame()
+        inferred = throttle.should_infer(source) and gates[source].check(cudaToNumpy(img))
+        if inferred:
+            detections[source] = detect(net, img, cropper, draw)
+        elif draw:
+            for class_id, confidence, left, top, width, height in detections[source]:
+                cudaDrawRect(img, (left, top, left + width, top + height), (255, 255, 0, 60))
+        counters[source].update([det[0] for det in detections[source]])
+        print(f"[INFER] {source}: detected {len(detections[source])} objects")
+        for class_id, confidence, left, top, width, height in detections[source]:
+            print(f"  - {class_id} ({net.GetClassDesc(class_id)}) {confidence*100:.2f}% at {left},{top},{width},{height}")
+        timer.mark("inference")
 
         video_output.Render(img)
-        video_output.SetStatus(f"detectNet | Network {net.GetNetworkFPS():.0f} FPS")
+        video_output.SetStatus(f"detectNet | {source} | Network {net.GetNetworkFPS():.0f} FPS")
+        timer.mark("render")
         net.PrintProfilerTimes()
 
-        # Telemetry
+        # Telemetry, tagged per source
         current_time = time.time()
         if (current_time - last_send_time) >= TELEMETRY_INTERVAL:
-            for det in detections:
-                telemetry = {
-                    "demo_name": DEMO_NAME,
-                    "demo_version": DEMO_VERSION,
-                    "model_name": MODEL_NAME,
-                    "timestamp": int(current_time),
-                    "class_id": det.ClassID,
-                    "class_description": net.GetClassDesc(det.ClassID),
-                    "confidence": round(det.Confidence, 5),
-                    "bbox": [round(det.Left, 1), round(det.Top, 1), round(det.Width, 1), round(det.Height, 1)]
-                }
-                send_telemetry(telemetry)
+            for uri in input_uris:
+                source_stats = {"source": uri, "source_fps": round(video_input.stats[uri].fps(), 1),
+                                **gates[uri].stats(), **video_input.capture_stats(uri)}
+                for telemetry in detection_payloads(current_time, detections[uri], net.GetClassDesc, source_stats):
+                    send_telemetry(telemetry)
+                send_telemetry(count_payload(current_time, counters[uri], source_stats))
             last_send_time = current_time
+        timer.mark("telemetry")
+
+        if recorder:
+            recorder.record(arrays={"detections": np.array(detections[source], dtype=np.float32).reshape(-1, 6)},
+                            timings=timer.timings, source=source, inferred=inferred)
+
+        throttle.wait()
 
         if not video_input.IsStreaming() or not video_output.IsStreaming():
             break
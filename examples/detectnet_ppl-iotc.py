@@ -5,16 +5,24 @@ import argparse
 import os
 import time
 import socket
-import json
 from jetson_inference import detectNet
-from jetson_utils import videoSource, videoOutput, cudaFont, Log
+from jetson_utils import videoSource, videoOutput, cudaFont, cudaToNumpy, Log
+
+from model_utils import load_model_argv
+from motion_utils import add_motion_args, create_motion_gate, handle_motion_command
+from throttle_utils import frameThrottle, handle_throttle_command
+from iotc_utils import start_command_listener, telemetry_socket_path, heartbeatWriter
+from count_utils import add_count_args, class_labels, classCounter, parse_class_map
+from capture_utils import open_capture, status_reporter
+from output_utils import add_output_args, create_output, handle_output_command
+from schema_utils import payload_builder
 
 # Demo metadata
 DEMO_NAME = "detectnet"
 DEMO_VERSION = "1.0"
 
 # Path to the IoTConnect Unix socket
-SOCKET_PATH = (
+SOCKET_PATH = telemetry_socket_path(
     "/var/snap/iotconnect/common/iotc.sock"
     if os.path.exists("/var/snap/iotconnect/common/iotc.sock")
     else os.path.expanduser("~/snap/iotconnect/common/iotc.sock")
@@ -24,49 +32,33 @@ TELEMETRY_INTERVAL = 7.0
 
 # Name of the model being used
 MODEL_NAME = None
+# Payload builder for the telemetry messages, compiled once the model is known
+TELEMETRY = None
 # Last time telemetry was sent
 last_send_time = 0
 
-PERSON_CLASS_ID = 1  # Typically 'person' class in COCO
-
 
 def send_telemetry(payload):
     """
-    Send a JSON payload over the IoTConnect Unix socket.
+    Send a message over the IoTConnect Unix socket: a line from the
+    payload builder, or a dict (events) encoded by it.
     """
     try:
+        line = payload if isinstance(payload, str) else TELEMETRY.encode(payload)
         s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         s.settimeout(1.0)
         s.connect(SOCKET_PATH)
-        s.send((json.dumps(payload) + "\n").encode("utf-8"))
+        s.send(line.encode("utf-8"))
         s.close()
-        print(f"[TELEMETRY] Sent: {payload}")
+        print(f"[TELEMETRY] Sent: {line.rstrip()}")
     except Exception as e:
         print(f"[SOCKET] Send failed: {e}")
 
 
 def load_model_from_config(argv):
     global MODEL_NAME
-    base = "/var/snap/iotconnect/common/models/detectnet"
-    model_name = "ssd_mobilenet_v2_coco.uff"
-    try:
-        with open(os.path.join(base, "current-model.txt"), 'r') as f:
-            model_name = f.read().strip()
-    except Exception as e:
-        print(f"[MODEL] Error reading {base}/current-model.txt: {e}")
-
-    MODEL_NAME = model_name
-    model_path = os.path.join(base, MODEL_NAME)
-    labels_path = os.path.join(base, "ssd_coco_labels.txt")
-
-    argv += [
-        f"--model={model_path}",
-        f"--labels={labels_path}",
-        "--uff",
-        "--input-blob=Input",
-        "--output-cvg=NMS",
-        "--output-bbox=NMS_1"
-    ]
+    MODEL_NAME, flags = load_model_argv("detectnet")
+    argv += flags
 
 
 if __name__ == '__main__':
@@ -78,26 +70,50 @@ if __name__ == '__main__':
     parser.add_argument("input", type=str, nargs='?', default="/dev/video0")
     parser.add_argument("output", type=str, nargs='?', default="display://")
     parser.add_argument("--network", type=str, default=None)
+    add_motion_args(parser)
+    add_count_args(parser, default="person")
+    add_output_args(parser)
     args = parser.parse_known_args()[0]
 
-    video_input = videoSource(args.input, argv=sys.argv)
-    video_output = videoOutput(args.output, argv=sys.argv)
-    font = cudaFont()
-
     if args.network:
         MODEL_NAME = args.network
         net = detectNet(args.network, sys.argv)
     else:
         load_model_from_config(sys.argv)
         net = detectNet("custom", sys.argv)
+    TELEMETRY = payload_builder("detectnet_ppl", demo_name=DEMO_NAME, demo_version=DEMO_VERSION, model_name=MODEL_NAME)
+
+    # Opened once the payload builder exists, since camera events are sent through it
+    video_input = open_capture(args.input, sys.argv, status_reporter(send_telemetry, DEMO_NAME))
+    video_output = create_output(args, args.output, sys.argv)
+    font = cudaFont()
 
+    gate = create_motion_gate(args)
+    throttle = frameThrottle()
+    start_command_listener(lambda cmd, cmd_args: handle_motion_command(gate, cmd, cmd_args)
+                           or handle_throttle_command(throttle, cmd, cmd_args)
+                           or handle_output_command(video_output, cmd, cmd_args))
+    # The person class ID comes from the model's labels rather than assuming COCO numbering
+    class_map = parse_class_map(args.count_classes)
+    class_map.setdefault("person", ["person"])
+    counter = classCounter(class_labels(net, sys.argv), class_map)
+    class_ids = []
+
+    heartbeat = heartbeatWriter()
     while True:
         img = video_input.Capture()
         if img is None:
+            if video_input.alive():
+                heartbeat.beat(0)  # camera down or reopening, not hung
             continue
-
-        detections = net.Detect(img)
-        people_count = sum(1 for det in detections if det.ClassID == PERSON_CLASS_ID)
+        heartbeat.beat()
+        draw = video_output.next_frame()
+
+        # Only run the network on stride frames where the scene changed, otherwise keep the last count
+        if throttle.should_infer() and gate.check(cudaToNumpy(img)):
+            class_ids = [det.ClassID for det in net.Detect(img, overlay="box,labels,conf" if draw else "none")]
+        counter.update(class_ids)
+        people_count = counter.count("person")
         print(f"[INFER] Detected {people_count} people")
 
         video_output.Render(img)
@@ -105,16 +121,13 @@ if __name__ == '__main__':
 
         current_time = time.time()
         if (current_time - last_send_time) >= TELEMETRY_INTERVAL:
-            telemetry = {
-                "demo_name": DEMO_NAME,
-                "demo_version": DEMO_VERSION,
-                "model_name": MODEL_NAME,
-                "timestamp": int(current_time),
-                "people_count": people_count
-            }
-            send_telemetry(telemetry)
+            # current_occupancy is the template's name for what this demo used to send as people_count
+            send_telemetry(TELEMETRY.build(int(current_time), people_count,
+                                           **counter.summary(), **gate.stats(), **video_input.stats()))
             last_send_time = current_time
 
+        throttle.wait()
+
         if not video_input.IsStreaming() or not video_output.IsStreaming():
             break
 
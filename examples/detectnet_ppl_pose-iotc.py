@@ -7,29 +7,34 @@ import socket
 import json
 import threading
 from jetson_inference import detectNet, poseNet
-from jetson_utils import videoSource, videoOutput, cudaDrawRect, cudaFont
+from jetson_utils import videoOutput, cudaDrawRect, cudaFont
 
-SOCKET_PATH = "/var/snap/iotconnect/common/iotc.sock"
+from iotc_utils import telemetry_socket_path, heartbeatWriter
+from capture_utils import open_capture, status_reporter
+from pose_utils import pose_array, pose_boxes, poseTracker
+from schema_utils import payload_builder
+
+SOCKET_PATH = telemetry_socket_path("/var/snap/iotconnect/common/iotc.sock")
 CMD_SOCKET_PATH = "/var/snap/iotconnect/common/iotc_cmd.sock"
 TELEMETRY_INTERVAL = 7.0
 PERSON_CLASS_ID = 1
 
-RETRY_INTERVAL = 0.5  # seconds
-MAX_RETRIES = 5
-
 WRIST_BOX = [200, 200, 400, 400]  # default [x,y,w,h]
 
-# KPI Counters
+# KPI Counters: track IDs seen and seconds of interaction per track ID, per telemetry interval
 people_counter = set()
-interaction_counter = 0
-minute_start_time = time.time()
+interaction_seconds = {}
+
+# Payload builder for the telemetry messages (events are encoded by it too)
+TELEMETRY = payload_builder("detectnet_ppl_pose")
 
 def send_telemetry(payload):
     try:
+        line = payload if isinstance(payload, str) else TELEMETRY.encode(payload)
         with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
             sock.connect(SOCKET_PATH)
-            sock.send((json.dumps(payload) + "\n").encode("utf-8"))
-        print(f"[TELEMETRY] Sent: {payload}")
+            sock.send(line.encode("utf-8"))
+        print(f"[TELEMETRY] Sent: {line.rstrip()}")
     except Exception as e:
         print(f"[SOCKET] Send failed: {e}")
 
@@ -100,8 +105,8 @@ if __name__ == '__main__':
     parser.add_argument("output", type=str, default="display://", nargs="?")
     args = parser.parse_known_args()[0]
 
-    #video_input = videoSource(args.input, argv=["--input-flip=rotate-180", "--input-flip=horizontal"])
-    video_input = videoSource(args.input)
+    #video_input = open_capture(args.input, ["--input-flip=rotate-180", "--input-flip=horizontal"])
+    video_input = open_capture(args.input, on_status=status_reporter(send_telemetry, "detectnet_ppl_pose"))
 
 
     video_output = videoOutput(args.output)
@@ -115,40 +120,38 @@ if __name__ == '__main__':
 
     last_send_time = 0
 
-    # KPI counters
-    people_counter = set()
-    interaction_counter = 0
-    minute_start_time = time.time()
+    # Pose track IDs make visitors and interactions countable across frames
+    tracker = poseTracker()
+    last_frame_time = time.monotonic()
 
+heartbeat = heartbeatWriter()
 while True:
-    retries = 0
-    img = None
-
-    # Attempt to capture with retries
-    while retries < MAX_RETRIES and img is None:
-        try:
-            img = video_input.Capture()
-        except Exception as e:
-            print(f"[CAMERA ERROR] Capture failed: {e}. Retrying ({retries+1}/{MAX_RETRIES})")
-            img = None
-        if img is None:
-            retries += 1
-            time.sleep(RETRY_INTERVAL)
-
-    # Check after retries
+    # The capture manager reopens the camera on its own thread; this only waits for the next frame
+    img = video_input.Capture()
     if img is None:
-        print("[CAMERA ERROR] Maximum retries reached, skipping frame.")
+        if video_input.alive():
+            heartbeat.beat(0)  # camera down or reopening, not hung
         continue
+    heartbeat.beat()
 
     detections = detect_net.Detect(img)
     current_occupancy = sum(1 for det in detections if det.ClassID == PERSON_CLASS_ID)
 
-    # Check interactions explicitly
-    poses = pose_net.Process(img)
-    interaction_active = any(
-        wrist_in_box({pose_net.GetKeypointName(p.ID): [p.x, p.y] for p in pose.Keypoints}, WRIST_BOX)
-        for pose in poses
-    )
+    # Check interactions explicitly, per tracked person
+    poses = [{pose_net.GetKeypointName(p.ID): [p.x, p.y] for p in pose.Keypoints} for pose in pose_net.Process(img)]
+    kp = pose_array(poses)
+    now = time.monotonic()
+    track_ids, _ = tracker.update(kp, pose_boxes(kp), now)
+    frame_time, last_frame_time = now - last_frame_time, now
+    interaction_active = False
+    for pose, track_id in zip(poses, track_ids.tolist()):
+        interacting = wrist_in_box(pose, WRIST_BOX)
+        interaction_active = interaction_active or interacting
+        if track_id < 0:
+            continue
+        people_counter.add(track_id)
+        if interacting:
+            interaction_seconds[track_id] = interaction_seconds.get(track_id, 0.0) + frame_time
 
     # Categorize occupancy clearly
     if current_occupancy <= 1:
@@ -171,15 +174,15 @@ while True:
     # Regular periodic telemetry (every TELEMETRY_INTERVAL seconds)
     current_time = time.time()
     if current_time - last_send_time >= TELEMETRY_INTERVAL:
-        telemetry = {
-            "timestamp": int(current_time),
-            "current_occupancy": current_occupancy,
-            "occupancy_level": occupancy_level,
-            "interaction_active": "yes" if interaction_active else "no",
-            "box_coordinates": WRIST_BOX
-        }
-        send_telemetry(telemetry)
+        send_telemetry(TELEMETRY.build(
+            int(current_time), current_occupancy, occupancy_level,
+            "yes" if interaction_active else "no",
+            len(people_counter), len(interaction_seconds), round(sum(interaction_seconds.values()), 1),
+            WRIST_BOX
+        ))
         last_send_time = current_time
+        people_counter.clear()
+        interaction_seconds.clear()
 
     if not video_input.IsStreaming() or not video_output.IsStreaming():
         break
@@ -0,0 +1,258 @@
+import os
+import re
+import glob
+import json
+import time
+import subprocess
+
+from model_utils import MODELS_ROOT, catalog
+
+# Index of the engines built under MODELS_ROOT and what they were built from
+ENGINE_INDEX = os.path.join(MODELS_ROOT, "engine-cache.json")
+# Evict least recently used engines beyond this total size
+ENGINE_BUDGET_BYTES = 2 * 1024 ** 3
+
+# jetson-inference network class used to build each demo's engine
+DEMO_NETWORKS = {
+    "depthnet": "depthNet",
+    "detectnet": "detectNet",
+    "imagenet": "imageNet",
+    "posenet": "poseNet",
+    "segnet": "segNet",
+}
+
+
+def tensorrt_version():
+    try:
+        import tensorrt
+        return tensorrt.__version__
+    except Exception:
+        pass
+    for header in glob.glob("/usr/include/*/NvInferVersion.h") + ["/usr/include/NvInferVersion.h"]:
+        try:
+            with open(header) as f:
+                text = f.read()
+            parts = [re.search(rf"#define NV_TENSORRT_{p} (\d+)", text) for p in ("MAJOR", "MINOR", "PATCH")]
+            if all(parts):
+                return ".".join(m.group(1) for m in parts)
+        except OSError:
+            continue
+    return "unknown"
+
+
+def jetpack_release():
+    try:
+        with open("/etc/nv_tegra_release") as f:
+            match = re.search(r"# (R\d+) \(release\), REVISION: ([\d.]+)", f.readline())
+        return f"{match.group(1)}.{match.group(2)}" if match else "unknown"
+    except OSError:
+        return "unknown"
+
+
+class engineCache:
+    """
+    Tracks the serialized TensorRT engines jetson-inference writes beside
+    each model (<model>.*.engine) and whether they are still valid for the
+    model's current checksum and the installed JetPack/TensorRT.
+
+    prebuild() builds missing engines ahead of time through a builder
+    callable, and evict() removes stale engines and then the least
+    recently used ones until the cache fits in its size budget.
+    """
+    def __init__(self, index_path=ENGINE_INDEX, budget_bytes=ENGINE_BUDGET_BYTES, platform=None, models=catalog):
+        self.index_path = index_path
+        self.budget_bytes = budget_bytes
+        self.platform = platform or f"{jetpack_release()}/trt-{tensorrt_version()}"
+        self.models = models
+        self.index = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            self.index = {}
+        except Exception as e:
+            print(f"[ENGINE] Ignoring unreadable {self.index_path}: {e}")
+            self.index = {}
+
+    def save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def engines_for(self, model_path):
+        return glob.glob(glob.escape(model_path) + ".*.engine")
+
+    def is_fresh(self, model_path):
+        """
+        True if an engine built from this exact model on this platform exists.
+        """
+        if not os.path.isfile(model_path):
+            return False
+        checksum = self.models.checksum(model_path)
+        for engine in self.engines_for(model_path):
+            info = self.index.get(engine)
+            if info and info["model_sha256"] == checksum and info["platform"] == self.platform:
+                return True
+        return False
+
+    def register(self, model_path):
+        """
+        Adopt engines written after the model last changed (by prebuild()
+        or by a demo loading the model) as built from its current checksum
+        on this platform.
+        """
+        checksum = self.models.checksum(model_path)
+        model_mtime = os.path.getmtime(model_path)
+        for engine in self.engines_for(model_path):
+            info = self.index.get(engine)
+            if info and info["model_sha256"] == checksum:
+                continue
+            if os.path.getmtime(engine) >= model_mtime:
+                self.index[engine] = {
+                    "model": model_path,
+                    "model_sha256": checksum,
+                    "platform": self.platform,
+                    "size": os.path.getsize(engine),
+                    "built": time.time(),
+                    "last_used": time.time()
+                }
+
+    def touch(self, model_path):
+        for engine in self.engines_for(model_path):
+            if engine in self.index:
+                self.index[engine]["last_used"] = time.time()
+
+    def status(self, demos=DEMO_NETWORKS):
+        """
+        Return {demo: {"model": name, "fresh": bool}} for each demo's current model.
+        """
+        status = {}
+        for demo in demos:
+            entry = self.models.resolve(demo)
+            if entry.get("model") and os.path.isfile(entry["model"]):
+                status[demo] = {"model": entry["name"], "fresh": self.is_fresh(entry["model"])}
+        return status
+
+    def prebuild(self, builder, demos=DEMO_NETWORKS):
+        """
+        Build engines for every demo's current model that lacks a fresh one.
+        builder(demo, entry) must construct the network so that TensorRT
+        serializes the engine beside the model.  Returns the demos built.
+        """
+        # Drop engines of models changed by OTA before anything can load them
+        self.evict()
+        built = []
+        for demo in demos:
+            entry = self.models.resolve(demo)
+            if self.models.validate(entry):
+                continue
+            self.register(entry["model"])
+            if self.is_fresh(entry["model"]):
+                self.touch(entry["model"])
+                continue
+            print(f"[ENGINE] Building engine for {demo}/{entry['name']} ({self.platform})")
+            try:
+                builder(demo, entry)
+            except Exception as e:
+                print(f"[ENGINE] Build failed for {demo}/{entry['name']}: {e}")
+                continue
+            self.register(entry["model"])
+            built.append(demo)
+        self.evict()
+        self.save()
+        return built
+
+    def evict(self):
+        """
+        Delete engines whose model changed, disappeared or was built for
+        another platform, then the least recently used engines until the
+        total size fits the budget.  Engines unknown to the index are left alone.
+        """
+        removed = []
+        for engine, info in list(self.index.items()):
+            model = info["model"]
+            stale = (not os.path.isfile(engine) or not os.path.isfile(model)
+                     or info["platform"] != self.platform
+                     or self.models.checksum(model) != info["model_sha256"])
+            if stale:
+                removed.append(engine)
+
+        live = sorted((info["last_used"], engine) for engine, info in self.index.items() if engine not in removed)
+        total = sum(self.index[engine]["size"] for _, engine in live)
+        for _, engine in live:
+            if total <= self.budget_bytes:
+                break
+            total -= self.index[engine]["size"]
+            removed.append(engine)
+
+        for engine in removed:
+            try:
+                os.remove(engine)
+            except OSError:
+                pass
+            self.index.pop(engine, None)
+            print(f"[ENGINE] Evicted {engine}")
+        return removed
+
+
+def subprocess_builder(demo, entry):
+    """
+    Build an engine by constructing the demo's network in a low-priority
+    child process; jetson-inference serializes the engine on first load.
+    """
+    network = DEMO_NETWORKS[demo]
+    code = f"import sys; from jetson_inference import {network}; {network}('custom', sys.argv)"
+    subprocess.run(["python3", "-c", code] + catalog.argv(entry),
+                   preexec_fn=lambda: os.nice(19), check=True)
+
+
+if __name__ == "__main__":
+    # Exercise the cache on a temporary models tree with a fake builder
+    import tempfile
+    from model_utils import modelCatalog
+
+    root = tempfile.mkdtemp()
+    for demo, model in (("detectnet", "ssd.onnx"), ("posenet", "pose.onnx")):
+        os.makedirs(os.path.join(root, demo))
+        with open(os.path.join(root, demo, model), "wb") as f:
+            f.write(os.urandom(1024))
+        with open(os.path.join(root, demo, "current-model.txt"), "w") as f:
+            f.write(model)
+        with open(os.path.join(root, demo, "manifest.json"), "w") as f:
+            json.dump({"models": {model: {"labels": None, "topology": None, "colormap": None}}}, f)
+
+    def fake_builder(demo, entry):
+        with open(entry["model"] + ".1.1.8502.GPU.FP16.engine", "wb") as f:
+            f.write(b"\0" * 4096)
+
+    demos = ("detectnet", "posenet")
+    cache = engineCache(os.path.join(root, "engine-cache.json"), budget_bytes=10000, platform="R35.5.0/trt-8.5.2",
+                        models=modelCatalog(root))
+    fresh = lambda: {demo: status["fresh"] for demo, status in cache.status(demos).items()}
+    print("before:", cache.status(demos))
+    assert fresh() == {"detectnet": False, "posenet": False}
+    built = cache.prebuild(fake_builder, demos)
+    print("built:", built)
+    print("after:", cache.status(demos))
+    assert built == ["detectnet", "posenet"] and fresh() == {"detectnet": True, "posenet": True}
+    assert cache.prebuild(fake_builder, demos) == []
+
+    # Simulated OTA update of the detectnet model invalidates its engine
+    detectnet_engine = os.path.join(root, "detectnet", "ssd.onnx.1.1.8502.GPU.FP16.engine")
+    with open(os.path.join(root, "detectnet", "ssd.onnx"), "ab") as f:
+        f.write(b"update")
+    print("after OTA:", cache.status(demos))
+    assert fresh() == {"detectnet": False, "posenet": True}
+    evicted = cache.evict()
+    print("evicted:", evicted)
+    assert evicted == [detectnet_engine] and not os.path.exists(detectnet_engine)
+    assert cache.prebuild(fake_builder, demos) == ["detectnet"] and fresh() == {"detectnet": True, "posenet": True}
+
+    # A JetPack/TensorRT upgrade makes every engine stale
+    upgraded = engineCache(os.path.join(root, "engine-cache.json"), budget_bytes=10000,
+                           platform="R36.3.0/trt-10.3.0", models=modelCatalog(root))
+    assert len(upgraded.evict()) == 2 and not upgraded.index
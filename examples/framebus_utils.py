@@ -0,0 +1,244 @@
+import sys
+import time
+import argparse
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+# Header: magic, slots, height, width, channels, latest frame number
+HEADER_MAGIC = 0x49465242  # "IFRB"
+HEADER_FIELDS = 8
+SHM_PREFIX = "iotc_framebus_"
+URI_SCHEME = "framebus://"
+# Buses created by this process (or its forked parent), which own the segment
+_created = set()
+
+
+def _layout(slots, height, width, channels):
+    header = HEADER_FIELDS * 8
+    seqs = slots * 8
+    frame = height * width * channels
+    return header, seqs, frame, header + seqs + slots * frame
+
+
+class frameBus:
+    """
+    Ring of frame slots in POSIX shared memory, written by one capture
+    process and read by any number of demo processes.
+
+    Each slot carries the number of the frame it holds; the writer marks a
+    slot -1 while copying into it.  Readers take the latest frame as a
+    NumPy view straight into shared memory (no copy), and can check with
+    Valid() afterwards that the slot was not recycled while they used it.
+    Slow readers simply skip to the newest frame.
+    """
+    def __init__(self, shm, create):
+        self.shm = shm
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if create:
+            return
+        if self.header[0] != HEADER_MAGIC:
+            raise ValueError(f"{shm.name} is not a frame bus")
+        self._map(*[int(v) for v in self.header[1:5]])
+
+    def _map(self, slots, height, width, channels):
+        header, seqs, frame, _ = _layout(slots, height, width, channels)
+        self.slots = slots
+        self.shape = (height, width, channels)
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=header)
+        self.frames = np.ndarray((slots, height, width, channels), dtype=np.uint8,
+                                 buffer=self.shm.buf, offset=header + seqs)
+
+    @staticmethod
+    def Create(name, height, width, channels=3, slots=4):
+        *_, size = _layout(slots, height, width, channels)
+        try:
+            stale = shared_memory.SharedMemory(name=SHM_PREFIX + name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        bus = frameBus(shared_memory.SharedMemory(name=SHM_PREFIX + name, create=True, size=size), create=True)
+        bus._map(slots, height, width, channels)
+        _created.add(name)
+        bus.seqs[:] = -1
+        bus.header[:] = [HEADER_MAGIC, slots, height, width, channels, -1, 0, 0]
+        return bus
+
+    @staticmethod
+    def Attach(name):
+        shm = shared_memory.SharedMemory(name=SHM_PREFIX + name)
+        # readers must not unlink the segment when they exit; forked children
+        # share the creator's resource tracker and leave its entry alone
+        if name not in _created:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return frameBus(shm, create=False)
+
+    def Write(self, frame):
+        """
+        Copy a frame into the next slot and publish it.  Returns its frame number.
+        """
+        number = int(self.header[5]) + 1
+        slot = number % self.slots
+        self.seqs[slot] = -1
+        self.frames[slot] = frame
+        self.seqs[slot] = number
+        self.header[5] = number
+        return number
+
+    def Read(self, last=-1, timeout=1.0, poll=0.0005):
+        """
+        Wait for a frame newer than `last` and return (number, view), or
+        (None, None) on timeout.  The view aliases shared memory.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            number = int(self.header[5])
+            if number > last:
+                slot = number % self.slots
+                if self.seqs[slot] == number:
+                    return number, self.frames[slot]
+            if time.perf_counter() >= deadline:
+                return None, None
+            time.sleep(poll)
+
+    def Valid(self, number):
+        """
+        True if frame `number` is still intact in its slot.
+        """
+        return self.seqs[number % self.slots] == number
+
+    def Close(self, unlink=False):
+        self.header = self.seqs = self.frames = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class frameBusSource:
+    """
+    videoSource-compatible reader for framebus://<name> inputs.  Each new
+    frame is copied once into a mapped CUDA buffer allocated up front.
+
+    The buffers are used in turn: behind a captureManager the next frame
+    is copied while the network still holds the one returned before, so
+    `buffers` must be one more than the frames held at a time (the frame
+    being processed plus the one captured ahead).
+    """
+    def __init__(self, name, buffers=2):
+        from jetson_utils import cudaAllocMapped, cudaToNumpy
+        self.bus = frameBus.Attach(name)
+        height, width, _ = self.bus.shape
+        self.images = [cudaAllocMapped(width=width, height=height, format="rgb8") for _ in range(buffers)]
+        self.arrays = [cudaToNumpy(image) for image in self.images]
+        self.next = 0
+        self.last = -1
+        self.dropped = 0
+
+    def Capture(self, timeout=1000):
+        number, frame = self.bus.Read(self.last, timeout / 1000.0)
+        if number is None:
+            return None
+        np.copyto(self.arrays[self.next], frame)
+        if not self.bus.Valid(number):
+            return None  # overwritten while copying
+        if self.last >= 0:
+            self.dropped += number - self.last - 1
+        self.last = number
+        image = self.images[self.next]
+        self.next = (self.next + 1) % len(self.images)
+        return image
+
+    def IsStreaming(self):
+        return True
+
+
+def open_source(uri, argv=None):
+    """
+    Open framebus://<name> inputs from the frame bus, anything else as a videoSource.
+    """
+    if uri.startswith(URI_SCHEME):
+        return frameBusSource(uri[len(URI_SCHEME):])
+    from jetson_utils import videoSource
+    return videoSource(uri, argv=argv)
+
+
+def capture(args):
+    """
+    Publish a camera onto the frame bus.
+    """
+    from jetson_utils import videoSource, cudaToNumpy
+    source = videoSource(args.input, argv=sys.argv)
+    bus = None
+    try:
+        while source.IsStreaming():
+            img = source.Capture(format="rgb8")
+            if img is None:
+                continue
+            if bus is None:
+                bus = frameBus.Create(args.name, img.height, img.width, 3, args.slots)
+                print(f"[FRAMEBUS] Publishing {args.input} as framebus://{args.name} ({img.width}x{img.height})")
+            bus.Write(cudaToNumpy(img))
+    finally:
+        if bus:
+            bus.Close(unlink=True)
+
+
+def _consumer(name, frames, results):
+    bus = frameBus.Attach(name)
+    last, received = -1, 0
+    start = None
+    while received < frames:
+        number, view = bus.Read(last, timeout=5.0)
+        if number is None:
+            break
+        start = start or time.perf_counter()
+        _ = int(view[0, 0, 0])  # touch the frame without copying it
+        received += 1
+        last = number
+    results.put((received, time.perf_counter() - (start or time.perf_counter())))
+    bus.Close()
+
+
+def benchmark(frames=300, consumers=(1, 2, 4), shape=(1080, 1920, 3)):
+    """
+    Measure writer throughput and consumer fan-out at 1080p.
+    """
+    import multiprocessing as mp
+    frame = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+    for count in consumers:
+        bus = frameBus.Create("bench", *shape)
+        results = mp.Queue()
+        procs = [mp.Process(target=_consumer, args=("bench", frames, results)) for _ in range(count)]
+        for p in procs:
+            p.start()
+        time.sleep(0.5)
+        start = time.perf_counter()
+        written = 0
+        while any(p.is_alive() for p in procs) and written < frames * 4:
+            bus.Write(frame)
+            written += 1
+        elapsed = time.perf_counter() - start
+        stats = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        bus.Close(unlink=True)
+        received = sum(s[0] for s in stats) / count
+        print(f"{count} consumer(s): writer {written / elapsed:.0f} FPS, "
+              f"each consumer got {received:.0f} of {written} frames ({received / max(max(s[1] for s in stats), 1e-6):.0f} FPS)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared-memory frame bus between demos")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    cap = sub.add_parser("capture", help="publish a camera onto the bus")
+    cap.add_argument("input", type=str, help="URI of the input stream")
+    cap.add_argument("--name", type=str, default="cam0", help="bus name, read as framebus://<name>")
+    cap.add_argument("--slots", type=int, default=4, help="number of frame slots")
+    bench = sub.add_parser("bench", help="fan-out benchmark at 1080p")
+    bench.add_argument("--frames", type=int, default=300)
+    args = parser.parse_known_args()[0]
+
+    if args.mode == "capture":
+        capture(args)
+    else:
+        benchmark(args.frames)
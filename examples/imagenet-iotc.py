@@ -5,16 +5,23 @@ import argparse
 import os
 import time
 import socket
-import json
 from jetson_inference import imageNet
-from jetson_utils import videoSource, videoOutput, cudaFont, Log
+from jetson_utils import videoSource, videoOutput, cudaFont, cudaToNumpy, Log
+
+from model_utils import load_model_argv
+from classify_utils import classificationSmoother, add_smoothing_args
+from iotc_utils import start_command_listener, telemetry_socket_path, heartbeatWriter
+from capture_utils import open_capture, status_reporter
+from output_utils import add_output_args, create_output, handle_output_command
+from schema_utils import payload_builder
+from record_utils import add_record_args, create_recorder, stageTimer
 
 # Demo metadata
 DEMO_NAME = "imageNet"
 DEMO_VERSION = "1.0"
 
 # Path to the IoTConnect Unix socket
-SOCKET_PATH = (
+SOCKET_PATH = telemetry_socket_path(
     "/var/snap/iotconnect/common/iotc.sock"
     if os.path.exists("/var/snap/iotconnect/common/iotc.sock")
     else os.path.expanduser("~/snap/iotconnect/common/iotc.sock")
@@ -24,59 +31,36 @@ TELEMETRY_INTERVAL = 7.0
 
 # Name of the model being used
 MODEL_NAME = None
+# Payload builder for the telemetry messages, compiled once the model is known
+TELEMETRY = None
 # Last time telemetry was sent
 last_send_time = 0
 
 def send_telemetry(payload):
     """
-    Send a JSON payload over the IoTConnect Unix socket.
+    Send a message over the IoTConnect Unix socket: a line from the
+    payload builder, or a dict (events) encoded by it.
     """
     try:
+        line = payload if isinstance(payload, str) else TELEMETRY.encode(payload)
         s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         s.settimeout(1.0)
         s.connect(SOCKET_PATH)
-        s.send((json.dumps(payload) + "\n").encode("utf-8"))
+        s.send(line.encode("utf-8"))
         s.close()
-        print(f"[TELEMETRY] Sent: {payload}")
+        print(f"[TELEMETRY] Sent: {line.rstrip()}")
     except Exception as e:
         print(f"[SOCKET] Send failed: {e}")
 
 def load_model_from_config(argv):
     """
-    Read the Caffe model filename from imagenet/current-model.txt,
-    set MODEL_NAME, then append the --model, --prototxt, and --labels flags to argv.
+    Resolve the Caffe model from the imagenet model catalog (falling back
+    to the googlenet prototxt candidates), set MODEL_NAME, then append the
+    --model, --prototxt, and --labels flags to argv.
     """
     global MODEL_NAME
-    base = "/var/snap/iotconnect/common/models/imagenet"
-    model_name = "bvlc_googlenet.caffemodel"
-    try:
-        with open(os.path.join(base, "current-model.txt"), 'r') as f:
-            model_name = f.read().strip()
-    except Exception as e:
-        print(f"[MODEL] Error reading {base}/current-model.txt: {e}")
-
-    MODEL_NAME = model_name
-    model_path = os.path.join(base, model_name)
-
-    # Determine matching prototxt
-    proto_candidates = [model_name.replace('.caffemodel', '.prototxt'),
-                        'googlenet.prototxt', 'googlenet_noprob.prototxt']
-    proto_path = None
-    for proto in proto_candidates:
-        candidate = os.path.join(base, proto)
-        if os.path.isfile(candidate):
-            proto_path = candidate
-            break
-    if not proto_path:
-        raise FileNotFoundError(f"No .prototxt found for {model_name} in {base}")
-
-    labels_path = "/var/snap/iotconnect/common/models/labels.txt"
-
-    argv += [
-        f"--model={model_path}",
-        f"--prototxt={proto_path}",
-        f"--labels={labels_path}"
-    ]
+    MODEL_NAME, flags = load_model_argv("imagenet")
+    argv += flags
 
 if __name__ == '__main__':
     # Build argument parser
@@ -97,6 +81,9 @@ if __name__ == '__main__':
         "--network", type=str, default=None,
         help="Override OTA: name of built-in network to use"
     )
+    add_smoothing_args(parser)
+    add_output_args(parser)
+    add_record_args(parser)
 
     args = parser.parse_known_args()[0]
 
@@ -107,49 +94,89 @@ if __name__ == '__main__':
     else:
         load_model_from_config(sys.argv)
         net = imageNet("custom", sys.argv)
+    TELEMETRY = payload_builder("imagenet", demo_name=DEMO_NAME, demo_version=DEMO_VERSION, model_name=MODEL_NAME)
 
     # Open I/O streams
-    input = videoSource(args.input, argv=sys.argv)
-    output = videoOutput(args.output, argv=sys.argv)
+    input = open_capture(args.input, sys.argv, status_reporter(send_telemetry, DEMO_NAME))
+    output = create_output(args, args.output, sys.argv)
     font = cudaFont()
+    recorder = create_recorder(args, DEMO_NAME, {"model_name": MODEL_NAME, "sources": [args.input],
+                                                 "smoothing": args.smoothing})
+    timer = stageTimer()
+
+    smoother = classificationSmoother(
+        net.GetNumClasses(), mode=args.smoothing, window=args.smoothing_window,
+        alpha=args.smoothing_alpha, threshold=args.confidence_threshold, top_k=args.top_k,
+        margin=args.smoothing_margin, dwell=args.smoothing_dwell
+    )
+
+    start_command_listener(lambda cmd, cmd_args: handle_output_command(output, cmd, cmd_args))
 
+    heartbeat = heartbeatWriter()
     # Main processing loop
     while True:
+        timer.start()
         img = input.Capture()
         if img is None:
+            if input.alive():
+                heartbeat.beat(0)  # camera down or reopening, not hung
             continue
-
-        # Perform inference
-        class_id, confidence = net.Classify(img)
-        class_desc = net.GetClassDesc(class_id)
+        heartbeat.beat()
+        timer.mark("capture")
+        if recorder and recorder.thumb_width:
+            recorder.snapshot(cudaToNumpy(img))  # before the label is drawn on it
+
+        # Perform inference, then smooth the per-frame result
+        frame_class_id, frame_confidence = net.Classify(img)
+        previous_id = smoother.stable_id
+        if smoother.update(frame_class_id, frame_confidence) and args.smoothing != "none":
+            # Stable label changed: report it without waiting for the interval
+            send_telemetry({
+                "timestamp": int(time.time()),
+                "demo_name": DEMO_NAME,
+                "demo_version": DEMO_VERSION,
+                "model_name": MODEL_NAME,
+                "event": "label_changed",
+                "class_id": smoother.stable_id,
+                "class_description": net.GetClassDesc(smoother.stable_id) if smoother.stable_id >= 0 else "unknown",
+                "previous_class_description": net.GetClassDesc(previous_id) if previous_id >= 0 else None,
+                "confidence": round(smoother.stable_conf, 5)
+            })
+
+        class_id, confidence = smoother.stable_id, smoother.stable_conf
+        class_desc = net.GetClassDesc(class_id) if class_id >= 0 else "unknown"
         print(f"[INFER] {confidence * 100:.2f}% class #{class_id} ({class_desc})")
+        timer.mark("inference")
 
-        # Overlay result on image
-        font.OverlayText(
-            img, img.width, img.height,
-            f"{confidence * 100:.2f}% {class_desc}", 5, 5,
-            font.White, font.Gray40
-        )
+        # Overlay result on image, only on frames that are shown
+        if output.next_frame():
+            font.OverlayText(
+                img, img.width, img.height,
+                f"{confidence * 100:.2f}% {class_desc}", 5, 5,
+                font.White, font.Gray40
+            )
 
         # Render and status
         output.Render(img)
         output.SetStatus(f"imageNet | Network {net.GetNetworkFPS():.0f} FPS")
         net.PrintProfilerTimes()
+        timer.mark("render")
 
         # Send telemetry at intervals
         current_time = time.time()
         if (current_time - last_send_time) >= TELEMETRY_INTERVAL:
-            telemetry = {
-                "timestamp": int(current_time),
-                "demo_name": DEMO_NAME,
-                "demo_version": DEMO_VERSION,
-                "model_name": MODEL_NAME,
-                "class_id": class_id,
-                "class_description": class_desc,
-                "confidence": round(confidence, 5)
-            }
-            send_telemetry(telemetry)
+            send_telemetry(TELEMETRY.build(
+                int(current_time), class_id, class_desc, round(confidence, 5),
+                {net.GetClassDesc(c): round(f, 3) for c, f in smoother.top_classes()}
+            ))
+            smoother.reset_interval()
             last_send_time = current_time
+        timer.mark("telemetry")
+
+        # Raw per-frame result and the smoothed label reported from it
+        if recorder:
+            recorder.record(results=[int(frame_class_id), float(frame_confidence), int(class_id), float(confidence)],
+                            timings=timer.timings, source=args.input)
 
         # Exit when streams close
         if not input.IsStreaming() or not output.IsStreaming():
@@ -11,12 +11,60 @@ import re
 
 from jtop import jtop
 
+from iotc_utils import DEMO_CMD_SOCKET_ENV, TELEMETRY_SOCKET_ENV
+from telemetry_utils import telemetryMux
+from supervisor_utils import demoSupervisor
+from throttle_utils import throttleController
+from model_utils import catalog
+from engine_utils import engineCache, subprocess_builder
+from process_utils import processAccounting
+
 SOCKET_PATH = "/var/snap/iotconnect/common/iotc.sock"
 CMD_SOCKET_PATH = "/var/snap/iotconnect/common/iotc_cmd.sock"
+DEMO_CMD_SOCKET_PATH = "/var/snap/iotconnect/common/iotc_demo_cmd.sock"
+DEMO_TELEMETRY_SOCKET_PATH = "/var/snap/iotconnect/common/iotc_demo_telemetry.sock"
 TELEMETRY_INTERVAL = 7
-DEMO_PROCESS = None
-CURRENT_SCRIPT = "notme"
+STATS_INTERVAL = 2
 SUFFIX = "-iotc.py"
+# Default camera(s) passed to launched demos; comma-separate several URIs
+# for demos that support multiple sources (e.g. /dev/video0,/dev/video2)
+CAMERA_INPUT = os.environ.get("IOTC_CAMERA", "/dev/video0")
+
+# Model catalog directory of each demo, validated before launching it.
+# None for demos that only load built-in networks, so there is nothing to validate.
+DEMO_MODEL_DIRS = {
+    "actionnet2-iotc.py": "actionnet",
+    "depthnet-iotc.py": "depthnet",
+    "detectnet-iotc.py": "detectnet",
+    "detectnet_ppl-iotc.py": "detectnet",
+    "detectnet_ppl_pose-iotc.py": None,  # ssd-mobilenet-v2 + resnet18-body
+    "imagenet-iotc.py": "imagenet",
+    "posenet-iotc.py": "posenet",
+    "segnet-iotc.py": None,  # --network, default fcn-resnet18-cityscapes-512x256
+    "segnet2-iotc.py": None,  # --network, default fcn-resnet18-voc
+}
+
+# Only one background engine build at a time
+PREBUILD_LOCK = threading.Lock()
+
+# Latest sample from stats_sampler_loop(), shared with the telemetry loop
+LATEST_STATS = None
+# CPU, memory, threads, context switches and IO of the demo's process tree, per-core CPU and load
+ACCOUNTING = processAccounting()
+# Throttles the running demo to stay within GPU / temperature budgets
+THROTTLE = throttleController(gpu_budget=85, temp_budget=75)
+# Sole writer to SOCKET_PATH: merges the demo's results into the system
+# stats once per interval and rate-limits everything sent upstream
+MUX = telemetryMux(SOCKET_PATH, rate=5.0, burst=10)
+
+def supervisor_event(event, info):
+    if event == "demo_restarted":
+        THROTTLE.reset()
+    send_telemetry(dict(info, timestamp=int(time.time()), launcher="iotc-launcher", event=event))
+
+# Runs the current demo: restarts it after crashes or hangs (heartbeat watchdog)
+SUPERVISOR = demoSupervisor(on_event=supervisor_event, backoff_initial=2.0, backoff_max=60.0,
+                            crash_limit=5, crash_window=300.0, hang_timeout=30.0)
 
 def set_socket_permissions(path):
     try:
@@ -25,13 +73,8 @@ def set_socket_permissions(path):
         print(f"[SOCKET] Could not set permissions on {path}: {e}")
 
 def send_telemetry(data):
-    try:
-        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
-            sock.connect(SOCKET_PATH)
-            sock.sendall(json.dumps(data).encode("utf-8"))
-        print(f"[TELEMETRY] Sent: {data}")
-    except Exception as e:
-        print(f"[TELEMETRY] Failed to send: {e}")
+    if not MUX.publish(data):
+        print(f"[TELEMETRY] Dropped: {data}")
 
 def get_gpu_stats_fallback():
     try:
@@ -47,10 +90,26 @@ def get_gpu_stats_fallback():
         print(f"[TEGRAS] Fallback failed: {e}")
         return {"gpu": -1, "emc_freq": -1}
 
+def get_temperature_fallback():
+    try:
+        zones = os.listdir("/sys/class/thermal")
+    except OSError:
+        return -1
+    temps = []
+    for zone in zones:
+        if not zone.startswith("thermal_zone"):
+            continue
+        try:
+            with open(os.path.join("/sys/class/thermal", zone, "temp")) as f:
+                temps.append(int(f.read().strip()) / 1000.0)
+        except Exception:
+            continue
+    return max(temps) if temps else -1
+
 def get_system_stats():
     cpu = psutil.cpu_percent()
     mem = psutil.virtual_memory().percent
-    stats = {"cpu": cpu, "mem": mem, "gpu": -1, "gpu_freq": -1, "emc_freq": -1}
+    stats = {"cpu": cpu, "mem": mem, "gpu": -1, "gpu_freq": -1, "emc_freq": -1, "temperature": -1}
 
     try:
         with jtop() as jetson:
@@ -58,55 +117,126 @@ def get_system_stats():
             stats["gpu"] = jetson_stats.get("GPU", -1)
             stats["gpu_freq"] = jetson_stats.get("GR3D_FREQ", -1)
             stats["emc_freq"] = jetson_stats.get("EMC_FREQ", -1)
+            temps = [v for k, v in jetson_stats.items() if k.startswith("Temp") and isinstance(v, (int, float))]
+            stats["temperature"] = max(temps) if temps else get_temperature_fallback()
     except Exception as e:
         print(f"[JTOP] Failed: {e}, using fallback")
         fallback = get_gpu_stats_fallback()
         stats["gpu"] = fallback.get("gpu", -1)
         stats["emc_freq"] = fallback.get("emc_freq", -1)
+        stats["temperature"] = get_temperature_fallback()
 
     return stats
 
+def send_demo_command(cmd, args):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1.0)
+            sock.connect(DEMO_CMD_SOCKET_PATH)
+            sock.sendall(json.dumps({"cmd": cmd, "args": args}).encode("utf-8"))
+        return True
+    except Exception as e:
+        print(f"[THROTTLE] Could not reach demo: {e}")
+        return False
+
+def stats_sampler_loop():
+    global LATEST_STATS
+    while True:
+        try:
+            stats = get_system_stats()
+            LATEST_STATS = stats
+            ACCOUNTING.sample(SUPERVISOR.pid())
+            if SUPERVISOR.running():
+                decision = THROTTLE.update(stats)
+                if decision:
+                    delivered = send_demo_command("set_throttle", [decision["max_fps"], decision["stride"]])
+                    print(f"[THROTTLE] {decision}")
+                    decision.update({
+                        "timestamp": int(time.time()),
+                        "launcher": "iotc-launcher",
+                        "event": "throttle",
+                        "delivered": delivered
+                    })
+                    send_telemetry(decision)
+        except Exception as e:
+            # Keep sampling: throttling and accounting depend on this loop
+            print(f"[STATS] Sampling failed: {e}")
+        time.sleep(STATS_INTERVAL)
+
 def telemetry_loop():
     while True:
-        stats = get_system_stats()
-        if CURRENT_SCRIPT.endswith(SUFFIX):
-            active_script = CURRENT_SCRIPT[:-len(SUFFIX)]
+        stats = dict(LATEST_STATS) if LATEST_STATS else get_system_stats()
+        current_script = SUPERVISOR.active() or "notme"
+        if current_script.endswith(SUFFIX):
+            active_script = current_script[:-len(SUFFIX)]
         else:
-            active_script = CURRENT_SCRIPT
+            active_script = current_script
 
         stats.update({
             "timestamp": int(time.time()),
             "launcher": "iotc-launcher",
-            "active_script": active_script
+            "active_script": active_script,
+            "throttle_level": THROTTLE.level,
+            "telemetry_dropped": MUX.stats["dropped"],
+            **SUPERVISOR.status(),
+            **ACCOUNTING.summary()
         })
 
-        send_telemetry(stats)
+        MUX.flush_interval(stats)
         time.sleep(TELEMETRY_INTERVAL)
 
 
 def stop_current_script():
-    global DEMO_PROCESS, CURRENT_SCRIPT
-    if DEMO_PROCESS and DEMO_PROCESS.poll() is None:
-        print(f"[PROCESS] Terminating {CURRENT_SCRIPT}...")
-        DEMO_PROCESS.terminate()
-        try:
-            DEMO_PROCESS.wait(timeout=3)
-        except subprocess.TimeoutExpired:
-            DEMO_PROCESS.kill()
-    DEMO_PROCESS = None
-    CURRENT_SCRIPT = "notme"
+    SUPERVISOR.stop()
     print("[PROCESS] Demo stopped.")
 
-def launch_script(script_name):
-    global DEMO_PROCESS, CURRENT_SCRIPT
-    stop_current_script()
+def validate_model(script_name):
+    demo = DEMO_MODEL_DIRS.get(script_name)
+    if not demo or catalog.scan(demo)["current"] is None:
+        return []
+    return catalog.validate(catalog.resolve(demo))
+
+def launch_script(script_name, camera=None):
     full_path = os.path.join(os.getcwd(), script_name)
     if not os.path.exists(full_path):
         print(f"[LAUNCH] Script not found: {full_path}")
         return
-    DEMO_PROCESS = subprocess.Popen(["python3", full_path, "/dev/video0"])
-    CURRENT_SCRIPT = script_name
-    print(f"[LAUNCH] Started {script_name} on /dev/video0")
+    errors = validate_model(script_name)
+    if errors:
+        print(f"[LAUNCH] Not starting {script_name}: {errors}")
+        send_telemetry({
+            "timestamp": int(time.time()),
+            "launcher": "iotc-launcher",
+            "event": "launch_failed",
+            "script": script_name,
+            "errors": errors
+        })
+        return
+    THROTTLE.reset()
+    env = dict(os.environ, **{DEMO_CMD_SOCKET_ENV: DEMO_CMD_SOCKET_PATH,
+                              TELEMETRY_SOCKET_ENV: DEMO_TELEMETRY_SOCKET_PATH})
+    camera = camera or CAMERA_INPUT
+    SUPERVISOR.start(script_name, ["python3", full_path, camera], env)
+    print(f"[LAUNCH] Started {script_name} on {camera}")
+
+def prebuild_engines():
+    if not PREBUILD_LOCK.acquire(blocking=False):
+        print("[ENGINE] Prebuild already running")
+        return
+    try:
+        cache = engineCache()
+        built = cache.prebuild(subprocess_builder)
+        send_telemetry({
+            "timestamp": int(time.time()),
+            "launcher": "iotc-launcher",
+            "event": "engines_prebuilt",
+            "built": built,
+            "engines": cache.status()
+        })
+    except Exception as e:
+        print(f"[ENGINE] Prebuild failed: {e}")
+    finally:
+        PREBUILD_LOCK.release()
 
 def connect_command_socket():
     while not os.path.exists(CMD_SOCKET_PATH):
@@ -141,7 +271,7 @@ def command_loop():
             if cmd == "launch" and args:
                 script = args[0]
                 if script.endswith("-iotc.py") and os.path.exists(script):
-                    launch_script(script)
+                    launch_script(script, args[1] if len(args) > 1 else None)
                 else:
                     print(f"[COMMAND] Not a valid demo: {script}")
             elif cmd == "set_frequency" and args:
@@ -151,14 +281,44 @@ def command_loop():
                     print(f"[COMMAND] Telemetry frequency set to {TELEMETRY_INTERVAL}s")
                 except:
                     print("[COMMAND] Invalid frequency arg")
+            elif cmd == "set_telemetry_rate" and args:
+                try:
+                    MUX.bucket.rate = float(args[0])
+                    print(f"[COMMAND] Telemetry rate limit set to {MUX.bucket.rate} msg/s")
+                except:
+                    print("[COMMAND] Invalid telemetry rate arg")
             elif cmd == "stop_demo":
                 stop_current_script()
+            elif cmd == "prebuild_engines":
+                threading.Thread(target=prebuild_engines, daemon=True).start()
+            elif cmd == "list_models":
+                send_telemetry({
+                    "timestamp": int(time.time()),
+                    "launcher": "iotc-launcher",
+                    "models": catalog.list_models()
+                })
+            elif cmd == "set_throttle_budget" and len(args) == 2:
+                try:
+                    THROTTLE.gpu_budget = float(args[0])
+                    THROTTLE.temp_budget = float(args[1])
+                    print(f"[COMMAND] Throttle budget: GPU {THROTTLE.gpu_budget}%, {THROTTLE.temp_budget}C")
+                except:
+                    print("[COMMAND] Invalid throttle budget args")
+            elif cmd == "set_throttling" and args:
+                THROTTLE.enabled = str(args[0]).lower() in ("on", "1", "true", "yes")
+                if not THROTTLE.enabled and THROTTLE.level:
+                    THROTTLE.reset()
+                    send_demo_command("set_throttle", [0, 1])
+                print(f"[COMMAND] Throttling {'enabled' if THROTTLE.enabled else 'disabled'}")
         except Exception as e:
             print(f"[COMMAND] Error: {e}")
             sock.close()
             sock = connect_command_socket()
 
 if __name__ == "__main__":
+    SUPERVISOR.install_sigchld()
+    MUX.start(DEMO_TELEMETRY_SOCKET_PATH)
+    threading.Thread(target=stats_sampler_loop, daemon=True).start()
     threading.Thread(target=telemetry_loop, daemon=True).start()
     threading.Thread(target=command_loop, daemon=True).start()
     print("[LAUNCHER] IoTC demo launcher running...")
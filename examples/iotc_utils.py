@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import socket
+import threading
+
+# Path to the IoTConnect command socket (served by the iotconnect snap)
+CMD_SOCKET_PATH = "/var/snap/iotconnect/common/iotc_cmd.sock"
+# Environment variable naming the local control socket the launcher sends
+# demo commands to (set by iotc-launcher.py when it starts a demo)
+DEMO_CMD_SOCKET_ENV = "IOTC_DEMO_CMD_SOCKET"
+# Environment variable naming the launcher's telemetry socket, which demos
+# write to instead of the IoTConnect socket when started by the launcher
+TELEMETRY_SOCKET_ENV = "IOTC_TELEMETRY_SOCKET"
+# Environment variable naming the pipe fd demos report processed frames on
+# (read by the launcher's supervisor watchdog)
+HEARTBEAT_FD_ENV = "IOTC_HEARTBEAT_FD"
+
+
+def telemetry_socket_path(default):
+    """
+    Path demos send telemetry to: the launcher's multiplexer when it started us, else `default`.
+    """
+    return os.environ.get(TELEMETRY_SOCKET_ENV) or default
+
+
+class heartbeatWriter:
+    """
+    Reports the demo's processed-frame count to the launcher's watchdog,
+    at most once per `interval` seconds.  A no-op when not started by the
+    launcher; writes never block, so a stalled reader can't stall the demo.
+    """
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.frames = 0
+        self.last = 0
+        self.fd = None
+        fd = os.environ.get(HEARTBEAT_FD_ENV)
+        if fd:
+            try:
+                self.fd = int(fd)
+                os.set_blocking(self.fd, False)
+            except (ValueError, OSError) as e:
+                print(f"[HEARTBEAT] Disabled: {e}")
+                self.fd = None
+
+    def beat(self, frames=1):
+        self.frames += frames
+        if self.fd is None:
+            return
+        now = time.monotonic()
+        if now - self.last < self.interval:
+            return
+        self.last = now
+        try:
+            os.write(self.fd, f"{self.frames}\n".encode())
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.fd = None
+
+
+def connect_command_socket():
+    """
+    Block until the IoTConnect command socket exists and accepts a connection.
+    """
+    while not os.path.exists(CMD_SOCKET_PATH):
+        time.sleep(0.5)
+    while True:
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(CMD_SOCKET_PATH)
+            print("[CMD] Connected to command socket.")
+            return sock
+        except Exception as e:
+            print(f"[CMD] Connection error: {e}, retrying in 1 sec...")
+            time.sleep(1)
+
+
+def parse_command(cmd_json):
+    """
+    Split a command message into (cmd, args).  Commands may carry their
+    arguments in "args" or inline, e.g. {"cmd": "set_box 10 10 200 200"}.
+    """
+    cmd = cmd_json.get("cmd") or cmd_json.get("name", "")
+    args = cmd_json.get("args", [])
+    if isinstance(args, str):
+        args = args.split()
+    parts = str(cmd).split()
+    if not parts:
+        return "", []
+    if len(parts) > 1 and not args:
+        args = parts[1:]
+    return parts[0], list(args)
+
+
+def command_listener(handler):
+    """
+    Receive JSON commands from the command socket and call handler(cmd, args)
+    for each one, reconnecting whenever the socket drops.
+    """
+    sock = connect_command_socket()
+    buffer = b""
+    while True:
+        try:
+            data = sock.recv(4096)
+            if not data:
+                print("[CMD] Disconnected by server, reconnecting...")
+                sock.close()
+                sock = connect_command_socket()
+                buffer = b""
+                continue
+
+            buffer += data
+            try:
+                cmd_json = json.loads(buffer.decode("utf-8"))
+            except json.JSONDecodeError:
+                continue  # partial JSON, keep receiving
+            buffer = b""
+
+            cmd, args = parse_command(cmd_json)
+            print(f"[CMD] Received: {cmd}, Args: {args}")
+            try:
+                handler(cmd, args)
+            except Exception as e:
+                print(f"[CMD] Failed to process {cmd}: {e}")
+
+        except Exception as e:
+            print(f"[CMD] Listener socket error: {e}, reconnecting...")
+            sock.close()
+            sock = connect_command_socket()
+            buffer = b""
+
+
+def control_server(handler, path):
+    """
+    Serve the launcher's local control socket: each connection carries one
+    JSON command, dispatched to handler(cmd, args) like dashboard commands.
+    """
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(4)
+    print(f"[CMD] Listening for launcher commands on {path}")
+    while True:
+        conn, _ = server.accept()
+        try:
+            with conn:
+                conn.settimeout(1.0)
+                buffer = b""
+                while True:
+                    data = conn.recv(4096)
+                    if not data:
+                        break
+                    buffer += data
+            cmd, args = parse_command(json.loads(buffer.decode("utf-8")))
+            print(f"[CMD] Launcher: {cmd}, Args: {args}")
+            handler(cmd, args)
+        except Exception as e:
+            print(f"[CMD] Failed to process launcher command: {e}")
+
+
+def start_command_listener(handler):
+    """
+    Run command_listener(handler) on a daemon thread, plus the launcher
+    control socket when this demo was started by iotc-launcher.py.
+    """
+    thread = threading.Thread(target=command_listener, args=(handler,), daemon=True)
+    thread.start()
+    control_path = os.environ.get(DEMO_CMD_SOCKET_ENV)
+    if control_path:
+        threading.Thread(target=control_server, args=(handler, control_path), daemon=True).start()
+    return thread
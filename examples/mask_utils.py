@@ -0,0 +1,502 @@
+import base64
+import threading
+import time
+import numpy as np
+
+# Snapshot grids are capped so the encoded mask stays well within a telemetry message
+MAX_SNAPSHOT_CELLS = 64 * 32
+
+
+def downsample_mask(mask, width=32, height=16):
+    """
+    A (height, width) grid of class IDs sampled from the middle of each
+    cell of an (H, W) or (H, W, 1) class mask.  This is a strided view of
+    the mask, nothing is copied.
+    """
+    mask = mask.reshape(mask.shape[0], mask.shape[1])
+    step_y = max(1, mask.shape[0] // height)
+    step_x = max(1, mask.shape[1] // width)
+    return mask[step_y // 2::step_y, step_x // 2::step_x][:height, :width]
+
+
+def rle_encode(values):
+    """
+    Run-length encode a flat uint8 array as (value, run length) byte pairs, runs split at 255.
+    """
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    lengths = np.diff(np.r_[starts, values.size])
+    pieces = (lengths + 254) // 255
+    runs = np.full(int(pieces.sum()), 255, dtype=np.int64)
+    runs[np.cumsum(pieces) - 1] = lengths - 255 * (pieces - 1)
+    return np.stack([np.repeat(values[starts], pieces), runs], axis=1).astype(np.uint8).tobytes()
+
+
+def rle_decode(data):
+    pairs = np.frombuffer(data, dtype=np.uint8).reshape(-1, 2)
+    return np.repeat(pairs[:, 0], pairs[:, 1])
+
+
+def pack_encode(values):
+    """
+    Palette-pack a flat uint8 array: each value becomes its index in the
+    sorted palette of values present, stored in as few bits as that takes.
+    Returns (palette, bits, data).
+    """
+    palette = np.unique(values)
+    bits = max(1, int(np.ceil(np.log2(len(palette)))))
+    indices = np.searchsorted(palette, values)
+    planes = (indices[:, None] >> np.arange(bits)) & 1
+    return palette, bits, np.packbits(planes.astype(np.uint8).ravel()).tobytes()
+
+
+def pack_decode(palette, bits, data, count):
+    planes = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count * bits).reshape(count, bits)
+    return np.asarray(palette, dtype=np.uint8)[planes.astype(np.int64) @ (1 << np.arange(bits))]
+
+
+def encode_mask(grid):
+    """
+    Encode a grid of class IDs (< 256) as {"w", "h", "encoding", "data"},
+    with data base64 encoded, using whichever of run-length or palette
+    packing is smaller.  The data is never larger than the packed size,
+    ceil(w * h * bits / 8) bytes for the bits needed by the classes present.
+    """
+    height, width = grid.shape
+    values = np.ascontiguousarray(grid, dtype=np.uint8).ravel()
+    rle = rle_encode(values)
+    palette, bits, packed = pack_encode(values)
+    snapshot = {"w": width, "h": height}
+    if len(rle) <= len(packed):
+        snapshot.update(encoding="rle", data=base64.b64encode(rle).decode("ascii"))
+    else:
+        snapshot.update(encoding="packed", palette=palette.tolist(), bits=bits,
+                        data=base64.b64encode(packed).decode("ascii"))
+    return snapshot
+
+
+def decode_mask(snapshot):
+    """
+    Inverse of encode_mask(): the (h, w) uint8 grid of class IDs.
+    """
+    data = base64.b64decode(snapshot["data"])
+    count = snapshot["w"] * snapshot["h"]
+    if snapshot["encoding"] == "rle":
+        values = rle_decode(data)
+    else:
+        values = pack_decode(snapshot["palette"], snapshot["bits"], data, count)
+    return values.reshape(snapshot["h"], snapshot["w"])
+
+
+class maskSnapshots:
+    """
+    Pending snapshot_mask requests, set from the command thread and taken
+    by the inference loop on its next frame.
+    """
+    def __init__(self, width=32, height=16):
+        self.lock = threading.Lock()
+        self.size = (width, height)
+        self.pending = None
+
+    def request(self, width=None, height=None):
+        width = max(1, int(width or self.size[0]))
+        height = max(1, int(height or self.size[1]))
+        if width * height > MAX_SNAPSHOT_CELLS:
+            raise ValueError(f"snapshot grid {width}x{height} is larger than {MAX_SNAPSHOT_CELLS} cells")
+        with self.lock:
+            self.pending = (width, height)
+        return self.pending
+
+    def take(self):
+        """
+        The (width, height) of a pending request, or None.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, None
+        return pending
+
+    def payload(self, mask, size, label):
+        """
+        mask_snapshot event for a class mask, with the labels of the classes present.
+        `label` maps a class ID to its name.
+        """
+        grid = downsample_mask(mask, *size)
+        snapshot = encode_mask(grid)
+        return {
+            "event": "mask_snapshot",
+            "mask": snapshot,
+            "mask_labels": {str(c): label(c) for c in np.unique(grid).tolist()}
+        }
+
+
+def handle_mask_command(snapshots, cmd, args):
+    """
+    snapshot_mask [width] [height].  Returns True if handled.
+    """
+    if cmd != "snapshot_mask":
+        return False
+    try:
+        width, height = snapshots.request(*args[:2])
+        print(f"[CMD] Mask snapshot requested ({width}x{height})")
+    except ValueError as e:
+        print(f"[CMD] Invalid snapshot_mask: {e}")
+    return True
+
+
+class coverageFilter:
+    """
+    Per-class coverage of a class-ID mask, with ignored and watched classes.
+
+    Labels are resolved to class IDs once, into lookup tables indexed by
+    class ID, so each frame is a single bincount over the mask followed by
+    table operations on the per-class counts.  Ignored classes are left
+    out of both the coverage and its denominator.  A watched class
+    produces an event as soon as its coverage reaches its threshold (and
+    again once it drops below).  While paused, coverage() and events()
+    return nothing.
+
+    update() replaces `percent` with a new array rather than writing into
+    it, so coverage() can run on another thread (the telemetry loop) and
+    still see a single frame's percentages.
+    """
+    def __init__(self, labels, ignore=(), watch=None):
+        self.labels = list(labels)
+        self.index = {label.lower(): class_id for class_id, label in enumerate(self.labels)}
+        self.num_classes = len(self.labels)
+        self.ignored = np.zeros(self.num_classes, dtype=bool)
+        self.thresholds = np.full(self.num_classes, np.inf)
+        self.active = np.zeros(self.num_classes, dtype=bool)
+        self.percent = np.zeros(self.num_classes)
+        self.paused = False
+        for label in ignore:
+            self.ignore(label)
+        for label, threshold in (watch or {}).items():
+            self.watch(label, threshold)
+
+    def class_id(self, label):
+        class_id = self.index.get(str(label).lower())
+        if class_id is None:
+            raise ValueError(f"unknown class '{label}'")
+        return class_id
+
+    def ignore(self, label, ignored=True):
+        self.ignored[self.class_id(label)] = ignored
+
+    def watch(self, label, threshold=5.0):
+        class_id = self.class_id(label)
+        self.thresholds[class_id] = float(threshold)
+        self.active[class_id] = False
+
+    def unwatch(self, label=None):
+        if label is None:
+            self.thresholds[:] = np.inf
+        else:
+            self.thresholds[self.class_id(label)] = np.inf
+
+    def update(self, mask):
+        """
+        Count one class-ID mask.  Returns watch events as
+        [(event, label, coverage %, threshold %)], event being
+        "watched_class_detected" or "watched_class_cleared".
+        """
+        counts = np.bincount(mask.ravel(), minlength=self.num_classes)[:self.num_classes]
+        counts[self.ignored] = 0
+        total = counts.sum()
+        percent = counts * (100.0 / total if total else 0.0)
+        self.percent = percent
+
+        above = percent >= self.thresholds
+        changed = np.flatnonzero((above != self.active) & np.isfinite(self.thresholds))
+        self.active[:] = above
+        if self.paused:
+            return []
+        return [("watched_class_detected" if above[c] else "watched_class_cleared", self.labels[c],
+                 round(float(percent[c]), 2), float(self.thresholds[c])) for c in changed.tolist()]
+
+    def coverage(self, top=None):
+        """
+        {label: coverage %} of the classes present, largest first, or None while paused.
+        """
+        if self.paused:
+            return None
+        percent = self.percent
+        present = np.flatnonzero(percent > 0)
+        present = present[np.argsort(-percent[present], kind="stable")][:top]
+        return {self.labels[c]: round(float(percent[c]), 2) for c in present.tolist()}
+
+
+def handle_coverage_command(coverage, cmd, args):
+    """
+    Coverage commands:
+      watch_class <label> [threshold_percent]
+      unwatch_class [label]
+      ignore_class <label> / unignore_class <label>
+      pause_telemetry / resume_telemetry
+    Returns True if handled.
+    """
+    try:
+        if cmd == "watch_class" and args:
+            coverage.watch(args[0], *[float(a) for a in args[1:2]])
+            print(f"[CMD] Watching class '{args[0]}'")
+        elif cmd == "unwatch_class":
+            coverage.unwatch(args[0] if args else None)
+            print(f"[CMD] Stopped watching {args[0] if args else 'all classes'}")
+        elif cmd in ("ignore_class", "unignore_class") and args:
+            coverage.ignore(args[0], cmd == "ignore_class")
+            print(f"[CMD] {'Ignoring' if cmd == 'ignore_class' else 'Counting'} class '{args[0]}'")
+        elif cmd in ("pause_telemetry", "resume_telemetry"):
+            coverage.paused = cmd == "pause_telemetry"
+            print(f"[CMD] Telemetry {'paused' if coverage.paused else 'resumed'}")
+        else:
+            return False
+    except ValueError as e:
+        print(f"[CMD] {cmd} failed: {e}")
+    return True
+
+
+def label_components(grid):
+    """
+    Label the 4-connected regions of equal class ID in a 2-D grid.
+    Returns (labels, count): labels numbers each cell's region 0..count-1.
+
+    Vectorized union-find: every cell starts as its own root; each round
+    hooks the roots of neighbouring same-class cells onto the smaller
+    root, then compresses paths by pointer jumping, until no root changes.
+    """
+    height, width = grid.shape
+    parent = np.arange(grid.size, dtype=np.int64)
+    index = parent.reshape(height, width)
+    same_h = grid[:, 1:] == grid[:, :-1]
+    same_v = grid[1:, :] == grid[:-1, :]
+    a = np.concatenate([index[:, :-1][same_h], index[:-1, :][same_v]])
+    b = np.concatenate([index[:, 1:][same_h], index[1:, :][same_v]])
+    while True:
+        ra, rb = parent[a], parent[b]
+        differ = ra != rb
+        if not differ.any():
+            break
+        ra, rb = ra[differ], rb[differ]
+        np.minimum.at(parent, np.maximum(ra, rb), np.minimum(ra, rb))
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+    roots, labels = np.unique(parent, return_inverse=True)
+    return labels.reshape(height, width), len(roots)
+
+
+def region_stats(grid, min_cells=1):
+    """
+    Connected regions of a class-ID grid as parallel arrays: class ID,
+    size in cells, centroid (x, y) and box (x, y, w, h), in grid cells,
+    largest region first.  Regions smaller than `min_cells` are dropped.
+    """
+    labels, count = label_components(grid)
+    flat = labels.ravel()
+    yy, xx = np.indices(grid.shape)
+    sizes = np.bincount(flat, minlength=count)
+    centroids = np.stack([np.bincount(flat, xx.ravel(), count), np.bincount(flat, yy.ravel(), count)], axis=1) / sizes[:, None]
+    lo = np.full((count, 2), np.iinfo(np.int64).max)
+    hi = np.full((count, 2), -1)
+    points = np.stack([xx.ravel(), yy.ravel()], axis=1)
+    np.minimum.at(lo, flat, points)
+    np.maximum.at(hi, flat, points)
+    classes = np.zeros(count, dtype=grid.dtype)
+    classes[flat] = grid.ravel()
+
+    keep = np.flatnonzero(sizes >= min_cells)
+    keep = keep[np.argsort(-sizes[keep], kind="stable")]
+    return classes[keep], sizes[keep], centroids[keep], np.concatenate([lo, hi - lo + 1], axis=1)[keep]
+
+
+def label_components_reference(grid):
+    """
+    Plain flood fill, for checking label_components().
+    """
+    height, width = grid.shape
+    labels = np.full(grid.shape, -1, dtype=np.int64)
+    count = 0
+    for y in range(height):
+        for x in range(width):
+            if labels[y, x] >= 0:
+                continue
+            labels[y, x] = count
+            stack = [(y, x)]
+            while stack:
+                cy, cx = stack.pop()
+                for ny, nx in ((cy - 1, cx), (cy + 1, cx), (cy, cx - 1), (cy, cx + 1)):
+                    if 0 <= ny < height and 0 <= nx < width and labels[ny, nx] < 0 and grid[ny, nx] == grid[cy, cx]:
+                        labels[ny, nx] = count
+                        stack.append((ny, nx))
+            count += 1
+    return labels, count
+
+
+class regionAnalyzer:
+    """
+    Per-class region counts, centroids and boxes, computed on a worker
+    thread so the inference loop only pays for a small grid copy.
+
+    The loop calls due() each frame and, when it returns True, hands a
+    class-ID grid to submit(); the worker labels it and publishes the
+    result, which latest() returns.  A grid submitted while the worker is
+    still busy replaces the one waiting, it never queues up.  Coordinates
+    in the result are fractions (0..1) of the frame.
+    """
+    def __init__(self, label, interval=1.0, min_cells=2, max_regions=5, ignore=()):
+        self.label = label
+        self.interval = interval
+        self.min_cells = min_cells
+        self.max_regions = max_regions
+        self.ignore = set(ignore)
+        self.cond = threading.Condition()
+        self.grid = None
+        self.result = {}
+        self.last_submit = 0.0
+        self.compute_ms = 0.0
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def due(self, now):
+        return now - self.last_submit >= self.interval
+
+    def submit(self, grid, now):
+        grid = np.array(grid.reshape(grid.shape[0], grid.shape[1]), copy=True)
+        with self.cond:
+            self.grid = grid
+            self.last_submit = now
+            self.cond.notify()
+
+    def latest(self):
+        with self.cond:
+            return self.result
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.grid is not None)
+                grid, self.grid = self.grid, None
+            start = time.perf_counter()
+            result = self.analyze(grid)
+            with self.cond:
+                self.result = result
+                self.compute_ms = (time.perf_counter() - start) * 1000.0
+
+    def analyze(self, grid):
+        """
+        {label: {"count", "centroids", "boxes"}} for one class-ID grid.
+        """
+        classes, sizes, centroids, boxes = region_stats(grid, self.min_cells)
+        height, width = grid.shape
+        scale = np.array([width, height, width, height], dtype=np.float64)
+        centroids = np.round(centroids / scale[:2], 3).tolist()
+        boxes = np.round(boxes / scale, 3).tolist()
+        result = {}
+        for c, centroid, box in zip(classes.tolist(), centroids, boxes):
+            name = self.label(c)
+            if c in self.ignore or name in self.ignore:
+                continue
+            regions = result.setdefault(name, {"count": 0, "centroids": [], "boxes": []})
+            regions["count"] += 1
+            if len(regions["centroids"]) < self.max_regions:
+                regions["centroids"].append(centroid)
+                regions["boxes"].append(box)
+        return result
+
+
+def synthetic_mask(rng, height, width, num_classes=21, blobs=12):
+    """
+    Background with rectangular and elliptical class blobs, like a segmentation mask.
+    """
+    mask = np.zeros((height, width), dtype=np.uint8)
+    yy, xx = np.mgrid[0:height, 0:width]
+    for _ in range(blobs):
+        c = rng.integers(1, num_classes)
+        cy, cx = rng.uniform(0, height), rng.uniform(0, width)
+        ry, rx = rng.uniform(0.03, 0.2) * height, rng.uniform(0.03, 0.2) * width
+        if rng.random() < 0.5:
+            mask[((yy - cy) / ry) ** 2 + ((xx - cx) / rx) ** 2 <= 1] = c
+        else:
+            mask[(abs(yy - cy) <= ry) & (abs(xx - cx) <= rx)] = c
+    return mask
+
+
+if __name__ == "__main__":
+    # Round trips and size bounds on synthetic masks
+    import json
+
+    rng = np.random.default_rng(0)
+    cases = {
+        "blobs": synthetic_mask(rng, 512, 1024),
+        "single": np.full((512, 1024), 7, dtype=np.uint8),
+        "noise": rng.integers(0, 21, (512, 1024)).astype(np.uint8),
+        "all_ids": rng.integers(0, 256, (512, 1024)).astype(np.uint8),
+    }
+    for name, mask in cases.items():
+        for width, height in ((32, 16), (64, 32), (7, 3)):
+            grid = downsample_mask(mask[:, :, None], width, height)
+            assert np.shares_memory(grid, mask), "downsample_mask copied the mask"
+            snapshot = encode_mask(grid)
+            assert np.array_equal(decode_mask(snapshot), grid), f"{name} {width}x{height} did not round-trip"
+            bits = max(1, int(np.ceil(np.log2(len(np.unique(grid))))))
+            assert len(base64.b64decode(snapshot["data"])) <= -(-grid.size * bits // 8)
+            size = len(json.dumps({"event": "mask_snapshot", "mask": snapshot}))
+            print(f"{name:8s} {width:2d}x{height:<2d}: {snapshot['encoding']:6s} {size:5d} B")
+
+    # Every split of a long run, and edge lengths
+    for length in (1, 254, 255, 256, 510, 511, 2048):
+        values = np.r_[np.full(length, 3), [5]].astype(np.uint8)
+        assert np.array_equal(rle_decode(rle_encode(values)), values)
+
+    snapshots = maskSnapshots()
+    mask = cases["blobs"]
+    start = time.perf_counter()
+    for _ in range(1000):
+        payload = snapshots.payload(mask, (32, 16), lambda c: f"class{c}")
+    print(f"snapshot payload: {(time.perf_counter() - start):.3f} ms per 32x16 snapshot of a 1024x512 mask")
+
+    # Region labeling against a flood fill reference, then timing by grid size
+    for trial in range(20):
+        grid = synthetic_mask(rng, 24, 40, num_classes=4, blobs=8)
+        if trial % 4 == 0:
+            grid = rng.integers(0, 3, (24, 40)).astype(np.uint8)
+        labels, count = label_components(grid)
+        reference, ref_count = label_components_reference(grid)
+        assert count == ref_count, f"{count} regions, reference has {ref_count}"
+        pairs = np.unique(np.stack([labels.ravel(), reference.ravel()], axis=1), axis=0)
+        assert len(pairs) == count, "labeling differs from the reference"
+    print("label_components matches the flood fill reference")
+
+    analyzer = regionAnalyzer(lambda c: f"class{c}", min_cells=2)
+    for width, height in ((64, 32), (128, 64), (256, 128), (512, 256), (1024, 512)):
+        grid = synthetic_mask(rng, height, width, blobs=20)
+        start = time.perf_counter()
+        result = analyzer.analyze(grid)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        regions = sum(r["count"] for r in result.values())
+        print(f"regions {width:4d}x{height:<3d}: {elapsed:7.2f} ms, {regions} regions in {len(result)} classes")
+
+    # Coverage with an ignored class and a watched class, against a fake label table
+    labels = ["void", "road", "car", "person", "sky"]
+    coverage = coverageFilter(labels, ignore=["void"], watch={"person": 10.0})
+    mask = np.zeros((100, 200), dtype=np.uint8)
+    mask[:50] = 1
+    mask[50:, :100] = 2
+    assert coverage.update(mask) == []
+    assert coverage.coverage() == {"road": 66.67, "car": 33.33}, coverage.coverage()
+    mask[60:, 100:150] = 3
+    events = coverage.update(mask)
+    assert events == [("watched_class_detected", "person", 11.76, 10.0)], events
+    assert coverage.update(mask) == []
+    mask[60:, 100:150] = 0
+    assert coverage.update(mask)[0][0] == "watched_class_cleared"
+    coverage.paused = True
+    assert coverage.coverage() is None
+    print("coverageFilter ignores, watches and pauses as expected")
+
+    mask = synthetic_mask(rng, 512, 1024)
+    coverage = coverageFilter([f"class{c}" for c in range(21)], ignore=["class0"], watch={"class3": 5.0})
+    start = time.perf_counter()
+    for _ in range(100):
+        coverage.update(mask)
+        coverage.coverage()
+    print(f"coverage: {(time.perf_counter() - start) * 10:.2f} ms per 1024x512 mask")
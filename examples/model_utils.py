@@ -0,0 +1,312 @@
+import os
+import json
+import hashlib
+
+# Root of the OTA-managed models tree (one directory per demo)
+MODELS_ROOT = "/var/snap/iotconnect/common/models"
+MANIFEST_NAME = "manifest.json"
+CURRENT_MODEL_FILE = "current-model.txt"
+MODEL_EXTENSIONS = (".onnx", ".uff", ".caffemodel", ".pth")
+
+# Manifest keys naming files (resolved against the demo directory)
+FILE_KEYS = ("model", "labels", "prototxt", "topology", "colormap", "colors")
+# Manifest key -> jetson-inference command-line flag
+FLAG_KEYS = (
+    ("model", "--model"),
+    ("labels", "--labels"),
+    ("prototxt", "--prototxt"),
+    ("topology", "--topology"),
+    ("colormap", "--colormap"),
+    ("colors", "--colors"),
+    ("input_blob", "--input-blob"),
+    ("output_blob", "--output-blob"),
+    ("output_cvg", "--output-cvg"),
+    ("output_bbox", "--output-bbox"),
+)
+
+# Built-in model of each demo, used when its directory has no manifest entry.
+# "optional" lists file keys only passed to the network when the file exists.
+DEFAULT_MODELS = {
+    "actionnet": {
+        "model": "resnet-18-kinetics-moments.onnx",
+        "labels": ["labels.txt", os.path.join(MODELS_ROOT, "labels.txt")]
+    },
+    "depthnet": {
+        "model": "fcn-mobilenet.onnx",
+        "labels": "labels.txt",
+        "optional": ["labels"]
+    },
+    "detectnet": {
+        "model": "ssd_mobilenet_v2_coco.uff",
+        "labels": "ssd_coco_labels.txt",
+        "uff": True,
+        "input_blob": "Input",
+        "output_cvg": "NMS",
+        "output_bbox": "NMS_1"
+    },
+    "imagenet": {
+        "model": "bvlc_googlenet.caffemodel",
+        "prototxt": ["{stem}.prototxt", "googlenet.prototxt", "googlenet_noprob.prototxt"],
+        "labels": os.path.join(MODELS_ROOT, "labels.txt")
+    },
+    "posenet": {
+        "model": "posenet.onnx",
+        "labels": "labels.txt",
+        "topology": "human_pose.json",
+        "colormap": "colors.txt",
+        "optional": ["labels", "colormap"]
+    },
+    "segnet": {
+        "model": "fcn_resnet18.onnx",
+        "labels": "classes.txt",
+        "colors": "colors.txt",
+        "input_blob": "input_0",
+        "output_blob": "output_0"
+    },
+}
+
+
+def sha256sum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class modelCatalog:
+    """
+    Catalog of the models available to each demo under MODELS_ROOT.
+
+    Each demo directory may hold a manifest.json describing its models:
+
+        {"models": {"ssd_mobilenet_v2_coco.uff": {
+            "labels": "ssd_coco_labels.txt", "uff": true,
+            "input_blob": "Input", "output_cvg": "NMS", "output_bbox": "NMS_1",
+            "sha256": {"model": "<hex digest>"}}}}
+
+    current-model.txt still selects the active model, so OTA updates keep
+    working.  Scans are cached per directory and only redone when the
+    directory, manifest or current-model.txt mtime changes; checksums are
+    cached per (size, mtime) of each file.
+    """
+    def __init__(self, root=MODELS_ROOT):
+        self.root = root
+        self.scans = {}
+        self.checksums = {}
+
+    def _stamp(self, directory):
+        stamp = []
+        for path in (directory, os.path.join(directory, MANIFEST_NAME), os.path.join(directory, CURRENT_MODEL_FILE)):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def scan(self, demo):
+        """
+        Return {"current": name, "manifest": {...}, "files": [...]} for a demo directory.
+        """
+        directory = os.path.join(self.root, demo)
+        stamp = self._stamp(directory)
+        cached = self.scans.get(demo)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        manifest = {}
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME)) as f:
+                manifest = json.load(f).get("models", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[MODEL] Invalid {directory}/{MANIFEST_NAME}: {e}")
+
+        current = None
+        try:
+            with open(os.path.join(directory, CURRENT_MODEL_FILE)) as f:
+                current = f.read().strip() or None
+        except Exception as e:
+            print(f"[MODEL] Error reading {directory}/{CURRENT_MODEL_FILE}: {e}")
+
+        try:
+            files = sorted(name for name in os.listdir(directory) if name.endswith(MODEL_EXTENSIONS))
+        except OSError:
+            files = []
+
+        scan = {"current": current, "manifest": manifest, "files": files}
+        self.scans[demo] = (stamp, scan)
+        return scan
+
+    def resolve(self, demo, defaults=None):
+        """
+        Build the entry for the demo's current model: manifest values over
+        the demo's built-in defaults (DEFAULT_MODELS), with file paths made
+        absolute.  A list of file names means "first one that exists";
+        "{stem}" expands to the model file name without its extension.
+        Optional files that don't exist are left out of the entry.
+        """
+        defaults = DEFAULT_MODELS.get(demo, {}) if defaults is None else defaults
+        scan = self.scan(demo)
+        name = scan["current"] or defaults.get("model")
+        entry = dict(defaults)
+        entry.update(scan["manifest"].get(name, {}))
+        entry["model"] = name
+        entry["name"] = name
+        entry["demo"] = demo
+        entry["in_manifest"] = name in scan["manifest"]
+
+        directory = os.path.join(self.root, demo)
+        stem = os.path.splitext(name)[0] if name else ""
+        for key in FILE_KEYS:
+            value = entry.get(key)
+            if not value:
+                continue
+            candidates = [os.path.join(directory, v.format(stem=stem))
+                          for v in (value if isinstance(value, list) else [value])]
+            found = next((c for c in candidates if os.path.isfile(c)), None)
+            if found is None and key in entry.get("optional", ()):
+                del entry[key]
+                continue
+            entry[key] = found or candidates[0]
+        return entry
+
+    def checksum(self, path):
+        st = os.stat(path)
+        key = (st.st_size, st.st_mtime_ns)
+        cached = self.checksums.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        digest = sha256sum(path)
+        self.checksums[path] = (key, digest)
+        return digest
+
+    def validate(self, entry):
+        """
+        Return a list of problems with a resolved entry (empty if it is usable).
+        """
+        errors = []
+        if not entry.get("model"):
+            return [f"no model selected for {entry.get('demo')}"]
+        for key in FILE_KEYS:
+            path = entry.get(key)
+            if path and not os.path.isfile(path):
+                errors.append(f"{key} file not found: {path}")
+        for key, expected in entry.get("sha256", {}).items():
+            path = entry.get(key)
+            if path and os.path.isfile(path) and self.checksum(path) != expected:
+                errors.append(f"{key} checksum mismatch: {path}")
+        return errors
+
+    def argv(self, entry):
+        """
+        Translate a resolved entry into jetson-inference command-line flags.
+        """
+        flags = [f"{flag}={entry[key]}" for key, flag in FLAG_KEYS if entry.get(key)]
+        if entry.get("uff"):
+            flags.append("--uff")
+        return flags + list(entry.get("flags", []))
+
+    def list_models(self):
+        """
+        Summarize every demo directory: current model, available models, validity.
+        """
+        summary = {}
+        try:
+            demos = sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+        except OSError:
+            return summary
+        for demo in demos:
+            scan = self.scan(demo)
+            entry = self.resolve(demo)
+            summary[demo] = {
+                "current": scan["current"],
+                "available": sorted(set(scan["files"]) | set(scan["manifest"])),
+                "errors": self.validate(entry) if scan["current"] else []
+            }
+        return summary
+
+
+# Shared catalog instance (scans are cached across calls)
+catalog = modelCatalog()
+
+
+def load_model_argv(demo, defaults=None):
+    """
+    Resolve and validate the demo's current model, returning (model_name, flags).
+    Raises FileNotFoundError before any network is constructed if files are missing.
+    """
+    entry = catalog.resolve(demo, defaults)
+    errors = catalog.validate(entry)
+    if errors:
+        raise FileNotFoundError(f"[MODEL] {demo}/{entry['name']}: " + "; ".join(errors))
+    return entry["name"], catalog.argv(entry)
+
+
+if __name__ == "__main__":
+    # Temporary models tree: a detectnet directory with a manifest and checksums, a posenet one without
+    import time
+    import shutil
+    import tempfile
+
+    root = tempfile.mkdtemp()
+    try:
+        def write(path, data):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(data)
+
+        detect_dir = os.path.join(root, "detectnet")
+        write(os.path.join(detect_dir, "ssd_mobilenet_v2_coco.uff"), "uff model")
+        write(os.path.join(detect_dir, "peoplenet.onnx"), "onnx model")
+        write(os.path.join(detect_dir, "ssd_coco_labels.txt"), "person\ncar\n")
+        write(os.path.join(detect_dir, "people_labels.txt"), "person\n")
+        write(os.path.join(detect_dir, MANIFEST_NAME), json.dumps({"models": {"peoplenet.onnx": {
+            "labels": "people_labels.txt", "input_blob": "input_0", "output_cvg": "scores", "output_bbox": "boxes",
+            "sha256": {"model": sha256sum(os.path.join(detect_dir, "peoplenet.onnx"))}}}}))
+        write(os.path.join(detect_dir, CURRENT_MODEL_FILE), "ssd_mobilenet_v2_coco.uff\n")
+        write(os.path.join(root, "posenet", "posenet.onnx"), "onnx model")
+        write(os.path.join(root, "posenet", "human_pose.json"), "{}")
+
+        catalog = modelCatalog(root)
+
+        # Built-in defaults when the current model has no manifest entry
+        entry = catalog.resolve("detectnet")
+        assert not entry["in_manifest"] and entry["uff"] and not catalog.validate(entry)
+        assert catalog.argv(entry)[0] == f"--model={os.path.join(detect_dir, 'ssd_mobilenet_v2_coco.uff')}"
+
+        # Cached until current-model.txt changes (mtime), then the manifest entry applies
+        assert catalog.scan("detectnet") is catalog.scan("detectnet")
+        time.sleep(0.01)
+        write(os.path.join(detect_dir, CURRENT_MODEL_FILE), "peoplenet.onnx\n")
+        entry = catalog.resolve("detectnet")
+        assert entry["in_manifest"] and entry["labels"].endswith("people_labels.txt"), entry
+        assert "--output-bbox=boxes" in catalog.argv(entry) and not catalog.validate(entry)
+
+        # Checksums are cached per file; a modified model fails validation
+        assert (os.path.join(detect_dir, "peoplenet.onnx")) in catalog.checksums
+        time.sleep(0.01)
+        write(os.path.join(detect_dir, "peoplenet.onnx"), "corrupted download")
+        assert catalog.validate(entry) == [f"model checksum mismatch: {entry['model']}"]
+
+        # Missing required files are reported before any network is constructed
+        os.remove(os.path.join(detect_dir, "people_labels.txt"))
+        errors = catalog.validate(catalog.resolve("detectnet"))
+        assert any(e.startswith("labels file not found") for e in errors), errors
+
+        # Optional files (poseNet's labels and colormap) are left out instead
+        entry = catalog.resolve("posenet")
+        assert "labels" not in entry and "colormap" not in entry and not catalog.validate(entry)
+        assert catalog.argv(entry) == [f"--model={os.path.join(root, 'posenet', 'posenet.onnx')}",
+                                       f"--topology={os.path.join(root, 'posenet', 'human_pose.json')}"]
+        write(os.path.join(root, "posenet", "colors.txt"), "255 0 0\n")
+        assert catalog.resolve("posenet")["colormap"].endswith("colors.txt")
+
+        summary = catalog.list_models()
+        print(json.dumps(summary, indent=2))
+        assert summary["detectnet"]["available"] == ["peoplenet.onnx", "ssd_mobilenet_v2_coco.uff"]
+        assert summary["detectnet"]["errors"] and not summary["posenet"]["errors"]
+        print("model catalog checks passed")
+    finally:
+        shutil.rmtree(root)
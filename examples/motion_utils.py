@@ -0,0 +1,138 @@
+import time
+import numpy as np
+
+
+class motionGate:
+    """
+    Cheap motion detector placed in front of the network.
+
+    Each frame is reduced to a tiny grayscale thumbnail with a strided
+    view (no full-frame copy) and compared against the thumbnail of the
+    last frame that was actually inferred.  Inference runs when more than
+    `threshold` of the thumbnail pixels changed by at least `pixel_delta`
+    gray levels, or when `max_skip` frames have been gated in a row.
+    """
+    def __init__(self, threshold=0.01, pixel_delta=15, max_skip=30, thumb_size=(32, 24), enabled=True):
+        self.threshold = float(threshold)
+        self.pixel_delta = float(pixel_delta)
+        self.max_skip = int(max_skip)
+        self.thumb_w, self.thumb_h = thumb_size
+        self.enabled = enabled
+
+        self.shape = None
+        self.step = (1, 1)
+        self.reference = None
+        self.skipped = 0
+        self.frames_executed = 0
+        self.frames_gated = 0
+
+    def configure(self, enabled=None, threshold=None, max_skip=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if threshold is not None:
+            self.threshold = float(threshold)
+        if max_skip is not None:
+            self.max_skip = int(max_skip)
+        self.reference = None
+        print(f"[MOTION] Gate {'on' if self.enabled else 'off'}, threshold={self.threshold}, max_skip={self.max_skip}")
+
+    def thumbnail(self, frame):
+        """
+        Downsample an HxW or HxWxC frame to a float32 grayscale thumbnail.
+        """
+        if frame.shape != self.shape:
+            self.shape = frame.shape
+            self.step = (max(1, frame.shape[0] // self.thumb_h), max(1, frame.shape[1] // self.thumb_w))
+            self.reference = None
+        thumb = frame[::self.step[0], ::self.step[1]]
+        if thumb.ndim == 3:
+            thumb = thumb[..., :3].mean(axis=2, dtype=np.float32)
+        return thumb.astype(np.float32, copy=False)
+
+    def check(self, frame):
+        """
+        Return True if the network should run on this frame.
+        """
+        if not self.enabled:
+            self.frames_executed += 1
+            return True
+
+        thumb = self.thumbnail(frame)
+        run = self.reference is None or self.skipped >= self.max_skip
+        if not run:
+            changed = np.count_nonzero(np.abs(thumb - self.reference) >= self.pixel_delta)
+            run = changed > self.threshold * thumb.size
+
+        if run:
+            self.reference = thumb
+            self.skipped = 0
+            self.frames_executed += 1
+        else:
+            self.skipped += 1
+            self.frames_gated += 1
+        return run
+
+    def stats(self, reset=True):
+        """
+        Return the executed/gated frame counts since the last call.
+        """
+        stats = {"frames_executed": self.frames_executed, "frames_gated": self.frames_gated}
+        if reset:
+            self.frames_executed = 0
+            self.frames_gated = 0
+        return stats
+
+
+def add_motion_args(parser):
+    """
+    Register the motion gate command-line options.
+    """
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="skip inference on frames without motion and reuse the last results")
+    parser.add_argument("--motion-threshold", type=float, default=0.01,
+                        help="fraction of thumbnail pixels that must change to run inference")
+    parser.add_argument("--motion-max-skip", type=int, default=30,
+                        help="maximum number of consecutive frames to skip")
+
+
+def create_motion_gate(args):
+    return motionGate(threshold=args.motion_threshold, max_skip=args.motion_max_skip, enabled=args.motion_gate)
+
+
+def handle_motion_command(gate, cmd, args):
+    """
+    set_motion_gate <on|off> [threshold] [max_skip]
+    Returns True if the command was a motion gate command.
+    """
+    if cmd != "set_motion_gate" or not args:
+        return False
+    gate.configure(enabled=str(args[0]).lower() in ("on", "1", "true", "yes"),
+                   threshold=args[1] if len(args) > 1 else None,
+                   max_skip=args[2] if len(args) > 2 else None)
+    return True
+
+
+if __name__ == "__main__":
+    # Synthetic 1080p sequence: static noisy room, a moving block in the middle third
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    gate = motionGate()
+    elapsed = 0.0
+    runs = []
+    for idx in range(300):
+        frame = background.copy()
+        if 100 <= idx < 200:
+            x = 10 * (idx - 100)
+            frame[400:700, x:x + 200] = 255
+        start = time.perf_counter()
+        runs.append(gate.check(frame))
+        elapsed += time.perf_counter() - start
+    stats = gate.stats()
+    print(f"{stats} over 300 frames, {elapsed * 1000.0 / 300:.3f} ms/frame")
+
+    # Static stretches only run on the max_skip refresh, the moving block at least every 10 frames
+    static = runs[:100] + runs[201:]
+    moving = np.flatnonzero(runs[100:201])
+    assert sum(static) <= 2 * (100 // (gate.max_skip + 1) + 1), runs
+    assert moving[0] == 0 and np.diff(moving).max() <= 10, moving
+    assert stats["frames_executed"] + stats["frames_gated"] == 300 and stats["frames_gated"] >= 240, stats
@@ -0,0 +1,155 @@
+import time
+
+
+class sourceStats:
+    """
+    Per-source frame accounting: frames served to the network and the
+    resulting rate over the current telemetry interval.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.total_frames = 0
+        self.interval_start = time.time()
+
+    def served(self):
+        self.frames += 1
+        self.total_frames += 1
+
+    def fps(self, reset=True):
+        now = time.time()
+        fps = self.frames / max(now - self.interval_start, 1e-6)
+        if reset:
+            self.frames = 0
+            self.interval_start = now
+        return fps
+
+
+class multiSource:
+    """
+    Serves frames from several video sources to a single network.
+
+    Sources are polled round-robin starting after the one served last, so
+    under load every camera gets an equal share of inference slots no
+    matter how fast it delivers frames.  A pass first polls every source
+    without waiting; if none has a frame ready, the next source in turn
+    is given up to `timeout` ms to deliver one.
+    """
+    def __init__(self, sources, timeout=100):
+        self.names = [name for name, _ in sources]
+        self.sources = [source for _, source in sources]
+        self.stats = {name: sourceStats(name) for name in self.names}
+        self.timeout = timeout
+        self.next = 0
+
+    @staticmethod
+    def Open(uris, argv=None, on_status=None):
+        """
+        Open one captureManager per URI (framebus:// or any videoSource URI),
+        named after the URI, so a camera that goes down is reopened without
+        holding up the others.
+        """
+        from capture_utils import open_capture
+        return multiSource([(uri, open_capture(uri, argv, on_status)) for uri in uris])
+
+    def Capture(self):
+        """
+        Return (source_name, image) for the next source with a frame ready,
+        or (None, None) if no source delivered one within the timeout.
+        """
+        count = len(self.sources)
+        for offset in range(count):
+            idx = (self.next + offset) % count
+            img = self._capture(idx, 0 if count > 1 else self.timeout)
+            if img is not None:
+                return self._served(idx, img)
+
+        idx = self.next
+        img = self._capture(idx, self.timeout) if count > 1 else None
+        if img is not None:
+            return self._served(idx, img)
+        self.next = (idx + 1) % count
+        return None, None
+
+    def _capture(self, idx, timeout):
+        try:
+            return self.sources[idx].Capture(timeout=timeout)
+        except Exception as e:
+            print(f"[SOURCE] {self.names[idx]} capture failed: {e}")
+            return None
+
+    def _served(self, idx, img):
+        self.next = (idx + 1) % len(self.sources)
+        name = self.names[idx]
+        self.stats[name].served()
+        return name, img
+
+    def IsStreaming(self):
+        return any(source.IsStreaming() for source in self.sources)
+
+    def alive(self):
+        """
+        True unless every source's capture thread is stuck (see captureManager.alive()).
+        """
+        return any(source.alive() if hasattr(source, "alive") else True for source in self.sources)
+
+    def capture_stats(self, name):
+        """
+        Camera health of one source (captureManager.stats()), if it has any.
+        """
+        source = self.sources[self.names.index(name)]
+        return source.stats() if hasattr(source, "stats") else {}
+
+
+class fakeSource:
+    """
+    Stand-in for videoSource delivering frames at a fixed rate.
+    """
+    def __init__(self, fps):
+        self.interval = 1.0 / fps
+        self.next_frame = time.perf_counter()
+
+    def Capture(self, timeout=1000):
+        wait = self.next_frame - time.perf_counter()
+        if wait > timeout / 1000.0:
+            time.sleep(timeout / 1000.0)
+            return None
+        if wait > 0:
+            time.sleep(wait)
+        self.next_frame = max(self.next_frame + self.interval, time.perf_counter())
+        return object()
+
+    def IsStreaming(self):
+        return True
+
+
+def _serve(sources, seconds, inference=0.05):
+    end = time.time() + seconds
+    while time.time() < end:
+        name, img = sources.Capture()
+        if img is not None:
+            time.sleep(inference)
+    served = {name: stats.total_frames for name, stats in sources.stats.items()}
+    total = max(sum(served.values()), 1)
+    for name, frames in served.items():
+        print(f"  {name}: {frames} frames, {frames / seconds:.1f} FPS served, {frames / total:.0%} of slots")
+    return served, total
+
+
+if __name__ == "__main__":
+    # Three fake cameras at 30, 15 and 5 FPS feeding a network that manages 20 FPS:
+    # cam5 gets every frame it delivers, the two fast cameras split the rest evenly
+    print("fair share:")
+    served, total = _serve(multiSource([("cam30", fakeSource(30)), ("cam15", fakeSource(15)),
+                                        ("cam5", fakeSource(5))]), 5.0)
+    assert served["cam5"] >= 0.8 * 5 * 5.0, served
+    assert abs(served["cam30"] - served["cam15"]) <= 0.1 * total, served
+    assert min(served["cam30"], served["cam15"]) >= 0.3 * total, served
+
+    # A camera that delivers one frame and then stalls must not starve the others
+    print("stalled source:")
+    served, total = _serve(multiSource([("cam30", fakeSource(30)), ("stalled", fakeSource(0.01)),
+                                        ("cam15", fakeSource(15))]), 5.0)
+    assert served["stalled"] <= 1, served
+    assert served["cam30"] + served["cam15"] >= 0.75 * 20 * 5.0, served
+    assert min(served["cam30"], served["cam15"]) >= 0.4 * total, served
@@ -0,0 +1,167 @@
+import time
+
+OUTPUT_MODES = ("full", "decimated", "headless")
+
+
+class previewOutput:
+    """
+    videoOutput wrapper that decides per frame whether anything is shown.
+
+    "full" renders every frame; "decimated" renders every `every`th frame,
+    downscaled by `scale`; "headless" never opens or renders an output.
+    Demos call next_frame() before drawing overlays and skip the drawing
+    when it returns False; Render() and SetStatus() are no-ops on frames
+    that are not shown.  The mode can be changed at runtime, and the
+    videoOutput is only created the first time something is rendered.
+    """
+    def __init__(self, opener, mode="full", every=5, scale=0.5):
+        self.opener = opener
+        self.output = None
+        self.resized = None
+        self.frames = 0
+        self.rendered = 0
+        self.drawing = True
+        self.configure(mode, every, scale)
+
+    def configure(self, mode, every=None, scale=None):
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"unknown output mode '{mode}', expected one of {OUTPUT_MODES}")
+        self.mode = mode
+        self.every = max(1, int(every)) if every is not None else getattr(self, "every", 5)
+        self.scale = min(1.0, max(0.05, float(scale))) if scale is not None else getattr(self, "scale", 0.5)
+        print(f"[OUTPUT] Mode {self.mode}" + (f" (every {self.every} frames at {self.scale:.0%})"
+                                              if self.mode == "decimated" else ""))
+
+    def next_frame(self):
+        """
+        Start a new frame and return True if it will be rendered (draw overlays).
+        """
+        self.frames += 1
+        if self.mode == "headless":
+            self.drawing = False
+        elif self.mode == "decimated":
+            self.drawing = (self.frames - 1) % self.every == 0
+        else:
+            self.drawing = True
+        return self.drawing
+
+    def Render(self, img):
+        if not self.drawing:
+            return
+        if self.output is None:
+            self.output = self.opener()
+        if self.mode == "decimated" and self.scale < 1.0:
+            img = self._downscale(img)
+        self.output.Render(img)
+        self.rendered += 1
+
+    def _downscale(self, img):
+        from jetson_utils import cudaAllocMapped, cudaResize
+        width, height = int(img.width * self.scale), int(img.height * self.scale)
+        if self.resized is None or (self.resized.width, self.resized.height, self.resized.format) != (width, height, img.format):
+            self.resized = cudaAllocMapped(width=width, height=height, format=img.format)
+        cudaResize(img, self.resized)
+        return self.resized
+
+    def SetStatus(self, status):
+        if self.drawing and self.output is not None:
+            self.output.SetStatus(status)
+
+    def IsStreaming(self):
+        # A closed preview window ends the demo; headless never does
+        return self.output is None or self.output.IsStreaming()
+
+    def stats(self):
+        return {"output_mode": self.mode}
+
+
+def add_output_args(parser):
+    parser.add_argument("--output-mode", type=str, default="full", choices=OUTPUT_MODES,
+                        help="full: render every frame, decimated: render every Nth frame downscaled, "
+                             "headless: no overlays or rendering")
+    parser.add_argument("--preview-every", type=int, default=5,
+                        help="in decimated mode, render one frame out of this many")
+    parser.add_argument("--preview-scale", type=float, default=0.5,
+                        help="in decimated mode, scale rendered frames by this factor")
+
+
+def create_output(args, uri, argv=None):
+    """
+    Open a previewOutput for `uri` configured from the command-line arguments.
+    """
+    def opener():
+        from jetson_utils import videoOutput
+        return videoOutput(uri, argv=argv)
+    return previewOutput(opener, args.output_mode, args.preview_every, args.preview_scale)
+
+
+def handle_output_command(outputs, cmd, args):
+    """
+    set_output_mode full|decimated|headless [every] [scale].  `outputs` is
+    one previewOutput or a list of them.  Returns True if handled.
+    """
+    if cmd != "set_output_mode" or not args:
+        return False
+    for output in (outputs if isinstance(outputs, (list, tuple)) else [outputs]):
+        output.configure(args[0], args[1] if len(args) > 1 else None, args[2] if len(args) > 2 else None)
+    return True
+
+
+class stubOutput:
+    """
+    Stand-in for videoOutput whose Render() costs `render_ms` per megapixel.
+    """
+    def __init__(self, render_ms):
+        self.render_ms = render_ms
+
+    def Render(self, img):
+        time.sleep(self.render_ms / 1000.0 * img.width * img.height / 1e6)
+
+    def SetStatus(self, status):
+        pass
+
+    def IsStreaming(self):
+        return True
+
+
+if __name__ == "__main__":
+    # Stub network (10 ms), overlay drawing (3 ms) and display (12 ms per megapixel at 1080p)
+    class stubImage:
+        def __init__(self, width, height):
+            self.width, self.height = width, height
+
+    frame = stubImage(1920, 1080)
+    fps = {}
+    for mode, every, scale in (("full", 1, 1.0), ("decimated", 5, 0.5), ("decimated", 15, 0.25), ("headless", 1, 1.0)):
+        output = previewOutput(lambda: stubOutput(render_ms=12), mode, every, scale)
+        output._downscale = lambda img: stubImage(int(img.width * output.scale), int(img.height * output.scale))
+        sizes = set()
+        start = time.perf_counter()
+        frames = 0
+        while time.perf_counter() - start < 2.0:
+            draw = output.next_frame()
+            time.sleep(0.010)  # inference
+            if draw:
+                time.sleep(0.003)  # overlays
+            output.Render(frame)
+            if draw:
+                sizes.add((output._downscale(frame) if mode == "decimated" else frame).width)
+            frames += 1
+        elapsed = time.perf_counter() - start
+        fps[mode, every] = frames / elapsed
+        print(f"{mode:9s} every={every:<2d} scale={scale:.2f}: {frames / elapsed:5.1f} FPS, {output.rendered} frames rendered")
+
+        # Rendered frames per mode: all, the first of every `every` (downscaled), or none
+        if mode == "headless":
+            assert output.rendered == 0 and output.output is None
+        else:
+            assert output.rendered == -(-frames // every), (mode, every, frames, output.rendered)
+            assert sizes == {int(1920 * scale)}, sizes
+    assert fps["full", 1] < fps["decimated", 5] < fps["headless", 1], fps
+
+    # Switching modes at runtime
+    output = previewOutput(lambda: stubOutput(render_ms=0), "headless")
+    drawn = [output.next_frame() for _ in range(3)]
+    handle_output_command([output], "set_output_mode", ["decimated", "2"])
+    drawn += [output.next_frame() for _ in range(3)]
+    assert drawn == [False, False, False, False, True, False] and output.scale == 0.5, drawn
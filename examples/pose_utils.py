@@ -0,0 +1,421 @@
+import time
+import numpy as np
+
+# Keypoint order of the resnet18-body / densenet121-body models
+KEYPOINT_NAMES = [
+    "nose", "left_eye", "right_eye", "left_ear", "right_ear",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_hip", "right_hip",
+    "left_knee", "right_knee", "left_ankle", "right_ankle", "neck"
+]
+KEYPOINT_INDEX = {name: i for i, name in enumerate(KEYPOINT_NAMES)}
+
+# Keypoints the dashboard shows (template "keypoints" object)
+DEFAULT_KEYPOINTS = ["nose", "left_eye", "right_eye"]
+
+POSTURES = ("unknown", "standing", "sitting", "raised_hand")
+
+
+def pose_array(poses, out=None):
+    """
+    Pack a list of {keypoint_name: [x, y]} poses into a (P, K, 2) float32
+    array in KEYPOINT_NAMES order, NaN where a keypoint was not detected.
+    Unknown keypoint names are ignored.
+    """
+    if out is None or out.shape[0] != len(poses):
+        out = np.empty((len(poses), len(KEYPOINT_NAMES), 2), dtype=np.float32)
+    out.fill(np.nan)
+    for i, pose in enumerate(poses):
+        for name, xy in pose.items():
+            k = KEYPOINT_INDEX.get(name)
+            if k is not None:
+                out[i, k] = xy
+    return out
+
+
+def _mean2(a, b):
+    # Mean of two keypoint coordinates, or whichever one was detected
+    return np.where(np.isnan(a), b, np.where(np.isnan(b), a, (a + b) * 0.5))
+
+
+def pose_boxes(kp):
+    """
+    (P, 4) boxes (x, y, w, h) around the detected keypoints of each pose.
+    """
+    lo = np.fmin.reduce(kp, axis=1)
+    hi = np.fmax.reduce(kp, axis=1)
+    return np.concatenate([lo, hi - lo], axis=1)
+
+
+def classify_postures(kp, raise_margin=0.1, sit_ratio=0.5):
+    """
+    Posture code per pose (index into POSTURES) from keypoint geometry,
+    image y pointing down:
+      raised_hand  a wrist above the shoulders by `raise_margin` torso lengths
+      standing     thighs mostly vertical (knee drop > sit_ratio * torso)
+      sitting      thighs closer to horizontal
+      unknown      shoulders, hips or knees missing
+    """
+    y = kp[:, :, 1]
+    shoulder = _mean2(y[:, KEYPOINT_INDEX["left_shoulder"]], y[:, KEYPOINT_INDEX["right_shoulder"]])
+    hip = _mean2(y[:, KEYPOINT_INDEX["left_hip"]], y[:, KEYPOINT_INDEX["right_hip"]])
+    knee = _mean2(y[:, KEYPOINT_INDEX["left_knee"]], y[:, KEYPOINT_INDEX["right_knee"]])
+    wrist = np.fmin(y[:, KEYPOINT_INDEX["left_wrist"]], y[:, KEYPOINT_INDEX["right_wrist"]])
+    torso = hip - shoulder
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        thigh = (knee - hip) / torso
+        margin = np.where(np.isnan(torso), 0.0, raise_margin * torso)
+        postures = np.zeros(len(kp), dtype=np.int8)
+        postures[thigh > sit_ratio] = 1
+        postures[thigh <= sit_ratio] = 2
+        postures[wrist < shoulder - margin] = 3
+    return postures
+
+
+class poseTracker:
+    """
+    Gives poses stable IDs across frames.
+
+    Each track keeps its last keypoints and a center velocity.  Every
+    frame, the tracks are moved forward by their velocity and compared
+    with all new poses at once as a (poses, tracks, keypoints) array: the
+    cost of a pair is the mean distance between the keypoints both have,
+    in body heights.  Pairs are assigned greedily, cheapest first, up to
+    `max_cost`.  Unmatched poses start new tracks, which are confirmed
+    after `min_hits` matches; tracks unmatched for `max_missed` frames are
+    dropped, so short occlusions keep their ID.
+    """
+    def __init__(self, max_cost=0.5, min_hits=3, max_missed=15):
+        self.max_cost = max_cost
+        self.min_hits = min_hits
+        self.max_missed = max_missed
+        self.next_id = 1
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.kp = np.zeros((0, len(KEYPOINT_NAMES), 2), dtype=np.float32)
+        self.centers = np.zeros((0, 2), dtype=np.float32)
+        self.velocity = np.zeros((0, 2), dtype=np.float32)
+        self.heights = np.zeros(0, dtype=np.float32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.missed = np.zeros(0, dtype=np.int32)
+        self.first_seen = np.zeros(0, dtype=np.float64)
+        self.last_seen = np.zeros(0, dtype=np.float64)
+        self.confirmed_total = 0
+        self.finished = []
+
+    def update(self, kp, boxes, timestamp):
+        """
+        Match one frame's (P, K, 2) keypoints and (P, 4) boxes to the tracks.
+        Returns (ids, speeds): the track ID of each pose, -1 until the track
+        is confirmed, and its speed in pixels per second (NaN for new tracks).
+        """
+        centers = boxes[:, :2] + boxes[:, 2:] * 0.5
+        heights = np.maximum(boxes[:, 3], 1.0)
+
+        # Cost of every (pose, track) pair against the predicted track positions
+        dt = timestamp - self.last_seen
+        shift = (self.velocity * dt[:, None])[:, None, :]
+        diff = kp[:, None] - (self.kp + shift)[None]
+        dist = np.sqrt((diff ** 2).sum(axis=3))
+        both = ~np.isnan(dist)
+        shared = both.sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cost = np.where(both, dist, 0).sum(axis=2) / shared
+            scale = np.maximum(heights[:, None], self.heights[None, :])
+            cost = np.where(shared > 0, cost, np.linalg.norm(centers[:, None] - (self.centers + shift[:, 0])[None], axis=2)) / scale
+
+        rows, cols = self._assign(cost)
+        track_of = np.full(len(kp), -1, dtype=np.int64)
+        track_of[rows] = cols
+        speeds = np.full(len(kp), np.nan, dtype=np.float32)
+
+        # Matched tracks take the new keypoints, keeping old ones the new pose is missing
+        if len(rows):
+            moved = dt[cols] > 0
+            rows_m, cols_m = rows[moved], cols[moved]
+            velocity = (centers[rows_m] - self.centers[cols_m]) / dt[cols_m, None]
+            self.velocity[cols_m] = np.where(self.hits[cols_m, None] > 1,
+                                             0.5 * self.velocity[cols_m] + 0.5 * velocity, velocity)
+            speeds[rows_m] = np.linalg.norm(velocity, axis=1)
+            self.kp[cols] = np.where(np.isnan(kp[rows]), self.kp[cols] + shift[cols], kp[rows])
+            self.centers[cols] = centers[rows]
+            self.heights[cols] = heights[rows]
+            self.hits[cols] += 1
+            self.missed[cols] = 0
+            self.last_seen[cols] = timestamp
+            self.confirmed_total += int((self.hits[cols] == self.min_hits).sum())
+        unmatched = np.ones(len(self.ids), dtype=bool)
+        unmatched[cols] = False
+        self.missed[unmatched] += 1
+
+        # Drop stale tracks, then start tracks for unmatched poses
+        stale = self.missed > self.max_missed
+        if stale.any():
+            done = stale & (self.hits >= self.min_hits)
+            self.finished += (self.last_seen[done] - self.first_seen[done]).tolist()
+            track_of = np.where(track_of >= 0, track_of - np.cumsum(stale)[np.maximum(track_of, 0)], -1)
+            self._keep(~stale)
+        new = np.flatnonzero(track_of < 0)
+        if len(new):
+            track_of[new] = len(self.ids) + np.arange(len(new))
+            self._add(kp[new], centers[new], heights[new], timestamp)
+
+        ids = self.ids[track_of]
+        return np.where(self.hits[track_of] >= self.min_hits, ids, -1), speeds
+
+    def _assign(self, cost):
+        # Greedy assignment, cheapest pairs first
+        rows, cols = [], []
+        if cost.size:
+            order = np.argsort(cost, axis=None)
+            used_rows, used_cols = set(), set()
+            for r, c in zip(*np.unravel_index(order, cost.shape)):
+                if not cost[r, c] <= self.max_cost:
+                    break
+                if r in used_rows or c in used_cols:
+                    continue
+                used_rows.add(r)
+                used_cols.add(c)
+                rows.append(r)
+                cols.append(c)
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+    def _keep(self, keep):
+        for name in ("ids", "kp", "centers", "velocity", "heights", "hits", "missed", "first_seen", "last_seen"):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def _add(self, kp, centers, heights, timestamp):
+        n = len(kp)
+        self.ids = np.concatenate([self.ids, self.next_id + np.arange(n)])
+        self.next_id += n
+        self.kp = np.concatenate([self.kp, kp])
+        self.centers = np.concatenate([self.centers, centers])
+        self.velocity = np.concatenate([self.velocity, np.zeros((n, 2), dtype=np.float32)])
+        self.heights = np.concatenate([self.heights, heights])
+        self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int32)])
+        self.missed = np.concatenate([self.missed, np.zeros(n, dtype=np.int32)])
+        self.first_seen = np.concatenate([self.first_seen, np.full(n, timestamp)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(n, timestamp)])
+
+    def dwell(self):
+        """
+        {track ID: seconds seen} of the confirmed tracks currently alive.
+        """
+        alive = self.hits >= self.min_hits
+        return dict(zip(self.ids[alive].tolist(), (self.last_seen[alive] - self.first_seen[alive]).tolist()))
+
+    def summary(self, reset=True):
+        """
+        Unique people confirmed, and their dwell times, over the interval.
+        """
+        dwell = self.finished + list(self.dwell().values())
+        summary = {
+            "unique_people": self.confirmed_total,
+            "dwell_mean_s": round(float(np.mean(dwell)), 1) if dwell else 0.0,
+            "dwell_max_s": round(float(np.max(dwell)), 1) if dwell else 0.0
+        }
+        if reset:
+            self.confirmed_total = 0
+            self.finished = []
+        return summary
+
+
+class poseAnalytics:
+    """
+    Reduces per-frame poses to a compact summary per telemetry interval.
+
+    Every frame, all poses are packed into one (P, K, 2) array and their
+    boxes and postures are computed with vectorized NumPy; a poseTracker
+    gives them IDs and speeds.  summary() returns the pose count, the
+    largest count and the most poses seen in each posture over the
+    interval, the mean speed, unique people and dwell times, and per-pose
+    IDs, boxes, postures and a configurable keypoint subset for the latest
+    frame.
+    """
+    def __init__(self, keypoints=DEFAULT_KEYPOINTS, max_poses=10, tracker=None):
+        self.keypoints = [name for name in keypoints if name in KEYPOINT_INDEX]
+        self.keypoint_ids = np.array([KEYPOINT_INDEX[name] for name in self.keypoints], dtype=np.int64)
+        self.max_poses = max_poses
+        self.kp = None
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.postures = np.zeros(0, dtype=np.int8)
+        self.speeds = np.zeros(0, dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.tracker = tracker or poseTracker()
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.count_max = 0
+        self.posture_max = np.zeros(len(POSTURES), dtype=np.int32)
+        self.speed_sum = 0.0
+        self.speed_n = 0
+
+    def update(self, poses, timestamp=None):
+        """
+        Add one frame of {keypoint_name: [x, y]} poses.  Returns the posture code per pose.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        self.kp = kp = pose_array(poses, self.kp)
+        self.boxes = pose_boxes(kp)
+        self.postures = classify_postures(kp)
+        self.ids, self.speeds = self.tracker.update(kp, self.boxes, timestamp)
+        moving = ~np.isnan(self.speeds)
+        self.speed_sum += float(self.speeds[moving].sum())
+        self.speed_n += int(moving.sum())
+
+        self.frames += 1
+        self.count_max = max(self.count_max, len(kp))
+        np.maximum(self.posture_max, np.bincount(self.postures, minlength=len(POSTURES)), out=self.posture_max)
+        return self.postures
+
+    def summary(self, reset=True):
+        """
+        Telemetry fields for the interval, with pose details for the latest frame.
+        """
+        summary = {
+            "pose_count": len(self.postures),
+            "pose_count_max": self.count_max,
+            **{name: int(self.posture_max[i]) for i, name in enumerate(POSTURES) if name != "unknown"},
+            "movement_px_s": round(self.speed_sum / self.speed_n, 1) if self.speed_n else 0.0,
+            **self.tracker.summary(reset),
+            "poses": self.pose_details()
+        }
+        if self.keypoints and len(self.postures):
+            # The dashboard's keypoints object shows the largest (closest) pose
+            largest = int(np.argmax(self.boxes[:, 2] * self.boxes[:, 3]))
+            summary["keypoints"] = self._keypoints(largest)
+        if reset:
+            self.reset()
+        return summary
+
+    def pose_details(self):
+        """
+        ID, box, posture, speed and keypoint subset of each pose in the latest frame, largest first.
+        """
+        order = np.argsort(-(self.boxes[:, 2] * self.boxes[:, 3]))[:self.max_poses]
+        boxes = np.round(self.boxes.astype(np.float64), 1).tolist()
+        details = []
+        for i in order.tolist():
+            detail = {"id": int(self.ids[i]), "bbox": boxes[i], "posture": POSTURES[self.postures[i]]}
+            if not np.isnan(self.speeds[i]):
+                detail["speed"] = round(float(self.speeds[i]), 1)
+            if self.keypoints:
+                detail["keypoints"] = self._keypoints(i)
+            details.append(detail)
+        return details
+
+    def _keypoints(self, i):
+        points = np.round(self.kp[i, self.keypoint_ids].astype(np.float64), 1).tolist()
+        return {name: xy for name, xy in zip(self.keypoints, points) if xy[0] == xy[0]}
+
+
+def add_pose_args(parser):
+    parser.add_argument("--pose-keypoints", type=str, default=",".join(DEFAULT_KEYPOINTS),
+                        help="keypoints sent per pose, comma-separated (empty for none)")
+    parser.add_argument("--pose-max-poses", type=int, default=10,
+                        help="most poses detailed per telemetry message")
+
+
+def create_pose_analytics(args):
+    return poseAnalytics([name for name in args.pose_keypoints.split(",") if name], args.pose_max_poses)
+
+
+# Synthetic skeletons: (x, y) offsets from the hip center in body heights
+_STANDING = np.array([[0, -.45], [-.02, -.47], [.02, -.47], [-.04, -.46], [.04, -.46], [-.1, -.35], [.1, -.35],
+                      [-.13, -.2], [.13, -.2], [-.14, -.05], [.14, -.05], [-.06, 0], [.06, 0],
+                      [-.06, .25], [.06, .25], [-.06, .5], [.06, .5], [0, -.36]], dtype=np.float32)
+_SITTING = _STANDING.copy()
+_SITTING[13:17] = [[-.1, .05], [.1, .05], [-.1, .3], [.1, .3]]
+_RAISED = _STANDING.copy()
+_RAISED[9] = [-.14, -.6]
+
+
+def _skeleton(rng, shape, scale, center, dropout=0.15):
+    points = shape * scale + center + rng.normal(0, 2, shape.shape)
+    keep = rng.random(len(points)) > dropout
+    return {KEYPOINT_NAMES[k]: [float(x), float(y)] for k, (x, y) in enumerate(points) if keep[k]}
+
+
+def synthetic_poses(rng, count, width=1280, height=720):
+    """
+    Standing, sitting and hand-raising skeletons at random places, some keypoints dropped.
+    """
+    return [_skeleton(rng, (_STANDING, _SITTING, _RAISED)[rng.integers(0, 3)], rng.uniform(150, 500),
+                      rng.uniform([100, 100], [width - 100, height - 100])) for _ in range(count)]
+
+
+def synthetic_walkers(rng, count, frames, width=1280, height=720, occlusion=(5, 12)):
+    """
+    `count` people walking straight across the frame in both directions,
+    so their paths cross, each hidden once for a random number of frames
+    in the `occlusion` range.  Returns one [(person, pose), ...] list per frame.
+    """
+    starts = np.stack([rng.choice([0.0, width], count), rng.uniform(0.35, 0.65, count) * height], axis=1)
+    ends = np.stack([width - starts[:, 0], rng.uniform(0.35, 0.65, count) * height], axis=1)
+    scales = rng.uniform(250, 400, count)
+    hidden_at = rng.integers(frames // 4, 3 * frames // 4, count)
+    hidden_for = rng.integers(occlusion[0], occlusion[1] + 1, count)
+    result = []
+    for f in range(frames):
+        t = f / (frames - 1)
+        result.append([(p, _skeleton(rng, _STANDING, scales[p], starts[p] + (ends[p] - starts[p]) * t))
+                       for p in range(count) if not hidden_at[p] <= f < hidden_at[p] + hidden_for[p]])
+    return result
+
+
+if __name__ == "__main__":
+    import json
+
+    rng = np.random.default_rng(0)
+    analytics = poseAnalytics()
+    for count in (1, 4, 10):
+        frames = [synthetic_poses(rng, count) for _ in range(200)]
+
+        # Before: one message per pose with every keypoint, rounded to 0.1 px
+        before = sum(len(json.dumps({"demo_name": "posenet", "timestamp": 0, "keypoints":
+                                     {n: [round(x, 1), round(y, 1)] for n, (x, y) in pose.items()}}))
+                     for pose in frames[-1])
+
+        start = time.perf_counter()
+        for i, poses in enumerate(frames):
+            analytics.update(poses, timestamp=i / 30.0)
+        elapsed = time.perf_counter() - start
+        after = len(json.dumps({"demo_name": "posenet", "timestamp": 0, **analytics.summary()}))
+        print(f"{count:2d} poses: {elapsed / len(frames) * 1e6:6.1f} us/frame, payload {before:5d} B "
+              f"in {count} message(s) -> {after:5d} B in 1")
+
+    # Tracking: people crossing paths and briefly hidden
+    print("tracking:")
+    for count in (2, 5, 10):
+        analytics = poseAnalytics()
+        switches = tracked = 0
+        assigned = {}
+        elapsed = 0.0
+        for f, walkers in enumerate(synthetic_walkers(rng, count, frames=300)):
+            start = time.perf_counter()
+            analytics.update([pose for _, pose in walkers], timestamp=f / 30.0)
+            elapsed += time.perf_counter() - start
+            for (person, _), track_id in zip(walkers, analytics.ids.tolist()):
+                if track_id < 0:
+                    continue
+                tracked += 1
+                if assigned.get(person, track_id) != track_id:
+                    switches += 1
+                assigned[person] = track_id
+        summary = analytics.summary()
+        print(f"  {count:2d} people: {elapsed / 300 * 1e6:6.1f} us/frame, {summary['unique_people']} unique IDs, "
+              f"{switches} ID switches in {tracked} tracked poses, dwell max {summary['dwell_max_s']}s")
+        if count <= 5:
+            assert switches == 0 and summary["unique_people"] == count, (switches, summary["unique_people"])
+        else:
+            assert switches <= 2 * count and summary["unique_people"] <= 2 * count, (switches, summary["unique_people"])
+
+    # Posture accuracy per class on labeled synthetic skeletons
+    print("postures:")
+    for code, shape in ((1, _STANDING), (2, _SITTING), (3, _RAISED)):
+        poses = [_skeleton(rng, shape, rng.uniform(150, 500), rng.uniform([100, 100], [1180, 620]))
+                 for _ in range(1000)]
+        accuracy = float(np.mean(classify_postures(pose_array(poses)) == code))
+        print(f"  {POSTURES[code]:>11s}: {accuracy:.1%}")
+        assert accuracy >= {1: 0.85, 2: 0.8, 3: 0.75}[code], (POSTURES[code], accuracy)
@@ -4,17 +4,27 @@ import sys
 import argparse
 import os
 import time
-import json
 import socket
 from jetson_inference import poseNet
-from jetson_utils import videoSource, videoOutput, cudaFont, Log
+from jetson_utils import videoSource, videoOutput, cudaFont, cudaDrawRect, cudaToNumpy, Log
+
+from model_utils import load_model_argv
+from roi_utils import add_roi_args, create_cropper, handle_roi_command, map_points
+from motion_utils import add_motion_args, create_motion_gate, handle_motion_command
+from throttle_utils import frameThrottle, handle_throttle_command
+from iotc_utils import start_command_listener, telemetry_socket_path, heartbeatWriter
+from record_utils import add_record_args, create_recorder, stageTimer
+from capture_utils import open_capture, status_reporter
+from output_utils import add_output_args, create_output, handle_output_command
+from pose_utils import add_pose_args, create_pose_analytics
+from schema_utils import payload_builder
 
 # Demo metadata
 DEMO_NAME = "posenet"
 DEMO_VERSION = "1.0"
 
 # Path to the IoTConnect Unix socket
-SOCKET_PATH = (
+SOCKET_PATH = telemetry_socket_path(
     "/var/snap/iotconnect/common/iotc.sock"
     if os.path.exists("/var/snap/iotconnect/common/iotc.sock")
     else os.path.expanduser("~/snap/iotconnect/common/iotc.sock")
@@ -24,51 +34,71 @@ TELEMETRY_INTERVAL = 7.0
 
 # Name of the model being used
 MODEL_NAME = None
+# Payload builder for the telemetry messages, compiled once the model is known
+TELEMETRY = None
 # Last time telemetry was sent
 last_send_time = 0
 
 
 def send_telemetry(payload):
     """
-    Send a JSON payload over the IoTConnect Unix socket.
+    Send a message over the IoTConnect Unix socket: a line from the
+    payload builder, or a dict (events) encoded by it.
     """
     try:
+        line = payload if isinstance(payload, str) else TELEMETRY.encode(payload)
         s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         s.settimeout(1.0)
         s.connect(SOCKET_PATH)
-        s.send((json.dumps(payload) + "\n").encode("utf-8"))
+        s.send(line.encode("utf-8"))
         s.close()
-        print(f"[TELEMETRY] Sent: {payload}")
+        print(f"[TELEMETRY] Sent: {line.rstrip()}")
     except Exception as e:
         print(f"[SOCKET] Send failed: {e}")
 
 
 def load_model_from_config(argv):
     """
-    Read current-model.txt to determine which ONNX model to load,
+    Resolve the current ONNX model from the posenet model catalog,
     set MODEL_NAME, and append necessary flags to argv.
     """
     global MODEL_NAME
-    base = "/var/snap/iotconnect/common/models/posenet"
-    model_name = "posenet.onnx"
-    try:
-        with open(os.path.join(base, "current-model.txt"), 'r') as f:
-            model_name = f.read().strip()
-    except Exception as e:
-        print(f"[MODEL] Error reading {base}/current-model.txt: {e}")
+    MODEL_NAME, flags = load_model_argv("posenet")
+    argv += flags
+
+
+def estimate_poses(net, img, cropper, draw=True):
+    """
+    Run pose estimation on the full frame, or on each configured ROI with
+    the keypoints mapped back into full-frame coordinates.  Returns a list
+    of {keypoint_name: [x, y]} dicts, one per pose.  With draw=False the
+    skeletons and ROI boxes are not drawn.
+    """
+    overlay = "links,keypoints" if draw else "none"
+    crops = cropper.Crop(img)
+    if not crops:
+        return [{net.GetKeypointName(p.ID): [p.x, p.y] for p in pose.Keypoints}
+                for pose in net.Process(img, overlay=overlay)]
+
+    results = []
+    for region, crop in crops:
+        for pose in net.Process(crop, overlay=overlay):
+            points = map_points([(p.x, p.y) for p in pose.Keypoints], region).tolist()
+            results.append({net.GetKeypointName(p.ID): xy for p, xy in zip(pose.Keypoints, points)})
+        if not draw:
+            continue
+        cropper.Paste(img, region, crop)
+        x, y, w, h = region
+        cudaDrawRect(img, (x, y, x + w, y + h), (0, 255, 0, 40))
+    return results
 
-    MODEL_NAME = model_name
-    model_path = os.path.join(base, MODEL_NAME)
-    labels_path = os.path.join(base, "labels.txt")
-    topo_path = os.path.join(base, "human_pose.json")
-    colors_path = os.path.join(base, "colors.txt")
 
-    argv += [
-        f"--model={model_path}",
-        f"--labels={labels_path}",
-        f"--topology={topo_path}",
-        f"--colormap={colors_path}"
-    ]
+def handle_command(cmd, args):
+    """
+    Dispatch runtime commands to the ROI cropper, motion gate, throttle and output.
+    """
+    (handle_roi_command(cropper, cmd, args) or handle_motion_command(gate, cmd, args)
+        or handle_throttle_command(throttle, cmd, args) or handle_output_command(output, cmd, args))
 
 
 if __name__ == '__main__':
@@ -84,13 +114,13 @@ if __name__ == '__main__':
                         help="URI of the output stream (e.g., display://)")
     parser.add_argument("--network", type=str, default=None,
                         help="Override OTA: name of built-in network to use")
+    add_roi_args(parser)
+    add_motion_args(parser)
+    add_record_args(parser)
+    add_output_args(parser)
+    add_pose_args(parser)
     args = parser.parse_known_args()[0]
 
-    # Open I/O streams
-    input = videoSource(args.input, argv=sys.argv)
-    output = videoOutput(args.output, argv=sys.argv)
-    font = cudaFont()
-
     # Load model
     if args.network:
         MODEL_NAME = args.network
@@ -98,33 +128,60 @@ if __name__ == '__main__':
     else:
         load_model_from_config(sys.argv)
         net = poseNet("custom", sys.argv)
+    TELEMETRY = payload_builder("posenet", demo_name=DEMO_NAME, demo_version=DEMO_VERSION, model_name=MODEL_NAME)
+
+    # Open I/O streams, once the payload builder exists since camera events are sent through it
+    input = open_capture(args.input, sys.argv, status_reporter(send_telemetry, DEMO_NAME))
+    output = create_output(args, args.output, sys.argv)
+    font = cudaFont()
 
+    # Regions of interest (set_roi / set_roi_tiles / clear_roi) and motion gate (set_motion_gate)
+    cropper = create_cropper(args)
+    gate = create_motion_gate(args)
+    throttle = frameThrottle()
+    poses = []
+    analytics = create_pose_analytics(args)
+    recorder = create_recorder(args, DEMO_NAME, {"model_name": MODEL_NAME, "sources": [args.input]})
+    timer = stageTimer()
+    start_command_listener(handle_command)
+
+    heartbeat = heartbeatWriter()
     # Main loop
     while True:
+        timer.start()
         img = input.Capture()
         if img is None:
+            if input.alive():
+                heartbeat.beat(0)  # camera down or reopening, not hung
             continue
-
-        poses = net.Process(img)
+        heartbeat.beat()
+        timer.mark("capture")
+        if recorder and recorder.thumb_width:
+            recorder.snapshot(cudaToNumpy(img))  # before overlays are drawn on it
+        draw = output.next_frame()
+
+        # Only run the network on stride frames where the scene changed, otherwise reuse the last poses
+        inferred = throttle.should_infer() and gate.check(cudaToNumpy(img))
+        if inferred:
+            poses = estimate_poses(net, img, cropper, draw)
+            analytics.update(poses)
+        timer.mark("inference")
         output.Render(img)
         output.SetStatus(f"poseNet | Network {net.GetNetworkFPS():.0f} FPS")
         net.PrintProfilerTimes()
 
-        # Telemetry
+        # Telemetry: one compact summary of all poses per interval
         current_time = time.time()
         if (current_time - last_send_time) >= TELEMETRY_INTERVAL:
-            for pose in poses:
-                keypoints = {net.GetKeypointName(p.ID): [round(p.x, 1), round(p.y, 1)]
-                             for p in pose.Keypoints}
-                telemetry = {
-                    "demo_name": DEMO_NAME,
-                    "demo_version": DEMO_VERSION,
-                    "model_name": MODEL_NAME,
-                    "timestamp": int(current_time),
-                    "keypoints": keypoints
-                }
-                send_telemetry(telemetry)
+            send_telemetry(TELEMETRY.build(int(current_time),
+                                           **analytics.summary(), **gate.stats(), **input.stats()))
             last_send_time = current_time
+        timer.mark("telemetry")
+
+        if recorder:
+            recorder.record(results=poses, timings=timer.timings, source=args.input, inferred=inferred)
+
+        throttle.wait()
 
         if not input.IsStreaming() or not output.IsStreaming():
             break
@@ -0,0 +1,205 @@
+import os
+import time
+import threading
+import psutil
+
+
+class processAccounting:
+    """
+    Resource use of the running demo's process tree, next to per-core CPU
+    and load average, aggregated over each telemetry interval.
+
+    sample(pid) is called from the launcher's stats sampler.  The demo's
+    psutil.Process handle (and one per child) is kept between samples, so
+    cpu_percent() measures since the previous sample, and each process is
+    read inside oneshot() so psutil fetches /proc once per process.
+    Handles are dropped when the demo's PID changes or a child exits.  A
+    process contributes 0% CPU on its first sample, and its context
+    switches and IO count from that sample on.
+
+    sample() and summary() may be called from different threads.
+    summary() returns, for the interval since the last call:
+      demo_cpu / demo_cpu_max       mean / peak CPU of the tree (100 = one core)
+      demo_cpu_share                the demo's part of all CPU in use (0-1)
+      demo_rss_mb / demo_rss_mb_max latest / peak resident memory of the tree
+      demo_threads, demo_processes  latest thread and process counts
+      demo_ctx_voluntary, demo_ctx_involuntary, demo_io_read_kb, demo_io_write_kb
+                                    context switches and disk IO during the interval
+      cpu_cores                     mean CPU per core
+      load_avg                      1, 5 and 15 minute load average
+    """
+    def __init__(self):
+        self.root_pid = None
+        self.handles = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.reset()
+        # The first per-core reading only sets psutil's baseline
+        psutil.cpu_percent(percpu=True)
+
+    def reset(self):
+        self.samples = 0
+        self.demo_samples = 0
+        self.cpu_sum = 0.0
+        self.cpu_max = 0.0
+        self.busy_sum = 0.0
+        self.rss = 0
+        self.rss_max = 0
+        self.threads = 0
+        self.processes = 0
+        self.deltas = [0, 0, 0, 0]
+        self.core_sums = None
+
+    def sample(self, pid=None):
+        with self.lock:
+            self._sample(pid)
+
+    def _sample(self, pid):
+        cores = psutil.cpu_percent(percpu=True)
+        if self.core_sums is None:
+            self.core_sums = [0.0] * len(cores)
+        self.core_sums = [total + c for total, c in zip(self.core_sums, cores)]
+        self.samples += 1
+        if pid is None:
+            self._forget()
+            return
+        if pid != self.root_pid:
+            self._forget()
+            self.root_pid = pid
+
+        try:
+            root = self._handle(pid)
+            tree = [root] + [self._handle(child.pid, child) for child in root.children(recursive=True)]
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            self._forget()
+            return
+
+        cpu = rss = threads = 0
+        alive = set()
+        for proc in tree:
+            try:
+                with proc.oneshot():
+                    cpu += proc.cpu_percent()
+                    rss += proc.memory_info().rss
+                    threads += proc.num_threads()
+                    ctx = proc.num_ctx_switches()
+                    try:
+                        io = proc.io_counters()
+                        read_bytes, write_bytes = io.read_bytes, io.write_bytes
+                    except (psutil.AccessDenied, AttributeError):
+                        read_bytes = write_bytes = 0
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            alive.add(proc.pid)
+            current = (ctx.voluntary, ctx.involuntary, read_bytes, write_bytes)
+            last = self.counters.get(proc.pid, current)
+            self.deltas = [d + max(0, c - l) for d, c, l in zip(self.deltas, current, last)]
+            self.counters[proc.pid] = current
+
+        for gone in set(self.handles) - alive:
+            self.handles.pop(gone, None)
+            self.counters.pop(gone, None)
+
+        self.demo_samples += 1
+        self.cpu_sum += cpu
+        self.cpu_max = max(self.cpu_max, cpu)
+        self.busy_sum += sum(cores)
+        self.rss, self.threads, self.processes = rss, threads, len(alive)
+        self.rss_max = max(self.rss_max, rss)
+
+    def _handle(self, pid, proc=None):
+        handle = self.handles.get(pid)
+        if handle is None:
+            handle = self.handles[pid] = proc or psutil.Process(pid)
+        return handle
+
+    def _forget(self):
+        self.root_pid = None
+        self.handles = {}
+        self.counters = {}
+
+    def summary(self, reset=True):
+        with self.lock:
+            return self._summary(reset)
+
+    def _summary(self, reset):
+        samples = max(self.samples, 1)
+        summary = {
+            "cpu_cores": [round(total / samples, 1) for total in self.core_sums or []],
+            "load_avg": [round(load, 2) for load in os.getloadavg()]
+        }
+        if self.demo_samples:
+            demo_samples = self.demo_samples
+            summary.update({
+                "demo_cpu": round(self.cpu_sum / demo_samples, 1),
+                "demo_cpu_max": round(self.cpu_max, 1),
+                "demo_cpu_share": round(min(1.0, self.cpu_sum / max(self.busy_sum, 1e-6)), 2),
+                "demo_rss_mb": round(self.rss / 1e6, 1),
+                "demo_rss_mb_max": round(self.rss_max / 1e6, 1),
+                "demo_threads": self.threads,
+                "demo_processes": self.processes,
+                "demo_ctx_voluntary": self.deltas[0],
+                "demo_ctx_involuntary": self.deltas[1],
+                "demo_io_read_kb": round(self.deltas[2] / 1024),
+                "demo_io_write_kb": round(self.deltas[3] / 1024)
+            })
+        if reset:
+            self.reset()
+        return summary
+
+
+if __name__ == "__main__":
+    # Stub demo: 50 MB resident, a busy worker thread, a busy child process and periodic file writes
+    import sys
+    import tempfile
+    import subprocess
+
+    stub = f"""
+import os, subprocess, sys, threading, time
+memory = bytearray(50 * 1000 * 1000)
+for i in range(0, len(memory), 4096):
+    memory[i] = 1
+spin = "import time\\nend = time.time() + 10\\nwhile time.time() < end: pass"
+child = subprocess.Popen([sys.executable, "-c", spin])
+threading.Thread(target=lambda: exec(spin), daemon=True).start()
+with open({os.path.join(tempfile.mkdtemp(), "stub.out")!r}, "wb") as f:
+    end = time.time() + 10
+    while time.time() < end:
+        f.write(os.urandom(256 * 1024))
+        f.flush()
+        os.fsync(f.fileno())
+        time.sleep(0.05)
+child.kill()
+"""
+    demo = subprocess.Popen([sys.executable, "-c", stub])
+    accounting = processAccounting()
+    try:
+        time.sleep(1.0)
+        cost = []
+        for interval in range(2):
+            for _ in range(8):
+                start = time.perf_counter()
+                accounting.sample(demo.pid)
+                cost.append(time.perf_counter() - start)
+                time.sleep(0.25)
+            summary = accounting.summary()
+            print(f"interval {interval + 1}: {summary}")
+    finally:
+        for child in psutil.Process(demo.pid).children(recursive=True):
+            child.kill()
+        demo.kill()
+        demo.wait()
+
+    assert summary["demo_processes"] == 2, "child process not counted"
+    assert summary["demo_threads"] >= 3
+    assert summary["demo_rss_mb"] >= 50
+    # Two busy loops: at least half of min(2, cores) cores, and most of the CPU in use
+    assert summary["demo_cpu"] >= 50 * min(2, psutil.cpu_count()), "busy loops not accounted"
+    assert summary["demo_cpu_share"] > 0.5
+    assert summary["demo_ctx_voluntary"] + summary["demo_ctx_involuntary"] > 0
+    assert len(summary["cpu_cores"]) == psutil.cpu_count()
+    print(f"sample cost: {sum(cost) / len(cost) * 1000:.2f} ms mean, {max(cost) * 1000:.2f} ms max")
+
+    # Once the demo is gone, only the system fields remain
+    accounting.sample(demo.pid)
+    assert "demo_cpu" not in accounting.summary()
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import atexit
+import mmap
+import signal
+import time
+import zlib
+import struct
+import numpy as np
+
+# Record header: magic, length of the JSON metadata, length of the array blob
+RECORD_MAGIC = b"IRC1"
+RECORD_HEADER = struct.Struct("<4sIQ")
+# Records are buffered and written out in chunks of about this size,
+# or at least this often (seconds)
+CHUNK_BYTES = 4 * 1024 * 1024
+FLUSH_INTERVAL = 1.0
+
+
+class stageTimer:
+    """
+    Per-stage wall-clock timings of one frame, in milliseconds.
+    """
+    def __init__(self):
+        self.start()
+
+    def start(self):
+        self.timings = {}
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self.last) * 1000.0, 3)
+        self.last = now
+
+
+class recorder:
+    """
+    Appends one record per frame to a recording file: JSON metadata
+    (source, timestamp, stage timings, small results such as poses) plus
+    named NumPy arrays (detections, depth grids, masks, thumbnails).
+
+    Large arrays are zlib-compressed; small ones are stored raw so replay
+    can view them straight out of the memory-mapped file.  Records are
+    buffered and written in chunks, at least every `flush_interval`
+    seconds, so a crash loses at most that much; a truncated file stays
+    readable up to its last complete record.
+    """
+    def __init__(self, path, demo, thumb_width=0, every=1, compress_over=4096, info=None,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.thumb_width = thumb_width
+        self.every = max(1, every)
+        self.compress_over = compress_over
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+        self.file = open(path, "wb")
+        self.chunk = []
+        self.chunk_bytes = 0
+        self.frames = 0
+        self.records = 0
+        self.pending_thumbnail = None
+        self.write({"type": "header", "demo": demo, "created": time.time(), **(info or {})})
+
+    def thumbnail(self, frame):
+        """
+        Downsample an HxWxC frame by striding to about thumb_width pixels wide.
+        """
+        step = max(1, frame.shape[1] // self.thumb_width)
+        return frame[::step, ::step].copy()
+
+    def snapshot(self, frame):
+        """
+        Keep a thumbnail of the frame as captured, before the demo draws
+        overlays on it, for the next record() call.  Only frames that will
+        be recorded are downsampled.
+        """
+        if self.thumb_width and self.frames % self.every == 0:
+            self.pending_thumbnail = self.thumbnail(frame)
+
+    def record(self, results=None, arrays=None, timings=None, frame=None, **meta):
+        """
+        Record one frame.  `results` is JSON-serializable, `arrays` maps
+        names to NumPy arrays, `frame` (HxWxC uint8) is kept as a thumbnail
+        when thumbnails are enabled; without it the last snapshot() is used.
+        """
+        self.frames += 1
+        thumbnail, self.pending_thumbnail = self.pending_thumbnail, None
+        if (self.frames - 1) % self.every:
+            return
+        arrays = dict(arrays or {})
+        if frame is not None and self.thumb_width:
+            thumbnail = self.thumbnail(frame)
+        if thumbnail is not None:
+            arrays["thumbnail"] = thumbnail
+        self.write({"type": "frame", "frame": self.frames - 1, "time": time.time(),
+                    "timings": timings or {}, "results": results, **meta}, arrays)
+
+    def write(self, meta, arrays=None):
+        blobs = []
+        offset = 0
+        meta["arrays"] = []
+        for name, array in (arrays or {}).items():
+            array = np.ascontiguousarray(array)
+            data = array.tobytes()
+            compressed = len(data) > self.compress_over
+            if compressed:
+                data = zlib.compress(data, 1)
+            meta["arrays"].append({"name": name, "dtype": array.dtype.str, "shape": array.shape,
+                                   "offset": offset, "length": len(data), "zlib": compressed})
+            blobs.append(data)
+            offset += len(data)
+        meta_bytes = json.dumps(meta).encode("utf-8")
+        self.chunk += [RECORD_HEADER.pack(RECORD_MAGIC, len(meta_bytes), offset), meta_bytes] + blobs
+        self.chunk_bytes += RECORD_HEADER.size + len(meta_bytes) + offset
+        self.records += 1
+        if self.chunk_bytes >= CHUNK_BYTES or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if self.chunk:
+            self.file.write(b"".join(self.chunk))
+            self.file.flush()
+            self.chunk = []
+            self.chunk_bytes = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+        print(f"[RECORD] Wrote {self.records} records to {self.path}")
+
+
+class recording:
+    """
+    Memory-mapped reader for files written by recorder.  Records are
+    indexed once when opened; iterating yields (meta, arrays) in order.
+    """
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = []
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(self.map):
+            magic, meta_len, blob_len = RECORD_HEADER.unpack_from(self.map, offset)
+            end = offset + RECORD_HEADER.size + meta_len + blob_len
+            if magic != RECORD_MAGIC or end > len(self.map):
+                print(f"[RECORD] {path} truncated after {len(self.offsets)} records")
+                break
+            self.offsets.append(offset)
+            offset = end
+        self.header = self.read(0)[0] if self.offsets else {}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def read(self, idx):
+        offset = self.offsets[idx]
+        _, meta_len, _ = RECORD_HEADER.unpack_from(self.map, offset)
+        start = offset + RECORD_HEADER.size
+        meta = json.loads(self.map[start:start + meta_len])
+        blob = start + meta_len
+        arrays = {}
+        for spec in meta.pop("arrays"):
+            begin = blob + spec["offset"]
+            if spec["zlib"]:
+                data = zlib.decompress(self.map[begin:begin + spec["length"]])
+                arrays[spec["name"]] = np.frombuffer(data, dtype=spec["dtype"]).reshape(spec["shape"])
+            else:
+                arrays[spec["name"]] = np.frombuffer(self.map, dtype=spec["dtype"], count=int(np.prod(spec["shape"])),
+                                                     offset=begin).reshape(spec["shape"])
+        return meta, arrays
+
+    def __iter__(self):
+        for idx in range(1, len(self.offsets)):
+            yield self.read(idx)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def add_record_args(parser, replay=False):
+    parser.add_argument("--record", type=str, default=None,
+                        help="record inference results and stage timings to this file")
+    parser.add_argument("--record-thumbnails", type=int, default=0,
+                        help="also record frame thumbnails this many pixels wide (0 = off)")
+    parser.add_argument("--record-every", type=int, default=1,
+                        help="record every Nth frame")
+    if replay:
+        parser.add_argument("--replay", type=str, default=None,
+                            help="replay a recording through post-processing and telemetry (no camera or GPU)")
+
+
+def create_recorder(args, demo, info=None):
+    """
+    Open a recorder from the command-line arguments, or return None when
+    recording is off.  The recording is closed at exit, including when
+    the launcher stops the demo with SIGTERM.  Call from the main thread.
+    """
+    if not args.record:
+        return None
+    print(f"[RECORD] Recording to {args.record}")
+    rec = recorder(args.record, demo, args.record_thumbnails, args.record_every, info=info)
+    atexit.register(rec.close)
+    if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        # Exit through SystemExit so atexit handlers (and the recorder) run
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    return rec
+
+
+if __name__ == "__main__":
+    # Summarize a recording: record count, arrays and mean stage timings
+    rec = recording(sys.argv[1])
+    print(f"{sys.argv[1]}: {rec.header.get('demo')} recording, {len(rec) - 1} frames, "
+          f"{os.path.getsize(sys.argv[1]) / 1e6:.1f} MB")
+    totals, names = {}, set()
+    for meta, arrays in rec:
+        names.update(arrays)
+        for stage, ms in meta["timings"].items():
+            totals.setdefault(stage, []).append(ms)
+    print("arrays:", ", ".join(sorted(names)) or "none")
+    for stage, values in totals.items():
+        print(f"  {stage}: mean {np.mean(values):.2f} ms, p95 {np.percentile(values, 95):.2f} ms")
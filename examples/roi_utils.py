@@ -0,0 +1,191 @@
+import numpy as np
+
+
+def parse_rois(values):
+    """
+    Parse a flat list of numbers (x, y, w, h, x, y, w, h, ...) into ROIs.
+    """
+    values = [int(float(v)) for v in values]
+    if not values or len(values) % 4 != 0:
+        raise ValueError(f"expected groups of x y w h, got {values}")
+    return [tuple(values[i:i + 4]) for i in range(0, len(values), 4)]
+
+
+def clip_roi(roi, width, height):
+    """
+    Clamp an (x, y, w, h) ROI to the frame.  Returns None if nothing is left.
+    """
+    x, y, w, h = roi
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def tile_roi(roi, cols=1, rows=1):
+    """
+    Split an ROI into a cols x rows grid of tiles covering it exactly.
+    """
+    x, y, w, h = roi
+    xs = np.linspace(x, x + w, cols + 1).astype(int)
+    ys = np.linspace(y, y + h, rows + 1).astype(int)
+    return [(int(xs[c]), int(ys[r]), int(xs[c + 1] - xs[c]), int(ys[r + 1] - ys[r]))
+            for r in range(rows) for c in range(cols)]
+
+
+def crop_numpy(frame, roi):
+    """
+    CPU reference crop: a view of an HxW(xC) array, no copy.
+    """
+    x, y, w, h = roi
+    return frame[y:y + h, x:x + w]
+
+
+def map_boxes(boxes, roi):
+    """
+    Map (N, 4) boxes in (left, top, right, bottom) crop coordinates back
+    into full-frame coordinates.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    return boxes + np.array([roi[0], roi[1], roi[0], roi[1]], dtype=np.float32)
+
+
+def map_points(points, roi):
+    """
+    Map (N, 2) points in crop coordinates back into full-frame coordinates.
+    """
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    return points + np.array([roi[0], roi[1]], dtype=np.float32)
+
+
+class roiCropper:
+    """
+    Crops the configured ROIs (optionally tiled) out of each CUDA frame
+    before inference.  Each region gets its own crop buffer, allocated
+    when the layout changes and reused across frames, so all regions can
+    be cropped before any of them is inferred; after inference, Paste() copies the annotated crops back into
+    the full frame so the network's own overlay lands in the right place.
+    """
+    def __init__(self, rois=None, tiles=(1, 1)):
+        self.rois = []
+        self.tiles = tiles
+        self.buffers = {}
+        self.frame_size = None
+        self.regions = []
+        self.set_rois(rois or [], tiles)
+
+    def set_rois(self, rois, tiles=None):
+        if tiles is not None:
+            self.tiles = (max(1, int(tiles[0])), max(1, int(tiles[1])))
+        self.rois = list(rois)
+        self.frame_size = None  # recompute tiles on the next frame
+        print(f"[ROI] Regions: {self.rois or 'full frame'}, tiles: {self.tiles}")
+
+    def _layout(self, width, height):
+        regions = []
+        for roi in self.rois:
+            roi = clip_roi(roi, width, height)
+            if roi is not None:
+                regions += tile_roi(roi, *self.tiles)
+        self.regions = regions
+        self.frame_size = (width, height)
+        self.buffers = {}
+
+    def Crop(self, img):
+        """
+        Return a list of (region, crop) pairs for this frame, or an empty
+        list when no ROI is configured (use the full frame).
+        """
+        if not self.rois:
+            return []
+        from jetson_utils import cudaAllocMapped, cudaCrop
+
+        if self.frame_size != (img.width, img.height):
+            self._layout(img.width, img.height)
+
+        crops = []
+        for region in self.regions:
+            x, y, w, h = region
+            key = (region, img.format)
+            if key not in self.buffers:
+                self.buffers[key] = cudaAllocMapped(width=w, height=h, format=img.format)
+            buffer = self.buffers[key]
+            cudaCrop(img, buffer, (x, y, x + w, y + h))
+            crops.append((region, buffer))
+        return crops
+
+    def Paste(self, img, region, crop):
+        from jetson_utils import cudaOverlay
+        cudaOverlay(crop, img, region[0], region[1])
+
+
+def add_roi_args(parser):
+    """
+    Register the --roi / --roi-tiles command-line options.
+    """
+    parser.add_argument("--roi", type=str, action="append", default=[],
+                        help="region of interest as x,y,w,h in pixels (repeatable)")
+    parser.add_argument("--roi-tiles", type=str, default="1x1",
+                        help="split each ROI into COLSxROWS tiles, e.g. 2x1")
+
+
+def create_cropper(args):
+    """
+    Build an roiCropper from the parsed command-line options.
+    """
+    rois = parse_rois([v for roi in args.roi for v in roi.split(",")]) if args.roi else []
+    return roiCropper(rois, tuple(int(t) for t in args.roi_tiles.lower().split("x")))
+
+
+def handle_roi_command(cropper, cmd, args):
+    """
+    ROI commands shared by the demos:
+      set_roi <x> <y> <w> <h> [<x> <y> <w> <h> ...]
+      set_roi_tiles <cols> <rows>
+      clear_roi
+    Returns True if the command was an ROI command.
+    """
+    if cmd == "set_roi" and args:
+        cropper.set_rois(parse_rois(args))
+    elif cmd == "set_roi_tiles" and len(args) == 2:
+        cropper.set_rois(cropper.rois, (int(args[0]), int(args[1])))
+    elif cmd == "clear_roi":
+        cropper.set_rois([])
+    else:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    # Check crop + map-back against a synthetic frame with a single bright pixel
+    frame = np.zeros((720, 1280), dtype=np.uint8)
+    frame[400, 900] = 255
+    hits = []
+    for region in tile_roi((800, 300, 400, 300), 2, 2):
+        crop = crop_numpy(frame, region)
+        if crop.any():
+            y, x = np.argwhere(crop)[0]
+            point = tuple(map_points([[x, y]], region)[0].tolist())
+            print(f"tile {region}: found at crop ({x},{y}) -> frame {point}")
+            hits.append(point)
+    assert hits == [(900, 400)], hits
+
+    # Tiles cover the ROI exactly once, also when it doesn't divide evenly and
+    # when the pixel sits on a tile edge
+    for roi, cols, rows in (((800, 300, 400, 300), 2, 2), ((7, 5, 401, 299), 3, 4), ((0, 0, 1280, 720), 1, 1)):
+        coverage = np.zeros_like(frame, dtype=np.int32)
+        for region in tile_roi(roi, cols, rows):
+            crop_numpy(coverage, region)[:] += 1
+        x, y, w, h = roi
+        assert (coverage[y:y + h, x:x + w] == 1).all() and coverage.sum() == w * h, (roi, cols, rows)
+    edge = tile_roi((800, 300, 400, 300), 2, 2)[3]
+    assert edge[:2] == (1000, 450) and map_points([[0, 0]], edge)[0].tolist() == [1000, 450]
+    assert map_boxes([[0, 0, 10, 20]], edge)[0].tolist() == [1000, 450, 1010, 470]
+
+    # Clipping to the frame
+    assert clip_roi((-10, -10, 100, 50), 1280, 720) == (0, 0, 90, 40)
+    assert clip_roi((1200, 700, 200, 200), 1280, 720) == (1200, 700, 80, 20)
+    assert clip_roi((1280, 0, 10, 10), 1280, 720) is None
+    assert parse_rois(["10", "20", "30.0", "40"]) == [(10, 20, 30, 40)]
+    print("roi checks passed")
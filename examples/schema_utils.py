@@ -0,0 +1,329 @@
+import os
+import json
+import numbers
+from json.encoder import encode_basestring_ascii
+
+# Environment variable naming the device template, if not next to the demos or in the repo
+TEMPLATE_ENV = "IOTC_TEMPLATE"
+# Environment variable enabling per-message validation against the template ("1" to enable)
+SCHEMA_DEBUG_ENV = "IOTC_SCHEMA_DEBUG"
+TEMPLATE_NAME = "NVIDIAdemo_template.JSON"
+TEMPLATE_PATHS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), TEMPLATE_NAME),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "templates", TEMPLATE_NAME),
+]
+
+# Per-message fields, in the order they are sent after the static ones
+# (demo_name, demo_version, model_name: fixed for the life of the demo).
+# Builders take these positionally; anything else goes in as keyword extras.
+MESSAGES = {
+    "actionnet": ("timestamp", "class_id", "class_description", "confidence"),
+    "depthnet": ("timestamp", "average_depth_m", "min_depth_m", "max_depth_m"),
+    "detectnet_detection": ("timestamp", "class_id", "class_description", "confidence", "bbox"),
+    "detectnet_count": ("timestamp",),
+    "detectnet_ppl": ("timestamp", "current_occupancy"),
+    "detectnet_ppl_pose": ("timestamp", "current_occupancy", "occupancy_level", "interaction_active",
+                           "unique_visitors", "interaction_count", "interaction_seconds", "box_coordinates"),
+    "imagenet": ("timestamp", "class_id", "class_description", "confidence", "top_classes"),
+    "posenet": ("timestamp",),
+    "segnet": ("timestamp", "frequency", "segnet_dominant_class", "segnet_dominant_class_coverage",
+               "segnet_coverage_percentages", "segnet_regions"),
+    "segnet_legacy": ("timestamp", "frequency", "class_coverage"),
+}
+# Fields sent as they are whatever their template type: box_coordinates is
+# declared STRING, but has always gone out as an [x, y, w, h] array, which
+# is what the dashboards read (the template has no array type).
+RAW_FIELDS = {"box_coordinates"}
+
+
+def _decimal(value):
+    if value.__class__ is int:
+        return "%d" % value  # counts keep their integer form
+    value = float(value)
+    # NaN and infinities are not JSON; x - x is only 0 for finite values
+    return repr(value) if value - value == 0 else "null"
+
+
+def _string(value):
+    if value.__class__ is str:
+        return encode_basestring_ascii(value)
+    return "null" if value is None else encode_basestring_ascii(str(value))
+
+
+def _integer(value):
+    return "%d" % value
+
+
+def _extra(extra):
+    return ", " + json.dumps(extra)[1:-1]
+
+
+# Template type -> (format placeholder, conversion expression in build(), conversion in encode()).
+# build() inlines the common case (a finite float, a str) and only calls out for the rest.
+CONVERSIONS = {
+    "INTEGER": ("%d", "{v}", _integer),
+    "TIME": ("%d", "{v}", _integer),
+    "DECIMAL": ("%s", "(_float_repr({v}) if {v}.__class__ is float and {v} - {v} == 0 else _decimal({v}))", _decimal),
+    "STRING": ("%s", "(_encode_string({v}) if {v}.__class__ is str else _string({v}))", _string),
+}
+GENERIC = ("%s", "_dumps({v})", json.dumps)
+
+
+def load_template(path=None):
+    """
+    Read the device template's attributes as {name: (type, {child: type})}.
+    Returns {} if no template is found, so builders still work without one.
+    """
+    candidates = [path] if path else [os.environ.get(TEMPLATE_ENV)] + TEMPLATE_PATHS
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate):
+            with open(candidate) as f:
+                template = json.load(f)
+            return {a["name"]: (a["type"], {c["name"]: c["type"] for c in a.get("childs") or []})
+                    for a in template.get("attributes", [])}
+    print(f"[SCHEMA] {TEMPLATE_NAME} not found, sending fields without template types")
+    return {}
+
+
+def conforms(kind, value):
+    """
+    Check a value against a template type: "ok", "converted" (the builder
+    converts it without losing anything) or "mismatch".
+    """
+    if kind in ("INTEGER", "TIME"):
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            return "mismatch"
+        if isinstance(value, int):
+            return "ok"
+        return "converted" if float(value).is_integer() else "mismatch"
+    if kind == "DECIMAL":
+        return "ok" if isinstance(value, numbers.Real) and not isinstance(value, bool) else "mismatch"
+    if kind == "STRING":
+        return "ok" if isinstance(value, str) else "converted"
+    if kind == "OBJECT":
+        return "ok" if isinstance(value, dict) else "mismatch"
+    if kind == "LATLONG":
+        ok = isinstance(value, (list, tuple)) and len(value) == 2 and all(isinstance(v, numbers.Real) for v in value)
+        return "ok" if ok else "mismatch"
+    if kind == "BOOLEAN":
+        return "ok" if isinstance(value, bool) else "mismatch"
+    return "ok"
+
+
+class schemaRegistry:
+    """
+    Field types from the IoTConnect device template, and the payload
+    builders compiled from them.
+    """
+    def __init__(self, attributes):
+        self.attributes = attributes
+
+    @classmethod
+    def load(cls, path=None):
+        return cls(load_template(path))
+
+    def type_of(self, field):
+        return self.attributes.get(field, (None, {}))[0]
+
+    def check(self, payload):
+        """
+        Compare a message with the template.  Returns (problems, undeclared):
+        problems are (field, template type, value type, "converted"/"mismatch")
+        tuples, with OBJECT children named "parent.child"; undeclared lists the
+        fields the template does not have.  RAW_FIELDS are not checked.
+        """
+        problems, undeclared = [], []
+        for field, value in payload.items():
+            if field in RAW_FIELDS:
+                continue
+            if field not in self.attributes:
+                undeclared.append(field)
+                continue
+            kind, children = self.attributes[field]
+            result = conforms(kind, value)
+            if result != "ok":
+                problems.append((field, kind, type(value).__name__, result))
+            if kind == "OBJECT" and isinstance(value, dict):
+                # Children go out as they are, so anything not matching is a mismatch
+                for child, child_value in value.items():
+                    if child in children and conforms(children[child], child_value) != "ok":
+                        problems.append((f"{field}.{child}", children[child], type(child_value).__name__, "mismatch"))
+        return problems, undeclared
+
+    def builder(self, message, debug=None, **static):
+        """
+        Compile the payload builder for one of MESSAGES, with the static fields' values.
+        """
+        if debug is None:
+            debug = os.environ.get(SCHEMA_DEBUG_ENV, "") not in ("", "0")
+        return payloadBuilder(self, message, MESSAGES[message], static, debug)
+
+
+class payloadBuilder:
+    """
+    Serializes one kind of telemetry message straight to a JSON line.
+
+    Compiled once at startup: the static fields are serialized up front,
+    the per-message fields get a fixed order and the conversion their
+    template type calls for (INTEGER/TIME as integers, DECIMAL as finite
+    numbers or null, STRING as strings; RAW_FIELDS as they are), and the
+    rest is a single %-format.
+    build(*values, **extra) takes the message's fields in order; extras
+    are appended with json.dumps.  encode(payload) serializes an ad-hoc
+    dict (events) with the same conversions.  In debug mode both check
+    each message against the template first and print each problem once.
+    """
+    def __init__(self, registry, message, fields, static, debug=False):
+        self.registry = registry
+        self.message = message
+        self.fields = tuple(fields)
+        self.static = dict(static)
+        self.debug = debug
+        self.reported = set()
+
+        parts, args = [], []
+        for key, value in self.static.items():
+            parts.append(f"{json.dumps(key)}: {json.dumps(value)}".replace("%", "%%"))
+        for field in self.fields:
+            kind = None if field in RAW_FIELDS else registry.type_of(field)
+            placeholder, convert, _ = CONVERSIONS.get(kind, GENERIC)
+            parts.append(f"{json.dumps(field)}: {placeholder}")
+            args.append(convert.format(v=field))
+        self.format = "{" + ", ".join(parts) + "%s}\n"
+        args.append("_extra(extra) if extra else ''")
+        source = (f"def build({''.join(f + ', ' for f in self.fields)}**extra):\n"
+                  f"    return _format % ({', '.join(args)},)\n")
+        namespace = {"_format": self.format, "_decimal": _decimal, "_string": _string, "_float_repr": float.__repr__,
+                     "_encode_string": encode_basestring_ascii, "_dumps": json.dumps, "_extra": _extra}
+        exec(compile(source, f"<payload {message}>", "exec"), namespace)
+        self._build = namespace["build"]
+        self.build = self._checked_build if debug else self._build
+
+        self.converters = {field: CONVERSIONS.get(kind, GENERIC)[2] for field, (kind, _) in registry.attributes.items()
+                           if field not in RAW_FIELDS}
+
+    def _checked_build(self, *values, **extra):
+        self.validate({**dict(zip(self.fields, values)), **extra})
+        return self._build(*values, **extra)
+
+    def encode(self, payload):
+        """
+        Serialize an ad-hoc message, static fields first unless the payload sets them.
+        """
+        payload = {**self.static, **payload}
+        if self.debug:
+            self.validate(payload)
+        parts = [f"{json.dumps(k)}: {self.converters.get(k, json.dumps)(v)}" for k, v in payload.items()]
+        return "{" + ", ".join(parts) + "}\n"
+
+    def validate(self, payload):
+        """
+        Print template problems with a message, each one once.  Returns the problems.
+        """
+        problems, undeclared = self.registry.check(payload)
+        for field, kind, value_type, result in problems:
+            if (field, result) not in self.reported:
+                self.reported.add((field, result))
+                print(f"[SCHEMA] {self.message}: '{field}' is {value_type}, template declares {kind} ({result})")
+        for field in undeclared:
+            if (field, "undeclared") not in self.reported:
+                self.reported.add((field, "undeclared"))
+                print(f"[SCHEMA] {self.message}: '{field}' is not in the template")
+        return problems
+
+
+_registry = None
+
+
+def payload_builder(message, **static):
+    """
+    Compile the builder for one of MESSAGES against the device template, read once per process.
+    """
+    global _registry
+    if _registry is None:
+        _registry = schemaRegistry.load()
+    return _registry.builder(message, **static)
+
+
+if __name__ == "__main__":
+    import timeit
+
+    registry = schemaRegistry.load()
+    assert registry.attributes, "template not found"
+    static = {"demo_name": "demo", "demo_version": "1.0", "model_name": "model.onnx"}
+
+    # What each demo sends: the message's fields in order, then extras
+    samples = {
+        "actionnet": ((1700000000, 12, "walking", 0.81235),
+                      {"top_classes": {"walking": 0.8}, "clip_length": 16, "clip_stride": 2,
+                       "action_segments": [{"label": "walking", "start": 1.0, "end": 9.5, "mean_confidence": 0.8}]}),
+        "depthnet": ((1700000000, 2.412, 0.5, float("nan")), {"buffer_allocations": 1}),
+        "detectnet_detection": ((1700000000, 1, "person", 0.91234, [10.0, 20.5, 100.0, 200.0]),
+                                {"source": "/dev/video0", "source_fps": 29.8}),
+        "detectnet_count": ((1700000000,), {"person": 3, "person_mean": 2.4, "car": 0, "car_mean": 0.0,
+                                            "bike": 1, "bike_mean": 0.2, "source": "/dev/video0"}),
+        "detectnet_ppl": ((1700000000, 3), {"person": 3, "person_mean": 2.4}),
+        "detectnet_ppl_pose": ((1700000000, 2, "low", "yes", 4, 1, 3.5, [200, 200, 400, 400]), {}),
+        "imagenet": ((1700000000, 281, "tabby cat", 0.81235, {"tabby cat": 0.812, "tiger cat": 0.1}), {}),
+        "posenet": ((1700000000,), {"pose_count": 2, "keypoints": {"nose": [320.5, 120.0], "left_eye": [330.0, 110.5],
+                                                                   "right_eye": [310.0, 110.5]}}),
+        "segnet": ((1700000000, 7, "person", 41.5, {"person": 41.5, "chair": 3.25}, []), {"buffer_allocations": 1}),
+        "segnet_legacy": ((1700000000, 7, {"person": 41.5}), {}),
+    }
+    assert set(samples) == set(MESSAGES)
+
+    # Template mismatches: any field the builders cannot convert losslessly fails the test
+    failures = []
+    for message, (values, extra) in samples.items():
+        builder = registry.builder(message, debug=False, **static)
+        payload = {**static, **dict(zip(MESSAGES[message], values)), **extra}
+        problems, undeclared = registry.check(payload)
+        mismatched = [p[0] for p in problems if p[-1] == "mismatch"]
+        failures += [(message, *p) for p in problems if p[-1] == "mismatch"]
+        converted = [p[0] for p in problems if p[-1] == "converted"]
+        print(f"{message:20s} converted {converted or '-'}, not in template {undeclared or '-'}")
+
+        # The line parses back to the payload, with the template conversions applied
+        line = builder.build(*values, **extra)
+        sent = json.loads(line)
+        assert list(sent) == list(payload), message
+        for field, value in payload.items():
+            if field in mismatched:
+                continue
+            kind = None if field in RAW_FIELDS else registry.type_of(field)
+            expected = None if kind == "DECIMAL" and value != value else \
+                str(value) if kind == "STRING" else value
+            assert sent[field] == expected, (message, field, sent[field], expected)
+        assert mismatched or json.loads(builder.encode(payload)) == sent, message
+    assert not failures, f"template mismatches: {failures}"
+
+    # Wire format of the fields the dashboards read: counts stay integers, the box stays an array
+    sent = json.loads(registry.builder("detectnet_ppl_pose", debug=False).build(*samples["detectnet_ppl_pose"][0]))
+    assert sent["current_occupancy"] == 2 and isinstance(sent["current_occupancy"], int)
+    assert sent["box_coordinates"] == [200, 200, 400, 400]
+
+    # Debug mode reports a wrongly typed field once, and only then
+    builder = registry.builder("imagenet", debug=True, **static)
+    builder.build(1700000000, 281.5, "tabby cat", 0.8, {})
+    builder.build(1700000000, 281.5, "tabby cat", 0.8, {})
+    assert builder.reported == {("class_id", "mismatch"), ("top_classes", "undeclared")}
+
+    # Fast path against building the dict and calling json.dumps, as the demos did
+    builder = registry.builder("imagenet", debug=False, demo_name="imageNet", demo_version="1.0",
+                               model_name="bvlc_googlenet.caffemodel")
+    top = {"tabby cat": 0.812, "tiger cat": 0.1, "egyptian cat": 0.05}
+
+    def before():
+        return json.dumps({"demo_name": "imageNet", "demo_version": "1.0", "model_name": "bvlc_googlenet.caffemodel",
+                           "timestamp": 1700000000, "class_id": 281, "class_description": "tabby cat",
+                           "confidence": 0.81235, "top_classes": top}) + "\n"
+
+    def after():
+        return builder.build(1700000000, 281, "tabby cat", 0.81235, top)
+
+    assert json.loads(before()) == json.loads(after())
+    old = min(timeit.repeat(before, number=20000, repeat=7)) / 20000 * 1e6
+    new = min(timeit.repeat(after, number=20000, repeat=7)) / 20000 * 1e6
+    print(f"imagenet message: dict + json.dumps {old:.2f} us, payload builder {new:.2f} us")
+    # Timings vary on a busy device; only fail on a clear regression
+    assert new <= old * 1.5, "payload builder much slower than json.dumps"
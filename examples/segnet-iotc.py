@@ -8,9 +8,12 @@ import time
 import socket
 import json
 import os
-import numpy as np
 import threading
 
+from iotc_utils import telemetry_socket_path, heartbeatWriter
+from mask_utils import maskSnapshots, handle_mask_command, coverageFilter, handle_coverage_command
+from schema_utils import payload_builder
+
 parser = argparse.ArgumentParser(description="Run SegNet and send telemetry to IoTConnect.")
 parser.add_argument("input", type=str, help="Camera input (e.g., /dev/video0)")
 parser.add_argument("--network", type=str, default="fcn-resnet18-cityscapes-512x256", help="SegNet model")
@@ -18,41 +21,34 @@ parser.add_argument("--stats", action="store_true", help="Display profiling stat
 args = parser.parse_args()
 
 telemetry_interval = 7.0
-telemetry_enabled = True
-watched_class = None
+snapshots = maskSnapshots()
 
 socket_path = f"/home/{os.environ.get('USER', 'mlamp')}/snap/iotconnect/common/iotc.sock"
 if not os.path.exists(socket_path):
     socket_path = "/var/snap/iotconnect/common/iotc.sock"
+socket_path = telemetry_socket_path(socket_path)
 
 net = jetson.inference.segNet(args.network)
 input_stream = jetson.utils.videoSource(args.input)
 output_stream = jetson.utils.videoOutput("display://0")
 
-def compute_class_coverage(mask_img, num_classes):
-    mask_array = jetson.utils.cudaToNumpy(mask_img)
-    total_pixels = mask_array.size
-    coverage = {}
-    for i in range(num_classes):
-        class_pixels = np.count_nonzero(mask_array == i)
-        if class_pixels > 0:
-            coverage[i] = round((class_pixels / total_pixels) * 100, 2)
-    return coverage
+# Coverage, watched classes and pausing; "void" never counts towards coverage
+class_labels = [net.GetClassDesc(i) for i in range(net.GetNumClasses())]
+coverage = coverageFilter(class_labels, ignore=[c for c in ("void",) if c in class_labels])
+
+# Plain newline-delimited messages, like the other demos (this used to wrap them in {"d": [{"d": ...}]})
+TELEMETRY = payload_builder("segnet_legacy", demo_name="segnet", demo_version="1.0", model_name="fcn_resnet18.onnx")
 
 def send_telemetry(coverage):
-    telemetry = {
-        "demo_name": "segnet",
-        "demo_version": "1.0",
-        "model_name": "fcn_resnet18.onnx",
-        "timestamp": int(time.time()),
-        "frequency": telemetry_interval,
-        "class_coverage": coverage
-    }
+    send_message(TELEMETRY.build(int(time.time()), telemetry_interval, coverage))
+
+def send_message(telemetry):
+    line = telemetry if isinstance(telemetry, str) else TELEMETRY.encode(telemetry)
     try:
-        print(f"[DEBUG] Sending telemetry: {telemetry}")
+        print(f"[DEBUG] Sending telemetry: {line.rstrip()}")
         sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         sock.connect(socket_path)
-        sock.sendall(json.dumps({ "d": [ { "d": telemetry } ] }).encode("utf-8"))
+        sock.sendall(line.encode("utf-8"))
         sock.shutdown(socket.SHUT_WR)
         sock.close()
         print("[TEL] Sent telemetry cleanly.")
@@ -60,7 +56,7 @@ def send_telemetry(coverage):
         print(f"[TEL] Error sending telemetry: {e}")
 
 def listen_for_commands():
-    global telemetry_interval, telemetry_enabled, watched_class
+    global telemetry_interval
     if os.path.exists(socket_path):
         try:
             cmd_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
@@ -74,15 +70,16 @@ def listen_for_commands():
                         if cmd.get("command") == "set_frequency":
                             telemetry_interval = float(cmd.get("value", 7.0))
                             print(f"[CMD] Telemetry frequency updated to {telemetry_interval}s")
-                        elif cmd.get("command") == "pause_telemetry":
-                            telemetry_enabled = False
-                            print("[CMD] Telemetry paused.")
-                        elif cmd.get("command") == "resume_telemetry":
-                            telemetry_enabled = True
-                            print("[CMD] Telemetry resumed.")
+                        elif cmd.get("command") in ("pause_telemetry", "resume_telemetry"):
+                            handle_coverage_command(coverage, cmd.get("command"), [])
                         elif cmd.get("command") == "watch_class":
-                            watched_class = cmd.get("value")
-                            print(f"[CMD] Watching for class: {watched_class}")
+                            # value: "person" or "person:10" (coverage threshold in percent)
+                            handle_coverage_command(coverage, "watch_class", str(cmd.get("value")).split(":"))
+                        elif cmd.get("command") == "snapshot_mask":
+                            # value: "32x16", "32 16" or [32, 16]
+                            value = cmd.get("value") or ""
+                            size = value if isinstance(value, list) else str(value).replace("x", " ").split()
+                            handle_mask_command(snapshots, "snapshot_mask", size)
                     except Exception as e:
                         print(f"[CMD] Failed to process command: {e}")
         except Exception as e:
@@ -95,13 +92,17 @@ mask_output = None
 
 print("[INFO] Running SegNet demo. Press Ctrl+C to exit.")
 
+heartbeat = heartbeatWriter()
 while output_stream.IsStreaming():
     img = input_stream.Capture()
     if img is None:
         continue
+    heartbeat.beat()
 
     if mask_output is None:
-        mask_output = jetson.utils.cudaAllocMapped(width=img.width, height=img.height, format="gray8")
+        # Class IDs at the network's grid resolution, cheap enough to count every frame
+        mask_output = jetson.utils.cudaAllocMapped(width=net.GetGridWidth(), height=net.GetGridHeight(), format="gray8")
+        mask_array = jetson.utils.cudaToNumpy(mask_output)
 
     net.Process(img)
     net.Overlay(img)
@@ -110,15 +111,30 @@ while output_stream.IsStreaming():
     if args.stats:
         net.PrintProfilerTimes()
 
+    net.Mask(mask_output)
+    jetson.utils.cudaDeviceSynchronize()
+    for event, label, percent, threshold in coverage.update(mask_array):
+        print(f"[ALERT] Watched class '{label}' at {percent}% coverage (threshold {threshold}%).")
+        send_message({
+            "demo_name": "segnet",
+            "timestamp": int(time.time()),
+            "event": event,
+            "class_description": label,
+            "coverage": percent,
+            "threshold": threshold
+        })
+
+    snapshot_size = snapshots.take()
+    if snapshot_size:
+        send_message({
+            "demo_name": "segnet",
+            "timestamp": int(time.time()),
+            **snapshots.payload(mask_array, snapshot_size, net.GetClassDesc)
+        })
+
     now = time.time()
-    if telemetry_enabled and (now - last_telemetry >= telemetry_interval):
+    if not coverage.paused and (now - last_telemetry >= telemetry_interval):
         last_telemetry = now
-        net.Mask(mask_output)
-        coverage_raw = compute_class_coverage(mask_output, net.GetNumClasses())
-        sorted_coverage = sorted(coverage_raw.items(), key=lambda x: x[1], reverse=True)
-        top_coverage = {net.GetClassDesc(i): v for i, v in sorted_coverage[:5]}
-        if watched_class and watched_class in top_coverage:
-            print(f"[ALERT] Watched class '{watched_class}' detected with {top_coverage[watched_class]}% coverage.")
-        send_telemetry(top_coverage)
+        send_telemetry(coverage.coverage(top=5))
 
 print("[INFO] Exited SegNet demo.")
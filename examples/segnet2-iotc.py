@@ -5,35 +5,43 @@ import argparse
 import os
 import time
 import socket
-import json
 import threading
 import stat
-import numpy as np
 from jetson_inference import segNet
-from jetson_utils import videoSource, videoOutput, cudaOverlay, cudaDeviceSynchronize, Log
+from jetson_utils import videoSource, videoOutput, cudaAllocMapped, cudaOverlay, cudaDeviceSynchronize, cudaToNumpy, Log
 
 from segnet_utils import segmentationBuffers
+from iotc_utils import start_command_listener, telemetry_socket_path, heartbeatWriter
+from capture_utils import open_capture, status_reporter
+from output_utils import add_output_args, create_output, handle_output_command
+from buffer_utils import frameBuffers
+from mask_utils import maskSnapshots, handle_mask_command, regionAnalyzer, coverageFilter, handle_coverage_command
+from schema_utils import payload_builder
+from record_utils import add_record_args, create_recorder, stageTimer
 
 DEMO_NAME = "segnet"
 DEMO_VERSION = "1.1"
 
 BASE_ROOT = "/var/snap/iotconnect/common"
-SOCKET_PATH = os.path.join(BASE_ROOT, "iotc.sock")
+SOCKET_PATH = telemetry_socket_path(os.path.join(BASE_ROOT, "iotc.sock"))
 CMD_SOCKET_PATH = os.path.join(BASE_ROOT, "iotc_cmd.sock")
 
 TELEMETRY_INTERVAL_DEFAULT = 7
 TELEMETRY_INTERVAL = TELEMETRY_INTERVAL_DEFAULT
 MODEL_NAME = None
+# Payload builder for the telemetry messages, compiled once the model is known
+TELEMETRY = None
 
 last_send_time = None
 
 
 def send_telemetry(data):
+    line = data if isinstance(data, str) else TELEMETRY.encode(data)
     try:
         with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
             sock.connect(SOCKET_PATH)
-            sock.sendall((json.dumps(data)).encode("utf-8"))
-        print(f"[TELEMETRY] Sent: {data}")
+            sock.sendall(line.encode("utf-8"))
+        print(f"[TELEMETRY] Sent: {line.rstrip()}")
     except Exception as e:
         print(f"[TELEMETRY] Send failed: {e}")
 
@@ -44,45 +52,18 @@ def telemetry_loop():
     while True:
         now = time.time()
         delta = now - last_send_time
-        if delta >= TELEMETRY_INTERVAL:
-            # Calculate histogram (pixel counts per class)
-            unique_classes, class_counts = np.unique(mask_np, return_counts=True)
-            total_pixels = mask_np.size
-
-            # Calculate coverage percentages per class
-            coverage_percentages = {}
-            num_classes = net.GetNumClasses()
-
-            for c, count in zip(unique_classes, class_counts):
-                if 0 <= c < num_classes:
-                    label = net.GetClassLabel(c)
-                else:
-                    label = "unknown"
-
-                coverage_percentages[label] = (count / total_pixels) * 100
-
-            # Determine dominant class safely
-            valid_indices = unique_classes[unique_classes < num_classes]
-            if valid_indices.size > 0:
-                dominant_class_idx = valid_indices[class_counts[unique_classes < num_classes].argmax()]
-                dominant_class_label = net.GetClassLabel(dominant_class_idx)
-                dominant_class_coverage = coverage_percentages[dominant_class_label]
+        if delta >= TELEMETRY_INTERVAL and not coverage.paused:
+            # Coverage of the latest class mask, ignored classes excluded
+            coverage_percentages = coverage.coverage() or {}
+            if coverage_percentages:
+                dominant_class_label, dominant_class_coverage = next(iter(coverage_percentages.items()))
             else:
-                dominant_class_label = "unknown"
-                dominant_class_coverage = 0.0
+                dominant_class_label, dominant_class_coverage = "unknown", 0.0
 
-            payload = {
-                "timestamp": int(time.time()),
-                "demo_name": DEMO_NAME,
-                "demo_version": DEMO_VERSION,
-                "model_name": MODEL_NAME,
-                "frequency": TELEMETRY_INTERVAL,
-                "segnet_dominant_class": dominant_class_label,
-                "segnet_dominant_class_coverage": dominant_class_coverage,
-                "segnet_coverage_percentages": coverage_percentages
-            }
-
-            send_telemetry(payload)
+            send_telemetry(TELEMETRY.build(
+                int(time.time()), TELEMETRY_INTERVAL, dominant_class_label, dominant_class_coverage,
+                coverage_percentages, regions.latest(), **frame_buffers.stats()
+            ))
             last_send_time = now
         time.sleep(0.1)
 
@@ -109,9 +90,18 @@ if __name__ == "__main__":
     parser.add_argument("--network", type=str, default="fcn-resnet18-voc")
     parser.add_argument("--filter-mode", type=str, default="linear", choices=["point", "linear"])
     parser.add_argument("--visualize", type=str, default="overlay,mask")
-    parser.add_argument("--ignore-class", type=str, default="void")
+    parser.add_argument("--ignore-class", type=str, default="void",
+                        help="comma-separated classes left out of coverage and regions")
+    parser.add_argument("--watch-class", type=str, action="append", default=[],
+                        help="class[:threshold_percent] sending an event as soon as its coverage reaches the threshold (repeatable)")
     parser.add_argument("--alpha", type=float, default=150.0)
     parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--region-interval", type=float, default=1.0,
+                        help="seconds between connected-region analyses of the class mask")
+    parser.add_argument("--region-min-cells", type=int, default=2,
+                        help="smallest region counted, in mask grid cells")
+    add_output_args(parser)
+    add_record_args(parser)
 
     args = parser.parse_known_args()[0]
 
@@ -120,36 +110,99 @@ if __name__ == "__main__":
         MODEL_NAME = args.network
 
     net = segNet(args.network, sys.argv)
+    TELEMETRY = payload_builder("segnet", demo_name=DEMO_NAME, demo_version=DEMO_VERSION, model_name=MODEL_NAME)
+    labels = [net.GetClassLabel(c) for c in range(net.GetNumClasses())]
+    ignore = [label for label in args.ignore_class.split(",") if label.lower() in map(str.lower, labels)]
     net.SetOverlayAlpha(args.alpha)
-    input_stream = videoSource(args.input, argv=sys.argv)
-    output_stream = videoOutput(args.output, argv=sys.argv)
+    input_stream = open_capture(args.input, sys.argv, status_reporter(send_telemetry, DEMO_NAME))
+    output_stream = create_output(args, args.output, sys.argv)
     buffers = segmentationBuffers(net, args)
+    # Display buffers are only (re)made when the input resolution changes
+    frame_buffers = frameBuffers(lambda img: buffers.Alloc(img.shape, img.format))
+
+    # Class IDs at the network's grid resolution, for coverage, region analysis and snapshots
+    class_mask = cudaAllocMapped(width=net.GetGridWidth(), height=net.GetGridHeight(), format="gray8")
+    class_mask_np = cudaToNumpy(class_mask)
+    coverage = coverageFilter(labels, ignore=ignore,
+                              watch={name: float(threshold or 5.0)
+                                     for name, _, threshold in (w.partition(":") for w in args.watch_class)})
+    snapshots = maskSnapshots()
+    regions = regionAnalyzer(net.GetClassLabel, interval=args.region_interval,
+                             min_cells=args.region_min_cells, ignore=ignore)
+    recorder = create_recorder(args, DEMO_NAME, {"model_name": MODEL_NAME, "sources": [args.input],
+                                                 "labels": labels, "ignore": ignore})
+    timer = stageTimer()
 
     threading.Thread(target=telemetry_loop, daemon=True).start()
+    start_command_listener(lambda cmd, cmd_args: handle_output_command(output_stream, cmd, cmd_args)
+                           or handle_mask_command(snapshots, cmd, cmd_args)
+                           or handle_coverage_command(coverage, cmd, cmd_args))
 
+    heartbeat = heartbeatWriter()
     while True:
+        timer.start()
         img_input = input_stream.Capture()
         if img_input is None:
+            if input_stream.alive():
+                heartbeat.beat(0)  # camera down or reopening, not hung
             continue
+        heartbeat.beat()
+        timer.mark("capture")
 
-        buffers.Alloc(img_input.shape, img_input.format)
-        net.Process(img_input, ignore_class=args.ignore_class)
-        mask = buffers.mask  # assuming mask is an image buffer with class IDs
+        frame_buffers.update(img_input)
+        # Ignored classes are left out of coverage and regions, not of the network's argmax,
+        # which can only skip one class and would relabel those pixels as their runner-up
+        net.Process(img_input, ignore_class="")
 
-        # Convert CUDA image buffer to numpy array
-        mask_np = np.asarray(mask)
-
-        if buffers.overlay:
+        # Coverage comes from the class-ID mask every frame, so watched classes are reported right away
+        net.Mask(class_mask, filter_mode="point")
+        cudaDeviceSynchronize()
+        timer.mark("inference")
+        events = coverage.update(class_mask_np)
+        for event, label, percent, threshold in events:
+            print(f"[ALERT] {label} coverage {percent}% (threshold {threshold}%)")
+            send_telemetry({
+                "timestamp": int(time.time()),
+                "demo_name": DEMO_NAME,
+                "model_name": MODEL_NAME,
+                "event": event,
+                "class_description": label,
+                "coverage": percent,
+                "threshold": threshold
+            })
+
+        # The overlay and composite are only built for shown frames
+        draw = output_stream.next_frame()
+        if buffers.overlay and draw:
             net.Overlay(buffers.overlay, filter_mode=args.filter_mode)
-        if buffers.mask:
+        if buffers.mask and draw:
             net.Mask(buffers.mask, filter_mode=args.filter_mode)
-        if buffers.composite:
+        if buffers.composite and draw:
             cudaOverlay(buffers.overlay, buffers.composite, 0, 0)
             cudaOverlay(buffers.mask, buffers.composite, buffers.overlay.width, 0)
 
+        now = time.monotonic()
+        if regions.due(now):
+            regions.submit(class_mask_np, now)
+        snapshot_size = snapshots.take()
+        if snapshot_size:
+            send_telemetry({
+                "timestamp": int(time.time()),
+                "demo_name": DEMO_NAME,
+                "model_name": MODEL_NAME,
+                **snapshots.payload(class_mask_np, snapshot_size, net.GetClassLabel)
+            })
+
         output_stream.Render(buffers.output)
         output_stream.SetStatus(f"{MODEL_NAME} | Network {net.GetNetworkFPS():.0f} FPS")
         cudaDeviceSynchronize()
+        timer.mark("render")
+
+        # The class mask at grid resolution is what coverage and regions see; the input frame has no overlay
+        if recorder:
+            recorder.record(results=[list(e) for e in events], arrays={"class_mask": class_mask_np},
+                            timings=timer.timings, source=args.input,
+                            frame=cudaToNumpy(img_input) if recorder.thumb_width else None)
 
         if not input_stream.IsStreaming() or not output_stream.IsStreaming():
             break
@@ -0,0 +1,247 @@
+import os
+import time
+import signal
+import subprocess
+import threading
+
+from iotc_utils import HEARTBEAT_FD_ENV
+
+
+class demoSupervisor:
+    """
+    Runs one demo process and keeps it running.
+
+    Exits are noticed promptly: a SIGCHLD handler (installed from the main
+    thread) wakes the monitor thread, which otherwise checks once a second.
+    A demo that exits with status 0 is left stopped; a crash is restarted
+    after an exponential backoff, and `crash_limit` crashes within
+    `crash_window` seconds stop restarts altogether (crash loop).
+
+    Demos report their processed-frame count over a heartbeat pipe (see
+    iotc_utils.heartbeatWriter).  Once a demo has sent a heartbeat, going
+    `hang_timeout` seconds without another one counts as a hang: the
+    process is killed and handled like a crash.  Demos that never send
+    heartbeats are not watched.
+
+    on_event(event, info) is called for demo_crashed, demo_hung,
+    demo_restarted, demo_crash_loop and demo_exited.
+    """
+    def __init__(self, on_event=None, backoff_initial=2.0, backoff_max=60.0, crash_limit=5,
+                 crash_window=300.0, stable_after=60.0, hang_timeout=30.0):
+        self.on_event = on_event or (lambda event, info: None)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.crash_limit = crash_limit
+        self.crash_window = crash_window
+        self.stable_after = stable_after
+        self.hang_timeout = hang_timeout
+
+        self.lock = threading.RLock()
+        self.wake = threading.Event()
+        self.name = None
+        self.cmd = None
+        self.env = None
+        self.proc = None
+        self.state = "idle"
+        self.restarts = 0
+        self.crashes = []
+        self.consecutive = 0
+        self.restart_at = 0
+        self.started = 0
+        self.last_beat = None
+        self.frames = 0
+        self.fps_frames = 0
+        self.fps_time = time.monotonic()
+        threading.Thread(target=self._monitor_loop, daemon=True).start()
+
+    def install_sigchld(self):
+        """
+        Wake the monitor as soon as any child exits.  Must be called from the main thread.
+        """
+        signal.signal(signal.SIGCHLD, lambda signum, frame: self.wake.set())
+
+    def start(self, name, cmd, env=None):
+        """
+        Stop whatever is running and start a new demo.
+        """
+        with self.lock:
+            self.stop()
+            self.name, self.cmd, self.env = name, cmd, env
+            self.restarts = 0
+            self.crashes = []
+            self.consecutive = 0
+            self._spawn()
+
+    def stop(self):
+        with self.lock:
+            if self.proc and self.proc.poll() is None:
+                print(f"[SUPERVISOR] Terminating {self.name}...")
+                self._terminate()
+            self.proc = None
+            if self.state != "idle":
+                self.state = "stopped"
+
+    def running(self):
+        return self.state == "running"
+
+    def pid(self):
+        """
+        PID of the running demo, or None.
+        """
+        proc = self.proc
+        return proc.pid if proc and self.running() else None
+
+    def active(self):
+        """
+        Name of the demo the supervisor is responsible for, running or about to restart.
+        """
+        return self.name if self.state in ("running", "backoff") else None
+
+    def status(self):
+        """
+        Supervisor stats for telemetry.
+        """
+        with self.lock:
+            now = time.monotonic()
+            fps = (self.frames - self.fps_frames) / max(now - self.fps_time, 1e-6)
+            self.fps_frames, self.fps_time = self.frames, now
+            return {
+                "demo_state": self.state,
+                "demo_restarts": self.restarts,
+                "demo_uptime": int(now - self.started) if self.running() else 0,
+                "demo_frames": self.frames,
+                "demo_fps": round(fps, 1)
+            }
+
+    def _spawn(self):
+        read_fd, write_fd = os.pipe()
+        env = dict(self.env or os.environ, **{HEARTBEAT_FD_ENV: str(write_fd)})
+        try:
+            self.proc = subprocess.Popen(self.cmd, env=env, pass_fds=(write_fd,))
+        except OSError as e:
+            os.close(read_fd)
+            print(f"[SUPERVISOR] Could not start {self.name}: {e}")
+            self.proc = None
+            self._exited(None, "spawn_failed")
+            return
+        finally:
+            os.close(write_fd)
+        self.state = "running"
+        self.started = time.monotonic()
+        self.last_beat = None
+        self.frames = self.fps_frames = 0
+        self.fps_time = self.started
+        threading.Thread(target=self._read_heartbeats, args=(self.proc, read_fd), daemon=True).start()
+        print(f"[SUPERVISOR] Started {self.name} (pid {self.proc.pid})")
+
+    def _read_heartbeats(self, proc, read_fd):
+        with os.fdopen(read_fd, "rb") as pipe:
+            for line in pipe:
+                try:
+                    frames = int(line)
+                except ValueError:
+                    continue
+                with self.lock:
+                    if self.proc is proc:
+                        self.frames = frames
+                        self.last_beat = time.monotonic()
+
+    def _terminate(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    def _monitor_loop(self):
+        while True:
+            self.wake.wait(timeout=1.0)
+            self.wake.clear()
+            with self.lock:
+                self._check()
+
+    def _check(self):
+        now = time.monotonic()
+        if self.state == "running" and self.proc:
+            returncode = self.proc.poll()
+            if returncode is not None:
+                self._exited(returncode, "exit")
+            elif self.last_beat is not None and now - self.last_beat > self.hang_timeout:
+                print(f"[SUPERVISOR] {self.name} sent no heartbeat for {now - self.last_beat:.0f}s, killing it")
+                self._terminate()
+                self._exited(self.proc.returncode, "hang")
+        elif self.state == "backoff" and now >= self.restart_at:
+            self.restarts += 1
+            self._spawn()
+            if self.state == "running":
+                self.on_event("demo_restarted", {"script": self.name, "restarts": self.restarts})
+
+    def _exited(self, returncode, reason):
+        now = time.monotonic()
+        uptime = now - self.started
+        info = {"script": self.name, "returncode": returncode, "reason": reason, "uptime": int(uptime)}
+        self.proc = None
+        if returncode == 0 and reason == "exit":
+            print(f"[SUPERVISOR] {self.name} exited cleanly")
+            self.state = "exited"
+            self.on_event("demo_exited", info)
+            return
+
+        if uptime >= self.stable_after:
+            self.consecutive = 0
+        self.consecutive += 1
+        self.crashes = [t for t in self.crashes if now - t < self.crash_window] + [now]
+        if len(self.crashes) >= self.crash_limit:
+            print(f"[SUPERVISOR] {self.name} crashed {len(self.crashes)} times, not restarting")
+            self.state = "crash_loop"
+            self.on_event("demo_crash_loop", dict(info, crashes=len(self.crashes)))
+            return
+
+        delay = min(self.backoff_max, self.backoff_initial * 2 ** (self.consecutive - 1))
+        print(f"[SUPERVISOR] {self.name} {reason} (code {returncode}), restarting in {delay:.1f}s")
+        self.state = "backoff"
+        self.restart_at = now + delay
+        self.on_event("demo_hung" if reason == "hang" else "demo_crashed", dict(info, restart_in=delay))
+
+
+if __name__ == "__main__":
+    # Stub demos that crash, hang and exit cleanly, with short timeouts
+    import sys
+    import tempfile
+
+    stub = """
+import sys, time
+sys.path.insert(0, {path!r})
+from iotc_utils import heartbeatWriter
+heartbeat = heartbeatWriter(interval=0.1)
+for _ in range(10):
+    heartbeat.beat()
+    time.sleep(0.05)
+{ending}
+"""
+    endings = {
+        "crash": "sys.exit(1)",
+        "hang": "time.sleep(3600)",
+        "clean": "sys.exit(0)",
+    }
+    root = tempfile.mkdtemp()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name, ending in endings.items():
+        with open(os.path.join(root, name + ".py"), "w") as f:
+            f.write(stub.format(path=here, ending=ending))
+
+    def on_event(event, info):
+        print(f"  event: {event} {info}")
+
+    supervisor = demoSupervisor(on_event, backoff_initial=0.2, backoff_max=1.0, crash_limit=4,
+                                crash_window=30.0, hang_timeout=1.0)
+    supervisor.install_sigchld()
+    for name, seconds in (("crash", 6), ("hang", 8), ("clean", 2)):
+        print(f"{name}:")
+        supervisor.start(name, [sys.executable, os.path.join(root, name + ".py")])
+        end = time.time() + seconds
+        while time.time() < end and supervisor.state in ("running", "backoff"):
+            time.sleep(0.1)
+        print(f"  status: {supervisor.status()}")
+        supervisor.stop()
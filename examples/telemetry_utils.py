@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import heapq
+import socket
+import threading
+
+# Message priorities (lower is sent first)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+
+def message_priority(payload):
+    """
+    Events (alerts, label changes, launcher events) jump the queue;
+    regular results wait for the next merged interval message.
+    """
+    if payload.get("priority") == "high" or "event" in payload:
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+class tokenBucket:
+    """
+    Global send rate limit: `rate` messages per second, bursts up to `burst`.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+
+    def delay(self):
+        """
+        Take a token if one is available and return 0, otherwise return how long to wait for one.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class telemetryMux:
+    """
+    Single writer to the IoTConnect telemetry socket on behalf of the
+    launcher and the demo it runs.
+
+    Demos write to the mux's local socket instead of iotc.sock.  Their
+    regular results are held per source until the next interval: the
+    last one is merged with the latest system stats (demo fields win),
+    so the cloud gets one enriched message per source and interval, and
+    any earlier ones (e.g. one message per detection) go out ahead of it
+    unchanged.  Events go out as soon as the rate limit allows.  Demo
+    lines that are not merged are forwarded byte for byte, so only the
+    merged message is serialized again.  Everything is sent over one
+    persistent upstream connection by one sender thread, so the snap
+    never sees concurrent writers.  When the queue is full, the oldest
+    normal-priority message is dropped first.
+    """
+    def __init__(self, upstream_path, rate=5.0, burst=10, max_queue=100, verbose=True):
+        self.upstream_path = upstream_path
+        self.verbose = verbose
+        self.bucket = tokenBucket(rate, burst)
+        self.max_queue = max_queue
+        self.queue = []
+        self.seq = 0
+        self.pending = {}
+        self.cond = threading.Condition()
+        self.sock = None
+        self.stats = {"received": 0, "merged": 0, "sent": 0, "dropped": 0, "connections": 0}
+
+    def start(self, listen_path=None):
+        threading.Thread(target=self.sender_loop, daemon=True).start()
+        if listen_path:
+            threading.Thread(target=self.serve, args=(listen_path,), daemon=True).start()
+        return self
+
+    # --- Inputs ---
+
+    def publish(self, payload, priority=None, line=None):
+        """
+        Queue a message for upstream as is; `line` is its JSON line, if already serialized.
+        """
+        priority = message_priority(payload) if priority is None else priority
+        with self.cond:
+            if len(self.queue) >= self.max_queue and not self._drop(priority):
+                self.stats["dropped"] += 1
+                return False
+            heapq.heappush(self.queue, (priority, self.seq, payload, line))
+            self.seq += 1
+            self.cond.notify()
+        return True
+
+    def _drop(self, priority):
+        # Make room by dropping the oldest message of the lowest priority, if below the new one's
+        worst = max(self.queue)
+        if worst[0] < priority or (worst[0] == priority and priority == PRIORITY_HIGH):
+            return False
+        victim = min((entry for entry in self.queue if entry[0] == worst[0]), key=lambda entry: entry[1])
+        self.queue.remove(victim)
+        heapq.heapify(self.queue)
+        self.stats["dropped"] += 1
+        return True
+
+    def submit(self, payload, line=None):
+        """
+        Accept a message from a demo: events are published right away,
+        results are held for the next interval, in order, grouped by
+        their "source" tag.  At most max_queue are held per source.
+        """
+        with self.cond:
+            self.stats["received"] += 1
+        if message_priority(payload) == PRIORITY_HIGH:
+            self.publish(payload, PRIORITY_HIGH, line)
+            return
+        with self.cond:
+            results = self.pending.setdefault(payload.get("source"), [])
+            if len(results) >= self.max_queue:
+                results.pop(0)
+                self.stats["dropped"] += 1
+            results.append((payload, line))
+
+    def flush_interval(self, system_stats):
+        """
+        Publish each demo source's results, the last one enriched with
+        the system stats, or the system stats alone if the demo sent
+        nothing.
+        """
+        with self.cond:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            self.publish(dict(system_stats), PRIORITY_NORMAL)
+            return
+        for results in pending.values():
+            *earlier, (last, _) = results
+            for payload, line in earlier:
+                self.publish(payload, PRIORITY_NORMAL, line)
+            self.stats["merged"] += 1
+            self.publish({**system_stats, **last, "merged_messages": len(results)}, PRIORITY_NORMAL)
+
+    def serve(self, path):
+        """
+        Accept newline-delimited JSON messages from demos on a local socket.
+        """
+        if os.path.exists(path):
+            os.unlink(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        os.chmod(path, 0o666)
+        server.listen(16)
+        print(f"[MUX] Accepting demo telemetry on {path}")
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=self._read_client, args=(conn,), daemon=True).start()
+
+    def _read_client(self, conn):
+        buffer = b""
+        with conn:
+            conn.settimeout(5.0)
+            while True:
+                try:
+                    data = conn.recv(65536)
+                except OSError:
+                    break
+                if not data:
+                    break
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    self._parse(line)
+        self._parse(buffer)
+
+    def _parse(self, line):
+        if not line.strip():
+            return
+        try:
+            self.submit(json.loads(line.decode("utf-8")), line.strip() + b"\n")
+        except Exception as e:
+            print(f"[MUX] Bad message from demo: {e}")
+
+    # --- Output ---
+
+    def sender_loop(self):
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+            wait = self.bucket.delay()
+            if wait:
+                time.sleep(wait)
+                continue
+            with self.cond:
+                priority, seq, payload, line = heapq.heappop(self.queue)
+            if not self._send(payload, line):
+                with self.cond:
+                    heapq.heappush(self.queue, (priority, seq, payload, line))
+                time.sleep(1.0)
+
+    def _send(self, payload, line=None):
+        data = line or (json.dumps(payload) + "\n").encode("utf-8")
+        for _ in range(2):
+            try:
+                if self.sock is None:
+                    self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self.sock.settimeout(2.0)
+                    self.sock.connect(self.upstream_path)
+                    self.stats["connections"] += 1
+                self.sock.sendall(data)
+                self.stats["sent"] += 1
+                if self.verbose:
+                    print(f"[TELEMETRY] Sent: {payload}")
+                return True
+            except OSError as e:
+                print(f"[MUX] Upstream send failed: {e}")
+                if self.sock:
+                    self.sock.close()
+                self.sock = None
+        return False
+
+
+if __name__ == "__main__":
+    # Stand-in upstream server, the mux, and several simulated demo writers
+    import tempfile
+
+    root = tempfile.mkdtemp()
+    upstream_path = os.path.join(root, "iotc.sock")
+    mux_path = os.path.join(root, "mux.sock")
+    upstream = {"connections": 0, "messages": []}
+
+    def upstream_server():
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(upstream_path)
+        server.listen(4)
+        while True:
+            conn, _ = server.accept()
+            upstream["connections"] += 1
+            with conn:
+                buffer = b""
+                while data := conn.recv(65536):
+                    buffer += data
+                    *lines, buffer = buffer.split(b"\n")
+                    upstream["messages"] += [json.loads(line) for line in lines]
+
+    def demo_writer(source, seconds):
+        # Per interval, like detectnet: one message per detection, then the count message
+        end = time.time() + seconds
+        n = 0
+        while time.time() < end:
+            sent.append(source)
+            payloads = [{"demo_name": "detectnet", "source": source, "detection": f"{source}#{n}.{i}",
+                         "class_id": 1, "confidence": 0.9, "timestamp": n} for i in range(3)]
+            payloads.append({"demo_name": "detectnet", "source": source, "person": n % 4, "timestamp": n})
+            if n % 3 == 0:
+                payloads.append({"demo_name": "detectnet", "source": source, "event": "label_changed"})
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(mux_path)
+                s.sendall("".join(json.dumps(payload) + "\n" for payload in payloads).encode("utf-8"))
+            n += 1
+            time.sleep(0.5)
+
+    threading.Thread(target=upstream_server, daemon=True).start()
+    time.sleep(0.1)
+    mux = telemetryMux(upstream_path, rate=20.0, burst=10, verbose=False).start(mux_path)
+    time.sleep(0.1)
+
+    sources = [f"/dev/video{i * 2}" for i in range(3)]
+    sent = []
+    writers = [threading.Thread(target=demo_writer, args=(source, 5.0)) for source in sources]
+    for w in writers:
+        w.start()
+    for _ in range(6):
+        time.sleep(1.0)
+        mux.flush_interval({"cpu": 12.5, "gpu": 40, "launcher": "iotc-launcher", "timestamp": -1})
+    for w in writers:
+        w.join()
+    mux.flush_interval({"cpu": 12.5, "gpu": 40, "launcher": "iotc-launcher", "timestamp": -1})
+    time.sleep(2.0)
+
+    kinds = {}
+    for msg in upstream["messages"]:
+        kind = msg.get("event") or ("merged" if "merged_messages" in msg else "detection" if "detection" in msg
+                                    else "count" if "person" in msg else "system")
+        kinds[kind] = kinds.get(kind, 0) + 1
+    print(f"mux stats: {mux.stats}")
+    print(f"upstream: {upstream['connections']} connection(s), {len(upstream['messages'])} messages {kinds}")
+
+    assert upstream["connections"] == 1
+    assert mux.stats["dropped"] == 0
+    # Every detection arrives as its own message, and detection fields don't leak into the merged ones
+    detections = [msg for msg in upstream["messages"] if "detection" in msg]
+    assert len(detections) == len({msg["detection"] for msg in detections}) == 3 * len(sent)
+    # One count message per demo interval, the last of each source's interval enriched with the system stats
+    assert kinds["merged"] + kinds.get("count", 0) == len(sent)
+    merged = [msg for msg in upstream["messages"] if "merged_messages" in msg]
+    assert all("detection" not in msg and "class_id" not in msg and "person" in msg and "cpu" in msg for msg in merged)
+    # System stats don't overwrite the demo's own fields
+    assert all(msg["timestamp"] >= 0 for msg in merged)
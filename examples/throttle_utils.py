@@ -0,0 +1,151 @@
+import time
+
+
+# Throttle levels applied by the launcher, from unthrottled to most throttled.
+# max_fps=0 means uncapped, stride=N runs the network on every Nth frame.
+THROTTLE_LEVELS = [
+    {"max_fps": 0, "stride": 1},
+    {"max_fps": 0, "stride": 2},
+    {"max_fps": 15, "stride": 2},
+    {"max_fps": 10, "stride": 3},
+    {"max_fps": 5, "stride": 4},
+]
+
+
+class throttleController:
+    """
+    Launcher-side control loop keeping the demo within GPU load and
+    temperature budgets.
+
+    Every update() takes one stats sample.  When either budget is exceeded
+    for `hold` consecutive samples the level goes up one step; when both
+    are below budget minus hysteresis for `hold` samples it goes back down.
+    Returns a decision dict when the level changes, otherwise None.
+    """
+    def __init__(self, gpu_budget=85.0, temp_budget=75.0, gpu_hysteresis=15.0, temp_hysteresis=5.0,
+                 hold=2, levels=THROTTLE_LEVELS):
+        self.gpu_budget = float(gpu_budget)
+        self.temp_budget = float(temp_budget)
+        self.gpu_hysteresis = float(gpu_hysteresis)
+        self.temp_hysteresis = float(temp_hysteresis)
+        self.hold = int(hold)
+        self.levels = levels
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        self.level = 0
+        self.over = 0
+        self.under = 0
+
+    def update(self, stats):
+        if not self.enabled:
+            return None
+
+        gpu = float(stats.get("gpu", -1))
+        temp = float(stats.get("temperature", -1))
+        over = gpu > self.gpu_budget or temp > self.temp_budget
+        under = gpu < self.gpu_budget - self.gpu_hysteresis and temp < self.temp_budget - self.temp_hysteresis
+
+        self.over = self.over + 1 if over else 0
+        self.under = self.under + 1 if under else 0
+
+        if self.over >= self.hold and self.level < len(self.levels) - 1:
+            self.level += 1
+            reason = "temperature" if temp > self.temp_budget else "gpu"
+        elif self.under >= self.hold and self.level > 0:
+            self.level -= 1
+            reason = "recovered"
+        else:
+            return None
+
+        self.over = self.under = 0
+        return {"level": self.level, "reason": reason, "gpu": gpu, "temperature": temp, **self.levels[self.level]}
+
+
+class frameThrottle:
+    """
+    Demo-side counterpart of throttleController: caps the loop rate and
+    runs the network only on every `stride`-th frame.
+    """
+    def __init__(self, max_fps=0, stride=1):
+        self.max_fps = 0
+        self.stride = 1
+        self.count = 0
+        self.counts = {}
+        self.last_time = time.perf_counter()
+        self.configure(max_fps, stride)
+
+    def configure(self, max_fps=None, stride=None):
+        if max_fps is not None:
+            self.max_fps = max(0.0, float(max_fps))
+        if stride is not None:
+            self.stride = max(1, int(stride))
+        print(f"[THROTTLE] max_fps={self.max_fps or 'uncapped'}, stride={self.stride}")
+
+    def should_infer(self, key=None):
+        """
+        Count a frame (per source when `key` is given) and return True on
+        every stride-th one.
+        """
+        if key is None:
+            self.count += 1
+            return self.count % self.stride == 0
+        count = self.counts.get(key, 0) + 1
+        self.counts[key] = count
+        return count % self.stride == 0
+
+    def wait(self):
+        """
+        Sleep for whatever is left of this frame's budget at max_fps.
+        """
+        if self.max_fps > 0:
+            remaining = 1.0 / self.max_fps - (time.perf_counter() - self.last_time)
+            if remaining > 0:
+                time.sleep(remaining)
+        self.last_time = time.perf_counter()
+
+
+def handle_throttle_command(throttle, cmd, args):
+    """
+    set_throttle <fps> <N>
+    set_max_fps <fps>   (0 = uncapped)
+    set_stride <N>
+    Returns True if the command was a throttle command.
+    """
+    if cmd == "set_throttle" and len(args) == 2:
+        throttle.configure(max_fps=args[0], stride=args[1])
+    elif cmd == "set_max_fps" and args:
+        throttle.configure(max_fps=args[0])
+    elif cmd == "set_stride" and args:
+        throttle.configure(stride=args[0])
+    else:
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    # Simulated trace: GPU saturates, then the enclosure heats up, then load drops
+    trace = [{"gpu": 60, "temperature": 55}] * 5 + \
+            [{"gpu": 98, "temperature": 60}] * 6 + \
+            [{"gpu": 80, "temperature": 79}] * 6 + \
+            [{"gpu": 40, "temperature": 62}] * 12
+
+    controller = throttleController()
+    demo = frameThrottle()
+    decisions = []
+    for idx, stats in enumerate(trace):
+        decision = controller.update(stats)
+        if decision:
+            print(f"sample {idx:2d}: {decision}")
+            handle_throttle_command(demo, "set_throttle", [decision["max_fps"], decision["stride"]])
+            decisions.append((idx, decision["level"], decision["reason"]))
+
+    # One step up per `hold` samples over budget, one step down per `hold` samples recovered
+    assert decisions == [(6, 1, "gpu"), (8, 2, "gpu"), (10, 3, "gpu"), (12, 4, "temperature"),
+                         (18, 3, "recovered"), (20, 2, "recovered"), (22, 1, "recovered"),
+                         (24, 0, "recovered")], decisions
+    assert (demo.max_fps, demo.stride) == (0, 1)
+    demo.configure(stride=3)
+    assert [demo.should_infer() for _ in range(6)] == [False, False, True] * 2
+    assert [demo.should_infer("a") for _ in range(3)] == [False, False, True] and demo.should_infer("b") is False